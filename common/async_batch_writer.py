@@ -0,0 +1,91 @@
+import asyncio
+from itertools import islice
+
+import neo4j.exceptions
+
+from common.batch_writer import MAX_RETRIES, RETRY_DELAY
+
+
+class StatementRecorder:
+    """
+    Stand-in transaction that records the statements of a transaction function instead of running them,
+    so the sync writers of the graph classes can be reused by their async counterparts.
+    """
+
+    def __init__(self):
+        self.statements = []
+
+    def run(self, query, **parameters):
+        self.statements.append((query, parameters))
+
+
+def prepare_statements(work, *args):
+    """
+    Return the (query, parameters) statements a transaction function would run.
+    """
+    recorder = StatementRecorder()
+    work(recorder, *args)
+    return recorder.statements
+
+
+async def run_statements(tx, statements):
+    for query, parameters in statements:
+        result = await tx.run(query, **parameters)
+        await result.consume()
+
+
+async def write_statements(session, statements, max_retries=MAX_RETRIES, retry_delay=RETRY_DELAY):
+    """
+    Run statements in one write transaction, retrying it with backoff on transient errors like
+    BatchWriter.write does.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return await session.execute_write(run_statements, statements)
+        except neo4j.exceptions.ConstraintError:
+            return None
+        except neo4j.exceptions.TransientError as e:
+            if attempt == max_retries:
+                raise
+            print(f"Transient error {e.code}, retrying ({attempt + 1}/{max_retries})")
+            await asyncio.sleep(retry_delay * 2 ** attempt)
+
+
+async def write_stage(session, items, batch_func, items_name, batch_size,
+                      max_retries=MAX_RETRIES, retry_delay=RETRY_DELAY):
+    """
+    Write items in batches. The statements of the next batch are built in a worker thread while
+    the previous batch commits.
+
+    :param session: Async Neo4j session.
+    :param items: Iterable of items, consumed lazily.
+    :param batch_func: Sync transaction function called with (tx, batch).
+    :param items_name: Name of the items used in progress messages.
+    :param batch_size: Number of items per batch.
+    :param max_retries: Retries of a batch after a transient error such as a deadlock.
+    :param retry_delay: Delay before the first retry in seconds, doubled on every retry.
+    """
+    iterator = iter(items)
+
+    def prepare_next_batch():
+        batch = list(islice(iterator, batch_size))
+        return batch, prepare_statements(batch_func, batch) if batch else []
+
+    i = 0
+    batch, statements = await asyncio.to_thread(prepare_next_batch)
+
+    while batch:
+        commit = asyncio.ensure_future(write_statements(session, statements, max_retries, retry_delay))
+        try:
+            next_batch, next_statements = await asyncio.to_thread(prepare_next_batch)
+        except BaseException:
+            # Do not leave the commit of the previous batch running unobserved
+            commit.cancel()
+            await asyncio.gather(commit, return_exceptions=True)
+            raise
+
+        await commit
+        print(f"Processed {items_name} from {i} to {i + len(batch)}")
+
+        i += len(batch)
+        batch, statements = next_batch, next_statements
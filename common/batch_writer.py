@@ -0,0 +1,136 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+
+import neo4j
+import neo4j.exceptions
+
+
+# Retries of a batch after a transient error such as a deadlock, and the delay before the first
+# one in seconds, doubled on every retry
+MAX_RETRIES = 5
+RETRY_DELAY = 0.5
+
+
+class BatchWriter:
+    """
+    Write batches of graph items through a bounded pool of Neo4j sessions.
+
+    Every call to write_stage is a barrier: all batches of the stage are committed before it
+    returns, so stages written one after another keep their order (nodes before relationships),
+    while the batches inside a stage are committed concurrently.
+    """
+
+    def __init__(self, driver, batch_size=1000, concurrency=1, max_retries=MAX_RETRIES, retry_delay=RETRY_DELAY):
+        """
+        :param driver: Neo4j driver shared by the sessions.
+        :param batch_size: Number of items per batch.
+        :param concurrency: Maximum number of batches committed at the same time (default: 1).
+        :param max_retries: Retries of a batch after a transient error such as a deadlock.
+        :param retry_delay: Delay before the first retry in seconds, doubled on every retry.
+        """
+        self.driver = driver
+        self.batch_size = batch_size
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.stats = []
+
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self.driver.session()
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def close_sessions(self):
+        """
+        Close the sessions opened by the worker threads.
+        """
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+        self._local = threading.local()
+
+    def write(self, work, *args):
+        """
+        Run one write transaction, retrying it with backoff on transient errors.
+        """
+        session = self._session()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                return session.execute_write(work, *args)
+            except neo4j.exceptions.ConstraintError:
+                return None
+            except neo4j.exceptions.TransientError as e:
+                if attempt == self.max_retries:
+                    raise
+                print(f"Transient error {e.code}, retrying ({attempt + 1}/{self.max_retries})")
+                time.sleep(self.retry_delay * 2 ** attempt)
+
+    def _write_batch(self, batch_func, batch, items_name, start):
+        self.write(batch_func, batch)
+        print(f"Processed {items_name} from {start} to {start + len(batch)}")
+        return len(batch)
+
+    def write_stage(self, items, batch_func, items_name):
+        """
+        Split items into batches, commit them with at most concurrency batches in flight and report
+        the throughput of the stage.
+
+        :param items: Iterable of items, consumed lazily.
+        :param batch_func: Transaction function called with (tx, batch).
+        :param items_name: Name of the items used in progress messages.
+        :return: Number of items written.
+        """
+        iterator = iter(items)
+        written = 0
+        start = 0
+        started_at = time.perf_counter()
+
+        try:
+            if self.concurrency == 1:
+                while batch := list(islice(iterator, self.batch_size)):
+                    written += self._write_batch(batch_func, batch, items_name, start)
+                    start += len(batch)
+            else:
+                with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                    pending = set()
+                    while True:
+                        while len(pending) < 2 * self.concurrency and (batch := list(islice(iterator, self.batch_size))):
+                            pending.add(pool.submit(self._write_batch, batch_func, batch, items_name, start))
+                            start += len(batch)
+                        if not pending:
+                            break
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            written += future.result()
+        finally:
+            self.close_sessions()
+
+        elapsed = time.perf_counter() - started_at
+        self.stats.append((items_name, written, elapsed))
+        rate = written / elapsed if elapsed > 0 else 0
+        print(f"Stage {items_name}: {written} items in {elapsed:.2f}s ({rate:.0f} items/s)")
+
+        return written
+
+
+def read_in_batches(driver, query, keys, batch_size=1000, **parameters):
+    """
+    Run a read query once per batch of keys, passed as the $keys list, and yield its records as the
+    server streams them. The session stays open until the generator is exhausted or closed.
+    """
+    iterator = iter(keys)
+    with driver.session(default_access_mode=neo4j.READ_ACCESS) as session:
+        while batch := list(islice(iterator, batch_size)):
+            yield from session.run(query, keys=batch, **parameters)
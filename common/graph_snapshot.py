@@ -0,0 +1,339 @@
+import argparse
+import json
+import mmap
+import os
+import sys
+from array import array
+
+import networkx as nx
+
+
+MAGIC = b'DKGGRPH1'
+ALIGNMENT = 8
+SNAPSHOT_EXTENSION = '.gsnap'
+
+# Attribute and node ID types, stored as strings in the string table like GraphML does
+VALUE_TYPES = {'str': str, 'int': int, 'float': float, 'bool': lambda value: value == 'True'}
+
+
+def _value_type(values, what):
+    types = {type(value).__name__ for value in values}
+    if len(types) > 1 or not types <= set(VALUE_TYPES):
+        raise ValueError(f"{what} must all be of one of the types {', '.join(VALUE_TYPES)}, got {', '.join(sorted(types))}.")
+    return types.pop() if types else 'str'
+
+
+class _BufferWriter:
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def add(self, data):
+        """
+        Append an array or bytes buffer and return its [offset, length, typecode] descriptor.
+        """
+        typecode = data.typecode if isinstance(data, array) else 'B'
+        data = data.tobytes() if isinstance(data, array) else bytes(data)
+
+        descriptor = [self.size, len(data), typecode]
+        padding = -len(data) % ALIGNMENT
+        self.chunks.append(data + b'\0' * padding)
+        self.size += len(data) + padding
+        return descriptor
+
+
+def _attribute_codes(items, intern, writer):
+    """
+    Encode the attributes of nodes or edges as one array of string codes per attribute name (-1
+    where an item does not have the attribute).
+    """
+    names = {}
+    for attrs in items:
+        for name in attrs:
+            names.setdefault(name, None)
+
+    encoded = []
+    for name in names:
+        values = [attrs.get(name) for attrs in items]
+        value_type = _value_type([value for value in values if value is not None], f"Values of attribute '{name}'")
+        codes = array('i', (-1 if value is None else intern(str(value)) for value in values))
+        encoded.append({'name': name, 'type': value_type, 'codes': writer.add(codes)})
+    return encoded
+
+
+def save_graph_snapshot(graph, file_path):
+    """
+    Write a Graph or DiGraph (or a graph with the same nodes/edges API) into a binary snapshot: nodes are numbered in insertion order, edges
+    are two arrays of node numbers, and node IDs and attribute values are interned in one string table.
+    """
+    if graph.is_multigraph():
+        raise ValueError("Multigraphs are not supported by graph snapshots.")
+
+    table = {}
+
+    def intern(value):
+        return table.setdefault(value, len(table))
+
+    nodes = list(graph.nodes(data=True))
+    node_index = {node: i for i, (node, _) in enumerate(nodes)}
+    edges = list(graph.edges(data=True))
+
+    writer = _BufferWriter()
+    header = {
+        'directed': graph.is_directed(),
+        'graph': graph.graph,
+        'nodes': len(nodes),
+        'edges': len(edges),
+        'byteorder': sys.byteorder,
+        'node_type': _value_type([node for node, _ in nodes], "Node IDs"),
+        'buffers': {
+            'node_ids': writer.add(array('i', (intern(str(node)) for node, _ in nodes))),
+            'sources': writer.add(array('i', (node_index[u] for u, _, _ in edges))),
+            'targets': writer.add(array('i', (node_index[v] for _, v, _ in edges))),
+        },
+        'node_attributes': _attribute_codes([attrs for _, attrs in nodes], intern, writer),
+        'edge_attributes': _attribute_codes([attrs for _, _, attrs in edges], intern, writer),
+    }
+
+    offsets = array('Q', [0])
+    position = 0
+    for value in table:
+        position += len(value)
+        offsets.append(position)
+    header['buffers']['string_offsets'] = writer.add(offsets)
+    header['buffers']['strings'] = writer.add(''.join(table).encode('utf-8'))
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * (-len(header_bytes) % ALIGNMENT)
+
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(len(header_bytes).to_bytes(8, 'little'))
+        file.write(header_bytes)
+        for chunk in writer.chunks:
+            file.write(chunk)
+    os.replace(temp_path, file_path)
+
+
+class GraphSnapshot:
+    """
+    Read-only view of a graph snapshot written by save_graph_snapshot.
+
+    With use_mmap the file is memory-mapped instead of read at once, and the node, edge and attribute
+    arrays are views of the mapping. The string table is decoded on first use.
+    """
+
+    def __init__(self, file_path, use_mmap=False):
+        self.file_path = file_path
+        self._file = None
+        self._mmap = None
+        self._views = []
+        self._strings = None
+
+        if use_mmap:
+            self._file = open(file_path, 'rb')
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._data = self._mmap
+        else:
+            with open(file_path, 'rb') as file:
+                self._data = file.read()
+
+        if self._data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{file_path} is not a graph snapshot file.")
+
+        header_length = int.from_bytes(self._data[8:16], 'little')
+        self._header = json.loads(self._data[16:16 + header_length])
+        self._data_start = 16 + header_length
+
+        buffers = self._header['buffers']
+        self._node_ids = self.buffer(buffers['node_ids'])
+        self._sources = self.buffer(buffers['sources'])
+        self._targets = self.buffer(buffers['targets'])
+        self._string_offsets = self.buffer(buffers['string_offsets'])
+        self._string_data = self.buffer(buffers['strings'])
+        self._node_type = VALUE_TYPES[self._header['node_type']]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def directed(self):
+        return self._header['directed']
+
+    @property
+    def node_count(self):
+        return self._header['nodes']
+
+    @property
+    def edge_count(self):
+        return self._header['edges']
+
+    @property
+    def node_attribute_names(self):
+        return [attribute['name'] for attribute in self._header['node_attributes']]
+
+    @property
+    def edge_attribute_names(self):
+        return [attribute['name'] for attribute in self._header['edge_attributes']]
+
+    def buffer(self, descriptor):
+        """
+        Return a typed view of one buffer of the file, without copying it when the byte order matches.
+        """
+        offset, length, typecode = descriptor
+        start = self._data_start + offset
+
+        if self._header['byteorder'] != sys.byteorder and typecode != 'B':
+            values = array(typecode)
+            values.frombytes(self._data[start:start + length])
+            values.byteswap()
+            return values
+
+        view = memoryview(self._data)[start:start + length].cast(typecode)
+        self._views.append(view)
+        return view
+
+    def string(self, code):
+        return self.strings()[code]
+
+    def strings(self):
+        """
+        Return the decoded string table.
+        """
+        if self._strings is None:
+            text = str(self._string_data, 'utf-8')
+            offsets = self._string_offsets
+            self._strings = [text[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+        return self._strings
+
+    def _attribute_dicts(self, attributes, count):
+        dicts = [{} for _ in range(count)]
+        strings = self.strings()
+        for attribute in attributes:
+            value_type = VALUE_TYPES[attribute['type']]
+            name = attribute['name']
+            for i, code in enumerate(self.buffer(attribute['codes'])):
+                if code != -1:
+                    dicts[i][name] = value_type(strings[code])
+        return dicts
+
+    def _attribute_values(self, attributes, name):
+        for attribute in attributes:
+            if attribute['name'] == name:
+                value_type = VALUE_TYPES[attribute['type']]
+                strings = self.strings()
+                return [None if code == -1 else value_type(strings[code]) for code in self.buffer(attribute['codes'])]
+        raise KeyError(name)
+
+    def node_attribute(self, name):
+        """
+        Return the values of a node attribute in node order, None for nodes without it.
+        """
+        return self._attribute_values(self._header['node_attributes'], name)
+
+    def edge_attribute(self, name):
+        """
+        Return the values of an edge attribute in edge order, None for edges without it.
+        """
+        return self._attribute_values(self._header['edge_attributes'], name)
+
+    def edge_node_numbers(self):
+        """
+        Return the source and target arrays of node numbers (positions in nodes()).
+        """
+        return self._sources, self._targets
+
+    def nodes(self):
+        """
+        Return the node IDs in their original order.
+        """
+        strings = self.strings()
+        return [self._node_type(strings[code]) for code in self._node_ids]
+
+    def edges(self):
+        """
+        Yield (source, target) node IDs.
+        """
+        nodes = self.nodes()
+        for u, v in zip(self._sources, self._targets):
+            yield nodes[u], nodes[v]
+
+    def to_networkx(self):
+        graph = nx.DiGraph() if self.directed else nx.Graph()
+        graph.graph.update(self._header['graph'])
+
+        nodes = self.nodes()
+        node_attributes = self._attribute_dicts(self._header['node_attributes'], self.node_count)
+        graph.add_nodes_from(zip(nodes, node_attributes))
+
+        edge_attributes = self._attribute_dicts(self._header['edge_attributes'], self.edge_count)
+        graph.add_edges_from((nodes[u], nodes[v], attrs)
+                             for u, v, attrs in zip(self._sources, self._targets, edge_attributes))
+        return graph
+
+    def close(self):
+        self._node_ids = self._sources = self._targets = None
+        self._string_offsets = self._string_data = None
+        for view in self._views:
+            view.release()
+        self._views.clear()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._data = None
+
+
+def load_graph_snapshot(file_path, use_mmap=False):
+    with GraphSnapshot(file_path, use_mmap) as snapshot:
+        return snapshot.to_networkx()
+
+
+def is_snapshot_path(file_path):
+    return os.path.splitext(file_path)[1].lower() == SNAPSHOT_EXTENSION
+
+
+def read_graph(file_path, use_mmap=False):
+    """
+    Read a graph saved as a snapshot (.gsnap) or as GraphML (any other extension).
+    """
+    if is_snapshot_path(file_path):
+        return load_graph_snapshot(file_path, use_mmap)
+    return nx.read_graphml(file_path)
+
+
+def write_graph(graph, file_path):
+    """
+    Write a graph as a snapshot (.gsnap) or as GraphML (any other extension). Graphs other than
+    networkx ones, such as CompactGraph, are converted with their to_networkx method for GraphML.
+    """
+    if is_snapshot_path(file_path):
+        save_graph_snapshot(graph, file_path)
+    else:
+        if not isinstance(graph, nx.Graph):
+            graph = graph.to_networkx()
+        nx.write_graphml(graph, file_path)
+
+
+def convert_graph(input_path, output_path):
+    """
+    Convert a graph between GraphML and snapshot files, the formats following the extensions.
+    """
+    write_graph(read_graph(input_path), output_path)
+    print(f"Graph {input_path} converted to {output_path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert a graph between GraphML and snapshot (.gsnap) files.")
+    parser.add_argument("input_file", help="Graph file to read.")
+    parser.add_argument("output_file", help="Graph file to write, the format follows the extension.")
+    args = parser.parse_args()
+
+    convert_graph(args.input_file, args.output_file)
@@ -0,0 +1,114 @@
+import csv
+import os
+import shlex
+
+
+ARRAY_DELIMITER = '|'
+IMPORT_SCRIPT = 'neo4j-admin-import.sh'
+
+
+def array_field(values):
+    """
+    Join values into one array field of a CSV file, skipping the missing ones.
+    """
+    return ARRAY_DELIMITER.join(value for value in values if value is not None) if values else ''
+
+
+def _write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerows(rows)
+
+
+class Neo4jAdminExport:
+    """
+    Node and relationship CSV files, each with its own header file, in the layout expected by
+    'neo4j-admin database import full'.
+
+    Every label has its own ID space, keyed on the property the graph classes MERGE on, so names
+    shared by nodes of different labels stay distinct. Duplicate IDs keep the last row (like
+    MERGE followed by SET) and relationships with a missing end node are skipped (like MATCH).
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.node_files = []
+        self.relationship_files = []
+        self.node_ids = {}
+        self.skipped_relationships = 0
+
+        os.makedirs(os.path.join(output_dir, 'nodes'), exist_ok=True)
+        os.makedirs(os.path.join(output_dir, 'relationships'), exist_ok=True)
+
+    def add_nodes(self, label, id_property, properties, rows):
+        """
+        Write the nodes of one label.
+
+        :param label: Node label, also used as ID space.
+        :param id_property: Name of the property holding the node ID.
+        :param properties: Header entries of the other columns (e.g. 'groups:string[]').
+        :param rows: Iterable of rows, the ID first.
+        """
+        unique_rows = {}
+        for row in rows:
+            if row[0] is not None:
+                unique_rows[row[0]] = row
+
+        header = os.path.join('nodes', f'{label}_header.csv')
+        data = os.path.join('nodes', f'{label}.csv')
+        _write_csv(os.path.join(self.output_dir, header), [[f'{id_property}:ID({label})'] + list(properties)])
+        _write_csv(os.path.join(self.output_dir, data), unique_rows.values())
+
+        self.node_ids[label] = set(unique_rows)
+        self.node_files.append((label, header, data))
+        print(f"Exported {len(unique_rows)} {label} nodes")
+
+    def add_relationships(self, rel_type, start_label, end_label, pairs):
+        """
+        Write relationships of one type between two labels. Nothing is written when no pair is left,
+        such as for the relationships of a None label, which have no node IDs.
+
+        :param pairs: Iterable of (start ID, end ID) pairs.
+        """
+        start_ids = self.node_ids.get(start_label, set())
+        end_ids = self.node_ids.get(end_label, set())
+
+        unique_pairs = set()
+        for start, end in pairs:
+            if start in start_ids and end in end_ids:
+                unique_pairs.add((start, end))
+            else:
+                self.skipped_relationships += 1
+
+        if not unique_pairs:
+            return
+
+        name = f'{start_label}-{rel_type}-{end_label}'
+        header = os.path.join('relationships', f'{name}_header.csv')
+        data = os.path.join('relationships', f'{name}.csv')
+        _write_csv(os.path.join(self.output_dir, header), [[f':START_ID({start_label})', f':END_ID({end_label})']])
+        _write_csv(os.path.join(self.output_dir, data), sorted(unique_pairs))
+
+        self.relationship_files.append((rel_type, header, data))
+        print(f"Exported {len(unique_pairs)} {name} relationships")
+
+    def write_import_script(self, database='neo4j'):
+        """
+        Write the neo4j-admin command importing every exported file into an empty database.
+        """
+        command = f'neo4j-admin database import full {shlex.quote(database)}'
+        arguments = [f'--array-delimiter={ARRAY_DELIMITER}', '--multiline-fields=true']
+        arguments += [f'--nodes={label}={header},{data}' for label, header, data in self.node_files]
+        arguments += [f'--relationships={rel_type}={header},{data}' for rel_type, header, data in self.relationship_files]
+
+        path = os.path.join(self.output_dir, IMPORT_SCRIPT)
+        with open(path, 'w') as script:
+            script.write('#!/bin/sh\n')
+            script.write('# Run with the database stopped, then start it and let the graph class create the constraints.\n')
+            script.write('cd "$(dirname "$0")" || exit 1\n')
+            script.write(' \\\n    '.join([command] + [shlex.quote(argument) for argument in arguments]) + '\n')
+        os.chmod(path, 0o755)
+
+        if self.skipped_relationships:
+            print(f"Skipped {self.skipped_relationships} relationships with a missing end node")
+        print(f"Import script saved to {path}")
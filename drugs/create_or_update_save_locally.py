@@ -1,7 +1,11 @@
 import os
 import sys
-from modules.extract_data import create_graph_save_locally, update_graph_save_locally
+# The modules shared by the pipelines are in the common directory of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.extract_data import create_graph_save_locally
+from modules.drug_delta import update_graph_save_locally, fingerprint_drugs, save_fingerprints, fingerprints_path
 from modules.custom_help_formater import create_or_update_save_locally_args
+from modules.neo4j_admin_export import export_drugbank_neo4j_admin
 
 
 def main():
@@ -15,10 +19,16 @@ def main():
         print(f"Error: Choose from actions [ create / update ].")
         sys.exit(1)
 
-    if args.action == "create":
-        create_graph_save_locally(args.input_file)
+    if args.format == "neo4j-admin":
+        if args.action != "create":
+            print(f"Error: The neo4j-admin export only supports the create action.")
+            sys.exit(1)
+        export_drugbank_neo4j_admin(args.input_file, args.output_dir, args.workers)
+    elif args.action == "create":
+        drugs = create_graph_save_locally(args.input_file, args.output_file, workers=args.workers, compact=args.compact_graph)
+        save_fingerprints(fingerprint_drugs(args.input_file, drugs), fingerprints_path(args.output_file))
     elif args.action == "update":
-        update_graph_save_locally(args.input_file, args.graph_file, args.output_file)
+        update_graph_save_locally(args.input_file, args.graph_file, args.output_file, args.workers, args.compact_graph)
 
 
 if __name__ == '__main__':
@@ -3,9 +3,15 @@ import logging
 import sys
 from pathlib import Path
 from dotenv import load_dotenv
+# The modules shared by the pipelines are in the common directory of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from modules.custom_help_formater import create_or_update_save_neo4j_args
 from modules.Neo4jDrugsGraphClass import Neo4jGraphClass
-from modules.extract_data import extract_drug_info, create_disease_nodes_and_relations, create_classification_relationships, load_from_pickle, create_classification_sets
+from modules.extraction_cache import extract_drug_info_cached
+from modules.drug_delta import (compute_drug_delta, print_drug_delta, delta_graph_data, fingerprint_drugs,
+                               load_fingerprints, save_fingerprints)
+from modules.columnar_store import open_columnar
+from modules.extract_data import iter_drug_info, new_classification_sets, classification_sets_to_tuple, split_drugs_by_type, create_disease_nodes_and_relations, create_classification_relationships, load_from_pickle, create_classification_sets
 
 def load_env_vars():
     env_path = Path('..', 'proba.env')
@@ -43,9 +49,26 @@ def main():
         print(f"The 'PASSWORD_DRUGS' environment variable is missing or is not a non-empty string.")
         sys.exit(1)
 
-    if args.action in ["create", "update"]:
+    if args.action == "update" and (state := load_fingerprints(args.fingerprints_file)) is not None:
         try:
-            biotech, small_molecule, kingdoms, superclasses, classes, subclasses, parents = extract_drug_info(args.input_file)
+            delta = compute_drug_delta(args.input_file, state, args.workers)
+            print_drug_delta(delta)
+
+            with Neo4jGraphClass(uri, user, password) as neo4j:
+                neo4j.apply_drug_delta(delta, delta_graph_data(delta), 1000, args.concurrency)
+
+            save_fingerprints(delta['state'], args.fingerprints_file)
+        except ValueError as e:
+            print(e.args[0])
+    elif args.action in ["create", "update"]:
+        try:
+            if args.no_cache:
+                classification_sets = new_classification_sets()
+                biotech, small_molecule = split_drugs_by_type(iter_drug_info(args.input_file, classification_sets, args.workers))
+                kingdoms, superclasses, classes, subclasses, parents = classification_sets_to_tuple(classification_sets)
+            else:
+                biotech, small_molecule, kingdoms, superclasses, classes, subclasses, parents = extract_drug_info_cached(
+                    args.input_file, args.cache_dir, args.workers)
 
             drugs = biotech + small_molecule
             relations = create_classification_relationships(drugs)
@@ -55,7 +78,9 @@ def main():
             with Neo4jGraphClass(uri, user, password) as neo4j:
                 neo4j.create_or_update_graph(drugs, kingdoms, superclasses, classes, subclasses, parents, relations,
                                              diseases,
-                                             disease_relations, 200)
+                                             disease_relations, 1000, args.concurrency)
+
+            save_fingerprints(fingerprint_drugs(args.input_file, drugs), args.fingerprints_file)
         except ValueError as e:
             print(e.args[0])
     # elif args.action == "delete":
@@ -69,21 +94,23 @@ def main():
 def debug():
     uri, user, password = load_env_vars()
 
-    biotech = load_from_pickle('data/extracted-biotech-drugs.pkl')
-    small_molecule = load_from_pickle('data/small-molecule-drugs.pkl')
+    columns = ['drugbank-id', 'type', 'name', 'state', 'groups', 'salts', 'classification', 'affected_organisms',
+               'external_links']
 
-    drugs = biotech + small_molecule
+    with open_columnar('data/extracted-biotech-drugs.col') as biotech, \
+            open_columnar('data/small-molecule-drugs.col') as small_molecule:
+        drugs = list(biotech.rows(columns)) + list(small_molecule.rows(columns))
 
     kingdoms, superclasses, classes, subclasses, parents = create_classification_sets(drugs)
 
     relations = create_classification_relationships(drugs)
 
-    diseases, disease_relations = create_disease_nodes_and_relations(drugs, "./data/extracted-diseases.pkl", "./data/extracted-disease-drug.tsv")
+    diseases, disease_relations = create_disease_nodes_and_relations(drugs, "./data/extracted-diseases.col", "./data/extracted-disease-drug.tsv")
 
     with Neo4jGraphClass(uri, user, password) as neo4j:
         neo4j.create_or_update_graph(drugs, kingdoms, superclasses, classes, subclasses, parents, relations,
                                      diseases,
-                                     disease_relations, 200)
+                                     disease_relations, 1000)
 
 
 if __name__ == '__main__':
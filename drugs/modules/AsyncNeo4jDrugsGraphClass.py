@@ -0,0 +1,108 @@
+import neo4j.exceptions
+from neo4j import AsyncGraphDatabase
+from common.async_batch_writer import prepare_statements, run_statements, write_stage
+from modules.Neo4jDrugsGraphClass import (create_constraints, add_root_node, add_unclassified_node,
+                                          add_kingdom_nodes, add_superclass_nodes, add_class_nodes,
+                                          add_subclass_nodes, add_parent_nodes, add_or_update_drug_nodes,
+                                          add_disease_nodes, add_or_update_relationships, delete_drug_node,
+                                          delete_any_node, delete_relationship)
+
+
+class AsyncNeo4jGraphClass:
+    def __init__(self, uri, user, password):
+        """
+        Initialize the AsyncNeo4jGraphClass with the provided URI, user, and password.
+        """
+        self.uri = uri
+        self.user = user
+        self.password = password
+        self.driver = None
+
+    async def __aenter__(self):
+        """
+        Establish a connection to the Neo4j database.
+        """
+        try:
+            self.driver = AsyncGraphDatabase.driver(self.uri, auth=(self.user, self.password))
+            await self.driver.verify_connectivity()
+        except neo4j.exceptions.ConfigurationError:
+            print("URI format is not supported! Check your uri environment variable.")
+        except neo4j.exceptions.AuthError:
+            print("Authentication failure! Check your auth environment variables.")
+        except neo4j.exceptions.ServiceUnavailable:
+            print("Could not establish a connection with Neo4j database!")
+        except ValueError:
+            print("Unknown exception")
+
+        await self.write(create_constraints)
+
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """
+        Close the connection to the Neo4j database.
+        """
+        if self.driver:
+            await self.driver.close()
+
+    async def write(self, work, *args):
+        """
+        Run a transaction function of Neo4jDrugsGraphClass in its own write transaction.
+        """
+        async with self.driver.session() as session:
+            await session.execute_write(run_statements, prepare_statements(work, *args))
+
+    async def create_or_update_graph(self, drugs, kingdoms, superclasses, classes, subclasses, parents, relationships, diseases, disease_relations, batch_size=1000):
+        """
+        Save the graph data into the Neo4j database.
+
+        Steps:\n
+        1. Add a root node labeled 'Root' with the name 'Kingdoms'.
+        2. Add 'Unclassified' node for drug nodes that are missing classification.
+        3. Add classification and drug nodes in batches.
+        4. Add relationships between nodes in batches.
+
+        :param drugs: Iterable of drugs dictionaries with attributes.
+        :param kingdoms: Iterable of kingdom node names.
+        :param superclasses: Iterable of superclass node names.
+        :param classes: Iterable of class node names.
+        :param subclasses: Iterable of subclass node names.
+        :param parents: Iterable of parent node names.
+        :param relationships: Iterable of all relationships.
+        :param diseases: Iterable of all diseases.
+        :param disease_relations: Iterable of all disease-drug relations, such as the generator of create_disease_nodes_and_relations.
+        :param batch_size: Number of items sent per UNWIND statement and transaction (default: 1000).
+        """
+        def by_node_types(rel):
+            return str(rel[0]), str(rel[2])
+
+        async with self.driver.session() as session:
+            try:
+                await session.execute_write(run_statements, prepare_statements(add_root_node))
+                print(f"Root node added")
+                await session.execute_write(run_statements, prepare_statements(add_unclassified_node))
+                print(f"Unclassified node added")
+            except neo4j.exceptions.ConstraintError:
+                pass
+
+            await write_stage(session, kingdoms, add_kingdom_nodes, "kingdoms", batch_size)
+            await write_stage(session, superclasses, add_superclass_nodes, "superclasses", batch_size)
+            await write_stage(session, classes, add_class_nodes, "classes", batch_size)
+            await write_stage(session, subclasses, add_subclass_nodes, "subclasses", batch_size)
+            await write_stage(session, parents, add_parent_nodes, "parents", batch_size)
+
+            await write_stage(session, drugs, add_or_update_drug_nodes, "drugs", batch_size)
+            await write_stage(session, sorted(relationships, key=by_node_types), add_or_update_relationships, "relationships", batch_size)
+
+            await write_stage(session, diseases, add_disease_nodes, 'diseases', batch_size)
+            # Every disease relation is Disease -> Drug, so the generator of the join is written as it is consumed
+            await write_stage(session, disease_relations, add_or_update_relationships, 'disease-drug-relations', batch_size)
+
+    async def delete_drug_node(self, drug_name):
+        await self.write(delete_drug_node, drug_name)
+
+    async def delete_any_node(self, node_type, node_name):
+        await self.write(delete_any_node, node_type, node_name)
+
+    async def delete_relationship(self, relationship):
+        await self.write(delete_relationship, relationship)
@@ -1,5 +1,13 @@
 import neo4j.exceptions
 from neo4j import GraphDatabase
+from common.batch_writer import BatchWriter, read_in_batches
+
+NODE_TYPES = {'Unclassified', 'Root', 'Kingdom', 'Superclass', 'Class', 'Subclass', 'Parent', 'Drug', 'Disease'}
+# Relationships of the classification tree, pointing from a node to the nodes below it
+TREE_RELATIONSHIPS = ('HAS_KINGDOM', 'HAS_UNCLASSIFIED', 'HAS_SUPERCLASS', 'HAS_CLASS', 'HAS_SUBCLASS', 'HAS_PARENT', 'HAS_DRUG')
+# Root -> Kingdom -> Superclass -> Class -> Subclass -> Parent -> Drug
+TREE_DEPTH = 6
+
 
 def create_constraints(tx):
     tx.run("CREATE CONSTRAINT IF NOT EXISTS FOR (k:Kingdom) REQUIRE k.name IS UNIQUE ")
@@ -9,6 +17,7 @@ def create_constraints(tx):
     tx.run("CREATE CONSTRAINT IF NOT EXISTS FOR (sbc:Subclass) REQUIRE sbc.name IS UNIQUE ")
     tx.run("CREATE CONSTRAINT IF NOT EXISTS FOR (p:Parent) REQUIRE p.name IS UNIQUE ")
     tx.run("CREATE CONSTRAINT IF NOT EXISTS FOR (d:Drug) REQUIRE d.name IS UNIQUE")
+    tx.run("CREATE CONSTRAINT IF NOT EXISTS FOR (ds:Disease) REQUIRE ds.name IS UNIQUE")
 
 
 def add_root_node(tx):
@@ -28,107 +37,117 @@ def add_unclassified_node(tx):
 
 def add_kingdom_nodes(tx, kingdoms):
     """
-    Add kingdom node for each kingdom in the list.
+    Add kingdom node for each kingdom in the list, in a single UNWIND statement.
     """
-    for kingdom in kingdoms:
-        query = "MERGE (k:Kingdom {name: $name})"
-        try:
-            tx.run(query, name=kingdom)
-        except neo4j.exceptions.TransactionError:
-            continue
+    query = "UNWIND $names AS name MERGE (k:Kingdom {name: name})"
+    tx.run(query, names=list(kingdoms))
 
 def add_superclass_nodes(tx, superclasses):
     """
-    Add superclass node for each superclass in the list.
+    Add superclass node for each superclass in the list, in a single UNWIND statement.
     """
-    for superclass in superclasses:
-        query = "MERGE (spc:Superclass {name: $name})"
-        try:
-            tx.run(query, name=superclass)
-        except neo4j.exceptions.TransactionError:
-            continue
+    query = "UNWIND $names AS name MERGE (spc:Superclass {name: name})"
+    tx.run(query, names=list(superclasses))
 
 def add_class_nodes(tx, classes):
     """
-    Add class node for each class in the list.
+    Add class node for each class in the list, in a single UNWIND statement.
     """
-    for cls in classes:
-        query = "MERGE (c:Class {name: $name})"
-        try:
-            tx.run(query, name=cls)
-        except neo4j.exceptions.TransactionError:
-            continue
+    query = "UNWIND $names AS name MERGE (c:Class {name: name})"
+    tx.run(query, names=list(classes))
 
 def add_subclass_nodes(tx, subclasses):
     """
-    Add subclass node for each subclass in the list.
+    Add subclass node for each subclass in the list, in a single UNWIND statement.
     """
-    for subclass in subclasses:
-        query = "MERGE (sbc:Subclass {name: $name})"
-        try:
-            tx.run(query, name=subclass)
-        except neo4j.exceptions.TransactionError:
-            continue
+    query = "UNWIND $names AS name MERGE (sbc:Subclass {name: name})"
+    tx.run(query, names=list(subclasses))
 
 def add_parent_nodes(tx, parents):
     """
-    Add parent node for each parent in the list.
+    Add parent node for each parent in the list, in a single UNWIND statement.
     """
-    for parent in parents:
-        query = "MERGE (p:Parent {name: $name})"
-        try:
-            tx.run(query, name=parent)
-        except neo4j.exceptions.TransactionError:
-            continue
+    query = "UNWIND $names AS name MERGE (p:Parent {name: name})"
+    tx.run(query, names=list(parents))
 
 
 def add_or_update_drug_nodes(tx, drugs):
     """
-    Add drug nodes with given attributes.
+    Add drug nodes with given attributes, sending the whole batch as one list parameter.
     """
-    for drug in drugs:
-        query = (
-            "MERGE (d:Drug {name: $name}) "
-            "SET d.drugbank_id=$id, d.type = $type, d.state = $state, d.groups = $groups, d.salts = $salts, d.affected_organisms = $affected_organisms, d.external_links = $external_links"
-        )
-        try:
-            tx.run(query, name=drug['name'], id=drug['drugbank-id'], type=drug['type'],
-                   state=drug['state'], groups=drug['groups'], salts=drug['salts'], affected_organisms=drug['affected_organisms'], external_links=drug['external_links'])
-        except neo4j.exceptions.TransactionError:
-            continue
+    query = (
+        "UNWIND $rows AS row "
+        "MERGE (d:Drug {name: row.name}) "
+        "SET d.drugbank_id = row.id, d.type = row.type, d.state = row.state, d.groups = row.groups, d.salts = row.salts, d.affected_organisms = row.affected_organisms, d.external_links = row.external_links"
+    )
+    rows = [
+        {'name': drug['name'], 'id': drug['drugbank-id'], 'type': drug['type'], 'state': drug['state'],
+         'groups': drug['groups'], 'salts': drug['salts'], 'affected_organisms': drug['affected_organisms'],
+         'external_links': drug['external_links']}
+        for drug in drugs
+    ]
+    tx.run(query, rows=rows)
 
 
 def add_disease_nodes(tx, diseases):
     """
-        Add disease nodes with given attributes.
+    Add disease nodes with given attributes, sending the whole batch as one list parameter.
     """
-    for d in diseases:
-        query = (
-            "MERGE (d:Disease {name: $name}) "
-            "SET d.do_id=$id, d.definition = $definition, d.synonyms = $synonyms"
-        )
-        try:
-            tx.run(query, name=d['name'], id=d['doid'], definition=d['definition'],
-                   synonyms=d['synonyms'])
-        except neo4j.exceptions.TransactionError:
-            continue
+    query = (
+        "UNWIND $rows AS row "
+        "MERGE (d:Disease {name: row.name}) "
+        "SET d.do_id = row.id, d.definition = row.definition, d.synonyms = row.synonyms"
+    )
+    rows = [
+        {'name': d['name'], 'id': d['doid'], 'definition': d['definition'], 'synonyms': d['synonyms']}
+        for d in diseases
+    ]
+    tx.run(query, rows=rows)
+
+def relationship_pattern(source_type, target_type):
+    """
+    Return the pattern of the relationship between the source node (a) and the target node (b).
+    Disease relationships point from the drug to the disease, all others from the source to the target.
+    """
+    if source_type == 'Disease':
+        return "(b)-[r:INDICATES]->(a)"
+    return f"(a)-[r:HAS_{str(target_type).upper()}]->(b)"
 
-def add_or_update_relationships(tx, relationships):
+
+def group_relationships(relationships):
     """
-    Create relationship between any 2 types of nodes.
+    Group relationship tuples by (source type, target type) into lists of name pairs.
+    Returns None if a relationship has an invalid format.
     """
-    types = {'Unclassified', 'Root', 'Kingdom', 'Superclass', 'Class','Subclass', 'Parent', 'Drug', 'Disease'}
+    groups = {}
 
     for rel in relationships:
-        if len(rel) != 4 or rel[0] not in types or rel[2] not in types:
-            print("Invalid relationship format")
-            return
+        if len(rel) != 4 or rel[0] not in NODE_TYPES or rel[2] not in NODE_TYPES:
+            return None
+        groups.setdefault((rel[0], rel[2]), []).append({'source': rel[1], 'target': rel[3]})
 
-        if rel[0] == 'Disease':
-            query = f"MATCH (a:{rel[0]} {{name: \"{rel[1]}\"}}), (b:{rel[2]} {{name: \"{rel[3]}\"}}) MERGE (b)-[:INDICATES]->(a)"
-        else:
-            query = f"MATCH (a:{rel[0]} {{name: \"{rel[1]}\"}}), (b:{rel[2]} {{name: \"{rel[3]}\"}}) MERGE (a)-[:HAS_{str(rel[2]).upper()}]->(b)"
-        tx.run(query)
+    return groups
+
+
+def add_or_update_relationships(tx, relationships):
+    """
+    Create relationship between any 2 types of nodes.
+
+    Relationships are grouped by node types and every group is sent as one UNWIND statement, so the
+    query text only depends on the types and its plan is reused across batches.
+    """
+    groups = group_relationships(relationships)
+    if groups is None:
+        print("Invalid relationship format")
+        return
+
+    for (source_type, target_type), pairs in groups.items():
+        query = (
+            f"UNWIND $pairs AS pair "
+            f"MATCH (a:{source_type} {{name: pair.source}}), (b:{target_type} {{name: pair.target}}) "
+            f"MERGE {relationship_pattern(source_type, target_type)}"
+        )
+        tx.run(query, pairs=pairs)
 
 
 def delete_drug_node(tx, drug_name):
@@ -142,35 +161,101 @@ def delete_drug_node(tx, drug_name):
     tx.run(query, name=drug_name)
 
 
+def delete_drug_nodes(tx, drug_names):
+    """
+    Delete drug nodes and their relationships, sending the whole batch as one list parameter.
+    """
+    query = "UNWIND $names AS name MATCH (n:Drug {name: name}) DETACH DELETE n"
+    tx.run(query, names=list(drug_names))
+
+
 def delete_any_node(tx, node_type, node_name):
     """
     Delete any node type by its name.
     """
-    query = f"MATCH (n:{node_type} {{name: \"{node_name}\"}}) DETACH DELETE n"
-    tx.run(query)
+    if node_type not in NODE_TYPES:
+        print("Invalid node type")
+        return
+
+    query = f"MATCH (n:{node_type} {{name: $name}}) DETACH DELETE n"
+    tx.run(query, name=node_name)
+
+
+def delete_nodes(tx, nodes):
+    """
+    Delete nodes given as (node type, name) pairs and their relationships, one UNWIND statement per node type.
+    """
+    names_by_type = {}
+    for node_type, name in nodes:
+        if node_type not in NODE_TYPES:
+            print("Invalid node type")
+            return
+        names_by_type.setdefault(node_type, []).append(name)
+
+    for node_type, names in names_by_type.items():
+        tx.run(f"UNWIND $names AS name MATCH (n:{node_type} {{name: name}}) DETACH DELETE n", names=names)
 
 
 def delete_relationship(tx, relationship):
     """
     Delete the relationship between 2 nodes of any type.
     """
-    types = {'Unclassified', 'Root', 'Kingdom', 'Superclass', 'Subclass', 'Parent', 'Drug'}
+    if len(relationship) != 4 or relationship[0] not in NODE_TYPES or relationship[2] not in NODE_TYPES:
+        print("Invalid relationship format")
+        return
+
+    query = (f"MATCH (a:{relationship[0]} {{name: $source}}), (b:{relationship[2]} {{name: $target}}) "
+             f"MATCH {relationship_pattern(relationship[0], relationship[2])} "
+             f"DELETE r")
+    tx.run(query, source=relationship[1], target=relationship[3])
+
 
-    if len(relationship) != 4 or relationship[0] not in types or relationship[2] not in types:
+def delete_relationships(tx, relationships):
+    """
+    Delete relationships between any 2 types of nodes, one UNWIND statement per group of node types.
+    """
+    groups = group_relationships(relationships)
+    if groups is None:
         print("Invalid relationship format")
         return
 
-    query = (f'MATCH (a:{relationship[0]} {{name: {relationship[1]}}})-[r:HAS_{str(relationship[2]).upper()}]->(b:{relationship[2]} {{name: \"{relationship[3]}\"}})'
-             f'DELETE r')
-    tx.run(query)
+    for (source_type, target_type), pairs in groups.items():
+        query = (
+            f"UNWIND $pairs AS pair "
+            f"MATCH (a:{source_type} {{name: pair.source}}), (b:{target_type} {{name: pair.target}}) "
+            f"MATCH {relationship_pattern(source_type, target_type)} "
+            f"DELETE r"
+        )
+        tx.run(query, pairs=pairs)
 
 
-def get_node_and_nodes_belonging(tx, node_type, node_name):
-    query = f'MATCH path = (n:{node_type} {{name: "{node_name}"}})-[*]->(n) RETURN nodes(path)'
+def nodes_query(node_type):
+    """
+    Return the query looking up nodes of one type by name, through the unique name constraint of the label.
+    """
+    if node_type not in NODE_TYPES:
+        raise ValueError(f"Invalid node type {node_type}.")
 
+    return (f"UNWIND $keys AS key "
+            f"MATCH (n:{node_type} {{name: key}}) "
+            f"RETURN elementId(n) AS node_id, n")
 
-def get_node_and_nodes_belonging_with_relationships(tx, node_type, node_name):
-    query = f'MATCH p=(n:{node_type} {{name: "{node_name}"}})-[*]->() RETURN p'
+
+def subtree_query(node_type, max_depth, target_type=None):
+    """
+    Return the query of the nodes below named nodes of one type in the classification tree, at most
+    max_depth relationships down, with their smallest depth. Only nodes of target_type are returned if given.
+    """
+    if node_type not in NODE_TYPES or (target_type is not None and target_type not in NODE_TYPES):
+        raise ValueError(f"Invalid node type {target_type if node_type in NODE_TYPES else node_type}.")
+    if int(max_depth) < 1:
+        raise ValueError("The subtree depth must be at least 1.")
+
+    target = f"m:{target_type}" if target_type else "m"
+    return (f"UNWIND $keys AS key "
+            f"MATCH path = (n:{node_type} {{name: key}})-[:{'|'.join(TREE_RELATIONSHIPS)}*1..{int(max_depth)}]->({target}) "
+            f"WITH key, m, min(length(path)) AS depth "
+            f"RETURN key, depth, elementId(m) AS node_id, m")
 
 
 def print_plant_node_details(node):
@@ -222,7 +307,7 @@ class Neo4jGraphClass:
         if self.driver:
             self.driver.close()
 
-    def create_or_update_graph(self, drugs, kingdoms, superclasses, classes, subclasses, parents, relationships, diseases, disease_relations, batch_size=300):
+    def create_or_update_graph(self, drugs, kingdoms, superclasses, classes, subclasses, parents, relationships, diseases, disease_relations, batch_size=1000, concurrency=1):
         """
         Save the graph data into the Neo4j database.
 
@@ -232,6 +317,9 @@ class Neo4jGraphClass:
         3. Add classification and drug nodes in batches.
         4. Add relationships between nodes in batches.
 
+        Every step is finished before the next one starts. Inside a step, up to concurrency batches
+        are committed at the same time, each through its own session.
+
         :param drugs: List of drugs dictionaries with attributes.
         :param kingdoms: List of kingdom node names.
         :param superclasses: List of superclass node names.
@@ -240,43 +328,94 @@ class Neo4jGraphClass:
         :param parents: List of parent node names.
         :param relationships: List of all relationships.
         :param diseases: List of all diseases.
-        :param disease_relations: List of all disease-drug relations.
-        :param batch_size: Number of items to process per batch (default: 300).
+        :param disease_relations: Iterable of all disease-drug relations, such as the generator of create_disease_nodes_and_relations.
+        :param batch_size: Number of items sent per UNWIND statement and transaction (default: 1000).
+        :param concurrency: Maximum number of batches committed in parallel (default: 1).
+        :return: List of (stage name, items written, seconds) tuples.
         """
-        with self.driver.session() as session:
-            def process_batches(items, batch_func, items_name):
-                items_list = list(items)
-                total_items = len(items_list)
+        writer = BatchWriter(self.driver, batch_size, concurrency)
+
+        try:
+            writer.write(add_root_node)
+            print(f"Root node added")
+            writer.write(add_unclassified_node)
+            print(f"Unclassified node added")
+        finally:
+            writer.close_sessions()
+
+        writer.write_stage(kingdoms, add_kingdom_nodes, "kingdoms")
+        writer.write_stage(superclasses, add_superclass_nodes, "superclasses")
+        writer.write_stage(classes, add_class_nodes, "classes")
+        writer.write_stage(subclasses, add_subclass_nodes, "subclasses")
+        writer.write_stage(parents, add_parent_nodes, "parents")
+
+        def by_node_types(rel):
+            return str(rel[0]), str(rel[2])
+
+        writer.write_stage(drugs, add_or_update_drug_nodes, "drugs")
+        writer.write_stage(sorted(relationships, key=by_node_types), add_or_update_relationships, "relationships")
 
-                for i in range(0, total_items, batch_size):
-                    end_index = min(i + batch_size, total_items)
-                    batch = items_list[i:end_index]
-                    try:
-                        session.execute_write(batch_func, batch)
-                    except neo4j.exceptions.ConstraintError:
-                        pass
-                    print(f"Processed {items_name} from {i} to {i + len(batch)}")
+        writer.write_stage(diseases, add_disease_nodes, 'diseases')
+        # Every disease relation is Disease -> Drug, so the generator of the join is written as it is consumed
+        writer.write_stage(disease_relations, add_or_update_relationships, 'disease-drug-relations')
 
-            try:
-                session.execute_write(add_root_node)
-                print(f"Root node added")
-                session.execute_write(add_unclassified_node)
-                print(f"Unclassified node added")
-            except neo4j.exceptions.ConstraintError:
-                pass
+        return writer.stats
 
+    def apply_drug_delta(self, delta, graph_data, batch_size=1000, concurrency=1):
+        """
+        Apply a drug delta (see drug_delta.compute_drug_delta) to the database: the nodes of updated
+        and removed drugs are deleted with their relationships, with the classification relationships
+        and nodes no drug uses anymore, then the changed drugs and added classification nodes are
+        written with create_or_update_graph. Disease nodes are kept.
+
+        :param delta: Drug delta.
+        :param graph_data: The create_or_update_graph arguments of the delta (see drug_delta.delta_graph_data).
+        :return: List of (stage name, items written, seconds) tuples.
+        """
+        writer = BatchWriter(self.driver, batch_size, concurrency)
+        writer.write_stage([name for name in delta['deleted_names'] if name is not None], delete_drug_nodes, "deleted drugs")
+        writer.write_stage(sorted(delta['removed_relationships'], key=lambda rel: (str(rel[0]), str(rel[2]))),
+                           delete_relationships, "removed relationships")
+        writer.write_stage(delta['removed_classifications'], delete_nodes, "removed classification nodes")
 
+        return writer.stats + self.create_or_update_graph(*graph_data, batch_size, concurrency)
 
-            process_batches(kingdoms, add_kingdom_nodes, "kingdoms")
-            process_batches(superclasses, add_superclass_nodes, "superclasses")
-            process_batches(classes, add_class_nodes, "classes")
-            process_batches(subclasses, add_subclass_nodes, "subclasses")
-            process_batches(parents, add_parent_nodes, "parents")
+    def get_nodes(self, node_type, names, batch_size=1000):
+        """
+        Look up nodes of one type by name, sending the names in batches as one list parameter.
+        Names without a node are skipped.
 
-            process_batches(drugs, add_or_update_drug_nodes, "drugs")
-            process_batches(relationships, add_or_update_relationships, "relationships")
+        :param node_type: Node label, one of NODE_TYPES.
+        :param names: Iterable of node names, consumed lazily.
+        :param batch_size: Number of names per query (default: 1000).
+        :return: Generator of (node_id, node) tuples, streamed as they are read.
+        """
+        return ((record['node_id'], record['n'])
+                for record in read_in_batches(self.driver, nodes_query(node_type), names, batch_size))
 
-            process_batches(diseases, add_disease_nodes, 'diseases')
-            process_batches(disease_relations, add_or_update_relationships, 'disease-drug-relations')
+    def get_drug_nodes(self, drug_names, batch_size=1000):
+        return self.get_nodes('Drug', drug_names, batch_size)
 
+    def get_disease_nodes(self, disease_names, batch_size=1000):
+        return self.get_nodes('Disease', disease_names, batch_size)
 
+    def get_subtrees(self, node_type, names, max_depth=TREE_DEPTH, target_type=None, batch_size=1000):
+        """
+        Fetch the nodes below named nodes in the classification tree, such as the drugs of a kingdom.
+
+        :param node_type: Label of the named nodes, such as 'Kingdom' or 'Class'.
+        :param names: Iterable of node names, consumed lazily.
+        :param max_depth: Maximum number of relationships between a named node and the returned nodes.
+        :param target_type: Only return nodes with this label, such as 'Drug' (default: every node).
+        :param batch_size: Number of names per query (default: 1000).
+        :return: Generator of (name, depth, node_id, node) tuples, streamed as they are read.
+        """
+        query = subtree_query(node_type, max_depth, target_type)
+        return ((record['key'], record['depth'], record['node_id'], record['m'])
+                for record in read_in_batches(self.driver, query, names, batch_size))
+
+    def get_kingdom_drugs(self, kingdoms, batch_size=1000):
+        """
+        Fetch the drugs classified under each kingdom, as (kingdom, depth, node_id, drug) tuples.
+        """
+        return self.get_subtrees('Kingdom', kingdoms, TREE_DEPTH - 1, 'Drug', batch_size)
@@ -0,0 +1,379 @@
+import argparse
+import json
+import mmap
+import os
+import pickle
+import sys
+from array import array
+
+
+MAGIC = b'DKGCOLS1'
+ALIGNMENT = 8
+
+CLASSIFICATION_LEVELS = ('kingdom', 'superclass', 'class', 'subclass', 'parent')
+
+# Column kinds:
+#   str            one optional string per row
+#   category       one optional string per row, interned in a string table
+#   category_list  a list of interned strings per row
+#   str_list       a list of optional strings per row
+#   record_list    a list of records per row, one string field per name
+#   classification the drug classification dictionary (or None), one category per level
+DRUG_COLUMNS = [
+    ('drugbank-id', 'str'),
+    ('type', 'category'),
+    ('name', 'str'),
+    ('state', 'category'),
+    ('groups', 'category_list'),
+    ('salts', 'str_list'),
+    ('classification', 'classification'),
+    ('affected_organisms', 'category_list'),
+    ('food_interactions', 'str_list'),
+    ('drug_interactions', 'record_list', ('name', 'description')),
+    ('external_links', 'str_list'),
+]
+
+DISEASE_COLUMNS = [
+    ('name', 'str'),
+    ('doid', 'str'),
+    ('definition', 'str'),
+    ('synonyms', 'str_list'),
+]
+
+
+class _BufferWriter:
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def add(self, data):
+        """
+        Append an array or bytes buffer and return its [offset, length, typecode] descriptor.
+        """
+        typecode = data.typecode if isinstance(data, array) else 'B'
+        data = data.tobytes() if isinstance(data, array) else bytes(data)
+
+        descriptor = [self.size, len(data), typecode]
+        padding = -len(data) % ALIGNMENT
+        self.chunks.append(data + b'\0' * padding)
+        self.size += len(data) + padding
+        return descriptor
+
+
+def _encode_strings(values, writer):
+    offsets = array('Q', [0])
+    nulls = bytearray(len(values))
+    chunks = []
+    position = 0
+
+    for i, value in enumerate(values):
+        if value is None:
+            nulls[i] = 1
+        else:
+            encoded = value.encode('utf-8')
+            chunks.append(encoded)
+            position += len(encoded)
+        offsets.append(position)
+
+    return {'offsets': writer.add(offsets), 'data': writer.add(b''.join(chunks)), 'nulls': writer.add(nulls)}
+
+
+def _encode_categories(values, writer):
+    table = {}
+    codes = array('i', (-1 if value is None else table.setdefault(value, len(table)) for value in values))
+    return {'table': _encode_strings(list(table), writer), 'codes': writer.add(codes)}
+
+
+def _row_offsets(lists):
+    offsets = array('Q', [0])
+    position = 0
+    for values in lists:
+        position += len(values)
+        offsets.append(position)
+    return offsets
+
+
+def _encode_column(kind, fields, values, writer):
+    if kind == 'str':
+        return _encode_strings(values, writer)
+    if kind == 'category':
+        return _encode_categories(values, writer)
+    if kind == 'category_list':
+        encoded = _encode_categories([value for row in values for value in row], writer)
+        encoded['rows'] = writer.add(_row_offsets(values))
+        return encoded
+    if kind == 'str_list':
+        encoded = _encode_strings([value for row in values for value in row], writer)
+        encoded['rows'] = writer.add(_row_offsets(values))
+        return encoded
+    if kind == 'record_list':
+        records = [record for row in values for record in row]
+        return {
+            'rows': writer.add(_row_offsets(values)),
+            'fields': {field: _encode_strings([record[field] for record in records], writer) for field in fields},
+        }
+    if kind == 'classification':
+        return {
+            level: _encode_categories([value[level] if value is not None else None for value in values], writer)
+            for level in CLASSIFICATION_LEVELS
+        }
+    raise ValueError(f"Unknown column kind '{kind}'.")
+
+
+def save_columnar(records, columns, file_path):
+    """
+    Write records (dictionaries) into a columnar file.
+
+    :param records: Iterable of dictionaries holding every column of the schema.
+    :param columns: Schema, a list of (name, kind) or (name, 'record_list', fields) tuples.
+    :param file_path: Output file path.
+    """
+    values = {column[0]: [] for column in columns}
+    count = 0
+    for record in records:
+        for name, column_values in values.items():
+            column_values.append(record[name])
+        count += 1
+
+    writer = _BufferWriter()
+    header = {'rows': count, 'byteorder': sys.byteorder, 'columns': []}
+    for name, kind, *fields in columns:
+        fields = fields[0] if fields else ()
+        header['columns'].append({
+            'name': name,
+            'kind': kind,
+            'fields': list(fields),
+            'buffers': _encode_column(kind, fields, values.pop(name), writer),
+        })
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * (-len(header_bytes) % ALIGNMENT)
+
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(len(header_bytes).to_bytes(8, 'little'))
+        file.write(header_bytes)
+        for chunk in writer.chunks:
+            file.write(chunk)
+    os.replace(temp_path, file_path)
+
+
+def convert_pickle(pickle_path, output_path, columns):
+    """
+    Convert the pickled list of dictionaries written by older extractions (extracted-diseases.pkl,
+    extracted-biotech-drugs.pkl, small-molecule-drugs.pkl) into a columnar file.
+    """
+    with open(pickle_path, 'rb') as pickle_file:
+        records = pickle.load(pickle_file)
+
+    save_columnar(records, columns, output_path)
+    print(f"{len(records)} records of {pickle_path} converted to {output_path}")
+
+
+def ensure_columnar(file_path, columns):
+    """
+    Return the columnar file to read for file_path. When file_path is a pickle of an older
+    extraction, or a missing .col file with such a pickle next to it, the pickle is converted once
+    into the .col file next to it.
+    """
+    base, extension = os.path.splitext(file_path)
+    if extension == '.pkl' or not os.path.exists(file_path):
+        pickle_path, file_path = f"{base}.pkl", f"{base}.col"
+        if not os.path.exists(file_path) and os.path.exists(pickle_path):
+            convert_pickle(pickle_path, file_path, columns)
+    return file_path
+
+
+def save_drug_columns(drugs, file_path):
+    save_columnar(drugs, DRUG_COLUMNS, file_path)
+
+
+def save_disease_columns(diseases, file_path):
+    save_columnar(diseases, DISEASE_COLUMNS, file_path)
+
+
+class _StringColumn:
+    def __init__(self, store, buffers):
+        self.offsets = store.buffer(buffers['offsets'])
+        self.data = store.buffer(buffers['data'])
+        self.nulls = store.buffer(buffers['nulls'])
+
+    def __len__(self):
+        return len(self.nulls)
+
+    def __getitem__(self, i):
+        if self.nulls[i]:
+            return None
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+
+class _CategoryColumn:
+    def __init__(self, store, buffers):
+        table = _StringColumn(store, buffers['table'])
+        self.table = [table[i] for i in range(len(table))]
+        self.codes = store.buffer(buffers['codes'])
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        code = self.codes[i]
+        return self.table[code] if code != -1 else None
+
+
+class _ListColumn:
+    def __init__(self, rows, values):
+        self.rows = rows
+        self.values = values
+
+    def __len__(self):
+        return len(self.rows) - 1
+
+    def __getitem__(self, i):
+        return [self.values[j] for j in range(self.rows[i], self.rows[i + 1])]
+
+
+class _RecordListColumn:
+    def __init__(self, store, buffers):
+        self.rows = store.buffer(buffers['rows'])
+        self.fields = {field: _StringColumn(store, field_buffers) for field, field_buffers in buffers['fields'].items()}
+
+    def __len__(self):
+        return len(self.rows) - 1
+
+    def __getitem__(self, i):
+        return [{field: column[j] for field, column in self.fields.items()} for j in range(self.rows[i], self.rows[i + 1])]
+
+
+class _ClassificationColumn:
+    def __init__(self, store, buffers):
+        self.levels = {level: _CategoryColumn(store, buffers[level]) for level in CLASSIFICATION_LEVELS}
+
+    def __len__(self):
+        return len(self.levels['kingdom'])
+
+    def __getitem__(self, i):
+        classification = {level: column[i] for level, column in self.levels.items()}
+        if all(value is None for value in classification.values()):
+            return None
+        return classification
+
+
+class ColumnarStore:
+    """
+    Read-only, memory-mapped view of a columnar file written by save_columnar.
+
+    Columns are decoded only when first requested and rows only when accessed, so readers that
+    need a few columns never touch the others.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._file = open(file_path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        self._columns = {}
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{file_path} is not a columnar drugs/diseases file.")
+
+        header_length = int.from_bytes(self._mmap[8:16], 'little')
+        self._header = json.loads(self._mmap[16:16 + header_length])
+        self._data_start = 16 + header_length
+        self._specs = {column['name']: column for column in self._header['columns']}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return self._header['rows']
+
+    @property
+    def column_names(self):
+        return list(self._specs)
+
+    def buffer(self, descriptor):
+        """
+        Return a typed view of one buffer of the file, without copying it when the byte order matches.
+        """
+        offset, length, typecode = descriptor
+        start = self._data_start + offset
+
+        if self._header['byteorder'] != sys.byteorder and typecode != 'B':
+            values = array(typecode)
+            values.frombytes(self._mmap[start:start + length])
+            values.byteswap()
+            return values
+
+        view = memoryview(self._mmap)[start:start + length].cast(typecode)
+        self._views.append(view)
+        return view
+
+    def column(self, name):
+        """
+        Return a random-access reader for one column.
+        """
+        if name not in self._columns:
+            spec = self._specs[name]
+            kind = spec['kind']
+            buffers = spec['buffers']
+
+            if kind == 'str':
+                reader = _StringColumn(self, buffers)
+            elif kind == 'category':
+                reader = _CategoryColumn(self, buffers)
+            elif kind == 'category_list':
+                reader = _ListColumn(self.buffer(buffers['rows']), _CategoryColumn(self, buffers))
+            elif kind == 'str_list':
+                reader = _ListColumn(self.buffer(buffers['rows']), _StringColumn(self, buffers))
+            elif kind == 'record_list':
+                reader = _RecordListColumn(self, buffers)
+            elif kind == 'classification':
+                reader = _ClassificationColumn(self, buffers)
+            else:
+                raise ValueError(f"Unknown column kind '{kind}'.")
+
+            self._columns[name] = reader
+        return self._columns[name]
+
+    def rows(self, columns=None, indexes=None):
+        """
+        Yield rows as dictionaries holding only the requested columns.
+
+        :param columns: Column names to read (default: every column).
+        :param indexes: Row indexes to read (default: every row).
+        """
+        readers = [(name, self.column(name)) for name in (columns or self.column_names)]
+        for i in (range(len(self)) if indexes is None else indexes):
+            yield {name: reader[i] for name, reader in readers}
+
+    def close(self):
+        self._columns.clear()
+        for view in self._views:
+            view.release()
+        self._views.clear()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+
+def open_columnar(file_path):
+    return ColumnarStore(file_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert the pickle of an older extraction into a columnar (.col) file.")
+    parser.add_argument("kind", choices=['drugs', 'diseases'], help="Records of the pickle.")
+    parser.add_argument("input_file", help="Pickle file to read.")
+    parser.add_argument("output_file", nargs='?', default=None,
+                        help="Columnar file to write (default: the input file with a .col extension).")
+    args = parser.parse_args()
+
+    convert_pickle(args.input_file, args.output_file or f"{os.path.splitext(args.input_file)[0]}.col",
+                   DRUG_COLUMNS if args.kind == 'drugs' else DISEASE_COLUMNS)
@@ -0,0 +1,418 @@
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping
+
+import networkx as nx
+
+from common.graph_snapshot import GraphSnapshot, is_snapshot_path
+
+
+# Relationship types of the drugs and diseases graph, other types get the next free codes
+EDGE_LABELS = ('HAS_KINGDOM', 'HAS_SUPERCLASS', 'HAS_CLASS', 'HAS_SUBCLASS', 'HAS_PARENT', 'INDICATES')
+NO_LABEL = 0
+
+
+class _AttributeColumn:
+    """
+    One node attribute: a code per node into a table of the distinct values (-1 when missing).
+    """
+
+    def __init__(self):
+        self.codes = array('i')
+        self.table = []
+        self.index = {}
+
+    def get(self, node_id):
+        code = self.codes[node_id] if node_id < len(self.codes) else -1
+        return self.table[code] if code != -1 else None
+
+    def set(self, node_id, value):
+        if node_id >= len(self.codes):
+            self.codes.extend([-1] * (node_id + 1 - len(self.codes)))
+
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.table)
+            self.table.append(value)
+        self.codes[node_id] = code
+
+
+class _NodeAttributes(MutableMapping):
+    """
+    Attributes of one node, read from and written through to the attribute columns, so that
+    graph.nodes[name][key] = value behaves as with networkx.
+    """
+
+    def __init__(self, graph, node_id):
+        self._graph = graph
+        self._node_id = node_id
+
+    def __getitem__(self, key):
+        column = self._graph._columns.get(key)
+        value = column.get(self._node_id) if column is not None else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._graph._set_attributes(self._node_id, {key: value})
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._graph._columns[key].codes[self._node_id] = -1
+
+    def __iter__(self):
+        return iter(self._graph.node_attributes(self._node_id))
+
+    def __len__(self):
+        return len(self._graph.node_attributes(self._node_id))
+
+    def __repr__(self):
+        return repr(self._graph.node_attributes(self._node_id))
+
+
+class _NodeView:
+    """
+    The part of the networkx NodeView used by the save and update functions: iteration,
+    membership, graph.nodes[name] attribute mappings and graph.nodes(data=True).
+    """
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __iter__(self):
+        return iter(self._graph._ids)
+
+    def __len__(self):
+        return len(self._graph._ids)
+
+    def __contains__(self, name):
+        return name in self._graph._ids
+
+    def __getitem__(self, name):
+        return _NodeAttributes(self._graph, self._graph._ids[name])
+
+    def __call__(self, data=False):
+        if not data:
+            return iter(self)
+        graph = self._graph
+        return ((name, graph.node_attributes(node_id)) for name, node_id in graph._ids.items())
+
+
+class CompactGraph:
+    """
+    Undirected graph with integer node IDs, CSR adjacency arrays, edge label codes and columnar
+    node attributes, exposing the subset of the nx.Graph API used to build, update and save the
+    drugs and diseases graph.
+
+    Nodes are numbered in insertion order and keyed by name; removed nodes keep their number until
+    the graph is saved. The only edge attribute is 'type', stored as a one byte code. New edges are
+    buffered and merged into the CSR arrays (row offsets, sorted neighbour IDs and their labels) the
+    next time the adjacency is read, removed edges and the edges of removed nodes are dropped at the same
+    time.
+    """
+
+    def __init__(self):
+        self.graph = {}
+        self._ids = {}
+        self._names = []
+        self._columns = {}
+        self._labels = [None] + list(EDGE_LABELS)
+        self._label_codes = {label: code for code, label in enumerate(self._labels) if label is not None}
+
+        self._indptr = array('q', [0])
+        self._indices = array('i')
+        self._edge_labels = array('B')
+        self._csr_edges = 0
+        self._pending = {}
+        self._removed = set()
+        self._removed_edges = set()
+
+    # Nodes
+
+    def _node_id(self, name):
+        node_id = self._ids.get(name)
+        if node_id is None:
+            node_id = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return node_id
+
+    def _set_attributes(self, node_id, attrs):
+        for key, value in attrs.items():
+            column = self._columns.get(key)
+            if column is None:
+                column = self._columns[key] = _AttributeColumn()
+            column.set(node_id, value)
+
+    def add_node(self, name, **attrs):
+        self._set_attributes(self._node_id(name), attrs)
+
+    def add_nodes_from(self, nodes, **attrs):
+        """
+        Add nodes given as names or (name, attributes) pairs, all of them with attrs.
+        """
+        for node in nodes:
+            if isinstance(node, tuple):
+                name, node_attrs = node
+                self._set_attributes(self._node_id(name), {**attrs, **node_attrs})
+            else:
+                self._set_attributes(self._node_id(node), attrs)
+
+    def remove_node(self, name):
+        """
+        Remove a node and its edges. Raises KeyError if the node is missing.
+        """
+        node_id = self._ids.pop(name)
+        self._names[node_id] = None
+        for column in self._columns.values():
+            if node_id < len(column.codes):
+                column.codes[node_id] = -1
+
+        self._pending = {edge: code for edge, code in self._pending.items() if node_id not in edge}
+        self._removed.add(node_id)
+
+    def remove_nodes_from(self, names):
+        for name in names:
+            if name in self._ids:
+                self.remove_node(name)
+
+    def node_attributes(self, node_id):
+        attrs = {}
+        for key, column in self._columns.items():
+            value = column.get(node_id)
+            if value is not None:
+                attrs[key] = value
+        return attrs
+
+    @property
+    def nodes(self):
+        return _NodeView(self)
+
+    def has_node(self, name):
+        return name in self._ids
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def number_of_nodes(self):
+        return len(self._ids)
+
+    def is_directed(self):
+        return False
+
+    def is_multigraph(self):
+        return False
+
+    # Edges
+
+    def _label_code(self, label):
+        if label is None:
+            return NO_LABEL
+        code = self._label_codes.get(label)
+        if code is None:
+            if len(self._labels) > 255:
+                raise ValueError("CompactGraph supports at most 255 edge labels.")
+            code = self._label_codes[label] = len(self._labels)
+            self._labels.append(label)
+        return code
+
+    def _csr_position(self, u, v):
+        """
+        Return the position of v in the CSR row of u, or -1.
+        """
+        if u + 1 >= len(self._indptr):
+            return -1
+        start, end = self._indptr[u], self._indptr[u + 1]
+        i = bisect_left(self._indices, v, start, end)
+        return i if i < end and self._indices[i] == v else -1
+
+    def add_edge(self, u, v, **attrs):
+        """
+        Add an edge, or update the label of an existing one. The nodes are added if missing.
+        """
+        if set(attrs) - {'type'}:
+            raise ValueError(f"CompactGraph edges only have a 'type' attribute, got {', '.join(attrs)}.")
+
+        a, b = self._node_id(u), self._node_id(v)
+        code = self._label_code(attrs.get('type'))
+        key = (min(a, b), max(a, b))
+
+        position = self._csr_position(a, b)
+        if position == -1:
+            if 'type' in attrs or key not in self._pending:
+                self._pending[key] = code
+        elif key in self._removed_edges:
+            # Added back after its removal, without the attributes it had
+            self._removed_edges.discard(key)
+            self._edge_labels[position] = code
+            self._edge_labels[self._csr_position(b, a)] = code
+        elif 'type' in attrs:
+            self._edge_labels[position] = code
+            self._edge_labels[self._csr_position(b, a)] = code
+
+    def add_edges_from(self, edges, **attrs):
+        for edge in edges:
+            u, v, *edge_attrs = edge
+            self.add_edge(u, v, **attrs, **(edge_attrs[0] if edge_attrs else {}))
+
+    def remove_edge(self, u, v):
+        """
+        Remove an edge. Raises KeyError if the edge is missing.
+        """
+        if not self.has_edge(u, v):
+            raise KeyError((u, v))
+
+        a, b = self._ids[u], self._ids[v]
+        key = (min(a, b), max(a, b))
+        if self._pending.pop(key, None) is None:
+            # Edges of the CSR arrays are dropped the next time they are merged
+            self._removed_edges.add(key)
+
+    def has_edge(self, u, v):
+        a, b = self._ids.get(u), self._ids.get(v)
+        if a is None or b is None:
+            return False
+        key = (min(a, b), max(a, b))
+        return key in self._pending or (self._csr_position(a, b) != -1 and key not in self._removed_edges)
+
+    def number_of_edges(self):
+        self.freeze()
+        return self._csr_edges
+
+    def freeze(self):
+        """
+        Merge the buffered edges into the CSR arrays.
+        """
+        node_count = len(self._names)
+        if (not self._pending and not self._removed and not self._removed_edges
+                and len(self._indptr) == node_count + 1):
+            return
+
+        removed = self._removed
+        removed_edges = self._removed_edges
+        edges = [(u, v, self._edge_labels[i])
+                 for u in range(len(self._indptr) - 1) if u not in removed
+                 for i in range(self._indptr[u], self._indptr[u + 1])
+                 for v in (self._indices[i],) if u <= v and v not in removed and (u, v) not in removed_edges]
+        edges.extend((u, v, code) for (u, v), code in self._pending.items())
+
+        counts = [0] * (node_count + 1)
+        for u, v, _ in edges:
+            counts[u + 1] += 1
+            if u != v:
+                counts[v + 1] += 1
+        for i in range(node_count):
+            counts[i + 1] += counts[i]
+
+        indptr = array('q', counts)
+        indices = array('i', bytes(4 * counts[-1]))
+        labels = array('B', bytes(counts[-1]))
+        fill = counts[:-1]
+        for u, v, code in edges:
+            indices[fill[u]], labels[fill[u]] = v, code
+            fill[u] += 1
+            if u != v:
+                indices[fill[v]], labels[fill[v]] = u, code
+                fill[v] += 1
+
+        for u in range(node_count):
+            start, end = indptr[u], indptr[u + 1]
+            if end - start > 1:
+                row = sorted(zip(indices[start:end], labels[start:end]))
+                indices[start:end] = array('i', (v for v, _ in row))
+                labels[start:end] = array('B', (code for _, code in row))
+
+        self._indptr, self._indices, self._edge_labels = indptr, indices, labels
+        self._csr_edges = len(edges)
+        self._pending = {}
+        self._removed = set()
+        self._removed_edges = set()
+
+    def neighbors(self, name):
+        self.freeze()
+        u = self._ids[name]
+        return [self._names[v] for v in self._indices[self._indptr[u]:self._indptr[u + 1]]]
+
+    def edge_label(self, u, v):
+        """
+        Return the 'type' of an edge, None if it has none.
+        """
+        self.freeze()
+        return self._labels[self._edge_labels[self._csr_position(self._ids[u], self._ids[v])]]
+
+    def edges(self, data=False):
+        """
+        Yield every edge once as (u, v), or (u, v, attributes) with data.
+        """
+        self.freeze()
+        names = self._names
+        for u in range(len(names)):
+            for i in range(self._indptr[u], self._indptr[u + 1]):
+                v = self._indices[i]
+                if u <= v:
+                    if data:
+                        label = self._labels[self._edge_labels[i]]
+                        yield names[u], names[v], ({} if label is None else {'type': label})
+                    else:
+                        yield names[u], names[v]
+
+    # Conversions
+
+    def to_networkx(self):
+        graph = nx.Graph()
+        graph.graph.update(self.graph)
+        graph.add_nodes_from(self.nodes(data=True))
+        graph.add_edges_from(self.edges(data=True))
+        return graph
+
+    @classmethod
+    def from_networkx(cls, nx_graph):
+        graph = cls()
+        graph.graph.update(nx_graph.graph)
+        graph.add_nodes_from(nx_graph.nodes(data=True))
+        graph.add_edges_from(nx_graph.edges(data=True))
+        graph.freeze()
+        return graph
+
+    @classmethod
+    def from_snapshot(cls, file_path, use_mmap=False):
+        """
+        Load a graph snapshot without going through networkx.
+        """
+        graph = cls()
+        with GraphSnapshot(file_path, use_mmap) as snapshot:
+            names = snapshot.nodes()
+            for name in names:
+                graph._node_id(name)
+
+            for key in snapshot.node_attribute_names:
+                column = graph._columns[key] = _AttributeColumn()
+                for node_id, value in enumerate(snapshot.node_attribute(key)):
+                    if value is not None:
+                        column.set(node_id, value)
+
+            if set(snapshot.edge_attribute_names) - {'type'}:
+                raise ValueError(f"{file_path} has edge attributes other than 'type'.")
+            labels = snapshot.edge_attribute('type') if snapshot.edge_attribute_names else [None] * snapshot.edge_count
+            sources, targets = snapshot.edge_node_numbers()
+            for u, v, label in zip(sources, targets, labels):
+                graph._pending[(min(u, v), max(u, v))] = graph._label_code(label)
+
+        graph.freeze()
+        return graph
+
+
+def read_compact_graph(file_path, use_mmap=False):
+    """
+    Read a graph snapshot (.gsnap) or GraphML file into a CompactGraph.
+    """
+    if is_snapshot_path(file_path):
+        return CompactGraph.from_snapshot(file_path, use_mmap)
+    return CompactGraph.from_networkx(nx.read_graphml(file_path))
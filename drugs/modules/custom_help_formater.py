@@ -21,11 +21,25 @@ def create_or_update_save_locally_args():
                         help="Action to perform on the graph [create/update].",
                         required=True, type=str)
     parser.add_argument("-of", "--output_file",
-                        help="Output file path.",
+                        help="Output graph file path, saved as a binary snapshot for a .gsnap extension and as GraphML otherwise.",
                         default="./output/drugs_and_diseases_graph.graphml")
     parser.add_argument("-gf", "--graph_file",
-                        help="Existing graph file path if updating graph.",
+                        help="Existing graph file path if updating graph (.gsnap snapshot or GraphML).",
                         default="./output/drugs_and_diseases_graph.graphml")
+    parser.add_argument("-w", "--workers",
+                        help="Number of processes used to parse the DrugBank XML file (0 uses every core).",
+                        default=1,
+                        type=int)
+    parser.add_argument("-cg", "--compact_graph",
+                        help="Hold the graph in a compact array-backed graph instead of networkx to save memory.",
+                        action="store_true")
+    parser.add_argument("-fmt", "--format",
+                        choices=["graph", "neo4j-admin"],
+                        help="Save a graph file, or export CSV files for neo4j-admin database import (create only).",
+                        default="graph")
+    parser.add_argument("-od", "--output_dir",
+                        help="Output directory of the neo4j-admin export.",
+                        default="./output/neo4j-admin")
     return parser.parse_args()
 
 
@@ -41,4 +55,21 @@ def create_or_update_save_neo4j_args():
                         choices=["create", "update", "delete"],
                         help="Action to perform on the graph.",
                         required=True, type=str)
+    parser.add_argument("-w", "--workers",
+                        help="Number of processes used to parse the DrugBank XML file (0 uses every core).",
+                        default=1,
+                        type=int)
+    parser.add_argument("-cd", "--cache_dir",
+                        help="Directory of the extraction cache keyed on the DrugBank file hash.",
+                        default="./data/cache")
+    parser.add_argument("-nc", "--no_cache",
+                        help="Always parse the DrugBank file, without reading or writing the extraction cache.",
+                        action="store_true")
+    parser.add_argument("-c", "--concurrency",
+                        help="Number of batches written to Neo4j in parallel.",
+                        default=1,
+                        type=int)
+    parser.add_argument("-fp", "--fingerprints_file",
+                        help="Per-drug fingerprints of the last write, used by update to apply only the changed drugs.",
+                        default="./data/neo4j-drug-fingerprints.json")
     return parser.parse_args()
\ No newline at end of file
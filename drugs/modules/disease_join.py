@@ -0,0 +1,172 @@
+import csv
+from collections import Counter
+from itertools import islice
+from operator import itemgetter
+
+from modules.columnar_store import DISEASE_COLUMNS, open_columnar, ensure_columnar
+
+
+ASSOCIATION_CHUNK_SIZE = 100000
+DISEASE_COLUMN = 'Disease'
+DRUG_COLUMN = 'Drug'
+# Columns of the CTD diseases vocabulary read by iter_disease_info
+CTD_COLUMNS = ('MESH_ID', 'Name', 'Definitions', 'Synonyms')
+
+
+def iter_association_chunks(file_path, chunk_size=ASSOCIATION_CHUNK_SIZE):
+    """
+    Read a disease-drug association TSV in chunks, keeping only the two join columns.
+
+    :return: Generator of lists of (disease ID, drug ID) pairs.
+    """
+    with open(file_path, 'r', newline='') as file:
+        reader = csv.reader(file, delimiter='\t')
+        header = next(reader, [])
+        if DISEASE_COLUMN not in header or DRUG_COLUMN not in header:
+            raise ValueError(f"{file_path} must have '{DISEASE_COLUMN}' and '{DRUG_COLUMN}' columns.")
+        disease_column, drug_column = header.index(DISEASE_COLUMN), header.index(DRUG_COLUMN)
+
+        # Project every row as it is read, so only the pairs of a chunk are held, not the full rows
+        pairs = map(itemgetter(disease_column, drug_column), filter(None, reader))
+        while True:
+            chunk = list(islice(pairs, chunk_size))
+            if not chunk:
+                break
+            yield chunk
+
+
+def needed_disease_ids(diseases_file_path, drug_ids=None, chunk_size=ASSOCIATION_CHUNK_SIZE):
+    """
+    Return the disease IDs of an association TSV.
+
+    :param drug_ids: Only keep the diseases of rows with one of these drug IDs (default: every row).
+    """
+    needed = set()
+    for chunk in iter_association_chunks(diseases_file_path, chunk_size):
+        if drug_ids is None:
+            needed.update({disease_id for disease_id, _ in chunk})
+        else:
+            needed.update({disease_id for disease_id, drug_id in chunk if drug_id in drug_ids})
+    return needed
+
+
+def iter_disease_info(filepath, needed_ids=None):
+    """
+    Stream the diseases (MESH "D" terms) of a CTD diseases vocabulary TSV.
+
+    Only the ID column is looked at before a row is kept, the name, definition and synonyms are
+    read and split only for the retained diseases.
+
+    :param needed_ids: Disease IDs to keep, such as the needed_disease_ids of the association file (default: all).
+    :return: Generator of dictionaries with the 'name', 'doid', 'definition' and 'synonyms' of the diseases.
+    """
+    with open(filepath, 'r', newline='') as file:
+        reader = csv.reader(file, delimiter='\t')
+        header = next(reader, [])
+        missing = [column for column in CTD_COLUMNS if column not in header]
+        if missing:
+            raise ValueError(f"{filepath} is missing the columns {', '.join(missing)}.")
+        id_column, name_column, definition_column, synonyms_column = (header.index(column) for column in CTD_COLUMNS)
+
+        for row in reader:
+            if not row:
+                continue
+
+            mesh_id = row[id_column].replace('MESH:', '')
+            if "D" not in mesh_id or (needed_ids is not None and mesh_id not in needed_ids):
+                continue
+
+            yield {
+                'name': row[name_column],
+                'doid': mesh_id,
+                'definition': row[definition_column],
+                'synonyms': row[synonyms_column].split("|"),
+            }
+
+
+class DiseaseDrugJoin:
+    """
+    Hash join of a disease-drug association file against ID to name indexes of the extracted
+    diseases and of the drugs.
+
+    The association file is streamed in chunks and never held in memory. Rows whose disease or
+    drug ID is missing from the indexes are counted in unmatched_diseases and unmatched_drugs and
+    skipped, instead of failing the whole build.
+    """
+
+    def __init__(self, drugs, extracted_diseases, diseases_file_path, chunk_size=ASSOCIATION_CHUNK_SIZE,
+                 drug_subset=False):
+        """
+        :param drugs: Drugs to link, the index is built from their 'drugbank-id' and 'name'.
+        :param extracted_diseases: Columnar file of the extracted diseases. The extracted-diseases.pkl of
+                                   older extractions is converted once into a .col file (see ensure_columnar).
+        :param diseases_file_path: Association TSV with 'Disease' and 'Drug' ID columns.
+        :param chunk_size: Number of association rows read at a time.
+        :param drug_subset: drugs is only part of the drugs of the association file, rows of the
+                            other drugs are skipped without being counted as unmatched.
+        """
+        extracted_diseases = ensure_columnar(extracted_diseases, DISEASE_COLUMNS)
+        self.extracted_diseases = extracted_diseases
+        self.diseases_file_path = diseases_file_path
+        self.chunk_size = chunk_size
+        self.drug_subset = drug_subset
+
+        self.drug_names = {drug['drugbank-id']: drug['name'] for drug in drugs}
+        with open_columnar(extracted_diseases) as diseases:
+            doids = diseases.column('doid')
+            names = diseases.column('name')
+            self.disease_rows = {doids[i]: i for i in range(len(diseases))}
+            self.disease_names = [names[i] for i in range(len(diseases))]
+
+        self.unmatched_diseases = Counter()
+        self.unmatched_drugs = Counter()
+
+    def linked_diseases(self):
+        """
+        Return the diseases linked to at least one of the drugs, in the order of the extracted diseases file.
+        """
+        linked_ids = needed_disease_ids(self.diseases_file_path, self.drug_names, self.chunk_size)
+        linked_rows = sorted(self.disease_rows[disease_id] for disease_id in linked_ids if disease_id in self.disease_rows)
+        with open_columnar(self.extracted_diseases) as diseases:
+            return list(diseases.rows(indexes=linked_rows))
+
+    def relations(self):
+        """
+        Yield every distinct ('Disease', disease name, 'Drug', drug name) relation, then print the
+        unmatched IDs if there are any.
+        """
+        self.unmatched_diseases.clear()
+        self.unmatched_drugs.clear()
+        drug_names = self.drug_names
+        disease_rows = self.disease_rows
+        disease_names = self.disease_names
+        count_unmatched_drugs = not self.drug_subset
+
+        seen = set()
+        for chunk in iter_association_chunks(self.diseases_file_path, self.chunk_size):
+            for disease_id, drug_id in chunk:
+                drug_name = drug_names.get(drug_id)
+                if drug_name is None:
+                    if count_unmatched_drugs:
+                        self.unmatched_drugs[drug_id] += 1
+                    continue
+
+                disease_row = disease_rows.get(disease_id)
+                if disease_row is None:
+                    self.unmatched_diseases[disease_id] += 1
+                    continue
+
+                relation = ('Disease', disease_names[disease_row], 'Drug', drug_name)
+                if relation not in seen:
+                    seen.add(relation)
+                    yield relation
+
+        self.print_unmatched()
+
+    def print_unmatched(self):
+        if self.unmatched_diseases:
+            print(f"{sum(self.unmatched_diseases.values())} associations skipped, "
+                  f"{len(self.unmatched_diseases)} disease IDs not found in {self.extracted_diseases}")
+        if self.unmatched_drugs:
+            print(f"{sum(self.unmatched_drugs.values())} associations skipped, "
+                  f"{len(self.unmatched_drugs)} drug IDs not found in the extracted drugs")
@@ -0,0 +1,361 @@
+import hashlib
+import io
+import json
+import os
+import re
+
+from modules.extract_data import (EXTRACTOR_VERSION, DRUG_RECORD_START, DRUGBANK_END, DRUG_RECORD_CHUNK_SIZE,
+                                  find_drug_record_ranges, iter_drug_info, new_classification_sets,
+                                  classification_sets_to_tuple, split_drugs_by_type,
+                                  create_classification_relationships, create_disease_nodes_and_relations,
+                                  add_drugs_to_graph)
+from common.graph_snapshot import read_graph, write_graph
+from modules.compact_graph import read_compact_graph
+
+
+FINGERPRINTS_SUFFIX = '.fingerprints.json'
+FINGERPRINTS_VERSION = 2
+# Node labels of the classification levels, in the order of classification_sets_to_tuple
+CLASSIFICATION_LABELS = ('Kingdom', 'Superclass', 'Class', 'Subclass', 'Parent')
+DRUG_ID_PATTERN = re.compile(rb'<drugbank-id[^>]*>([^<]*)</drugbank-id>')
+
+
+def iter_drug_records(file_path, chunk_size=DRUG_RECORD_CHUNK_SIZE):
+    """
+    Split a DrugBank XML file into the raw bytes of its top-level <drug> records, without parsing them.
+
+    :return: The document header and a generator of records.
+    """
+    header, ranges = find_drug_record_ranges(file_path, chunk_size)
+
+    def records():
+        with open(file_path, 'rb') as file:
+            for start, end in ranges:
+                file.seek(start)
+                chunk = file.read(end - start)
+
+                position = 0
+                while position < len(chunk):
+                    next_position = chunk.find(DRUG_RECORD_START, position + 1)
+                    if next_position == -1:
+                        next_position = len(chunk)
+                    yield chunk[position:next_position]
+                    position = next_position
+
+    return header, records()
+
+
+def record_fingerprint(record):
+    return hashlib.blake2b(record.strip(), digest_size=16).hexdigest()
+
+
+def record_drug_id(record):
+    """
+    Return the primary DrugBank ID of a raw record, the first <drugbank-id> of the record.
+    """
+    match = DRUG_ID_PATTERN.search(record)
+    return match.group(1).decode('utf-8').strip() if match else None
+
+
+def fingerprints_path(graph_path):
+    return f"{graph_path}{FINGERPRINTS_SUFFIX}"
+
+
+def drug_state_entry(drug):
+    return [drug['drugbank-id'], drug['name'], drug['type'], drug['classification']]
+
+
+def state_drugs(entries):
+    """
+    Turn fingerprint state entries back into drug dictionaries, with the fields used to build the classification.
+    """
+    return [{'drugbank-id': drug_id, 'name': name, 'type': drug_type, 'classification': classification}
+            for drug_id, name, drug_type, classification in entries]
+
+
+def graph_drugs(drugs):
+    """
+    Keep the drugs of the types written to the graph, as the full build does.
+    """
+    biotech, small_molecule = split_drugs_by_type(drugs)
+    return biotech + small_molecule
+
+
+def parse_drug_records(header, records):
+    document = io.BytesIO(header + b''.join(records) + DRUGBANK_END)
+    return list(iter_drug_info(document))
+
+
+def fill_state_entries(pending, drugs):
+    """
+    Fill the state entries of pending (drug ID: entry) with the parsed drugs.
+    """
+    for drug in drugs:
+        entry = pending.get(drug['drugbank-id'])
+        if entry is not None:
+            entry[:] = drug_state_entry(drug)
+
+
+def fingerprint_drugs(file_path, drugs):
+    """
+    Build the fingerprint state of a DrugBank XML file: the fingerprint of every record, with the ID,
+    name, type and classification of its drug. They are taken from the extracted drugs, the records
+    of the other drug types are parsed again, as their classification is part of the graph too.
+    """
+    extracted = {drug['drugbank-id']: drug for drug in drugs}
+    header, records = iter_drug_records(file_path)
+
+    fingerprints = {}
+    pending = {}
+    other_records = []
+    for record in records:
+        drug_id = record_drug_id(record)
+        if drug_id in extracted:
+            fingerprints[record_fingerprint(record)] = drug_state_entry(extracted[drug_id])
+        else:
+            entry = fingerprints[record_fingerprint(record)] = [drug_id, None, None, None]
+            pending[drug_id] = entry
+            other_records.append(record)
+
+    if other_records:
+        fill_state_entries(pending, parse_drug_records(header, other_records))
+
+    return {'version': FINGERPRINTS_VERSION, 'extractor_version': EXTRACTOR_VERSION, 'drugs': fingerprints}
+
+
+def load_fingerprints(path):
+    """
+    Load a fingerprint state, or return None if it is missing or was built by another version or extractor version.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as json_file:
+            state = json.load(json_file)
+    except (OSError, ValueError):
+        return None
+
+    if state.get('version') != FINGERPRINTS_VERSION or state.get('extractor_version') != EXTRACTOR_VERSION:
+        return None
+    return state
+
+
+def save_fingerprints(state, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as json_file:
+        json.dump(state, json_file)
+    os.replace(temp_path, path)
+    print(f"Fingerprints of {len(state['drugs'])} drugs saved to {path}")
+
+
+def classification_levels(drugs):
+    """
+    Return the classification levels of drugs as (kingdoms, superclasses, classes, subclasses, parents),
+    built from their classification dictionaries the way extract_drug_element fills the classification sets.
+    """
+    classification_sets = new_classification_sets()
+    for drug in drugs:
+        classification = drug['classification']
+        if classification is None:
+            continue
+
+        classification_sets['kingdoms'].add(classification['kingdom'])
+        classification_sets['superclasses'].add(classification['superclass'])
+        # extract_drug_element only skips a class element without text
+        if classification['class'] != 'None':
+            classification_sets['classes'].add(classification['class'])
+        classification_sets['subclasses'].add(classification['subclass'])
+        classification_sets['parents'].add(classification['parent'])
+
+    return classification_sets_to_tuple(classification_sets)
+
+
+def classification_nodes(levels):
+    """
+    Return the classification nodes of the levels as (label, name) pairs.
+    """
+    return {(label, name) for label, names in zip(CLASSIFICATION_LABELS, levels) for name in names}
+
+
+def classification_node_types(levels):
+    """
+    Return the 'type' of the classification nodes of a local graph, the last level of a name wins
+    as add_drugs_to_graph adds the levels in order.
+    """
+    return {name: label.lower() for label, names in zip(CLASSIFICATION_LABELS, levels) for name in names}
+
+
+def compute_drug_delta(file_path, state, workers=1):
+    """
+    Compare a DrugBank XML file against the fingerprint state of the last build. Only the records
+    whose fingerprint is unknown are parsed, and only the biotech and small molecule drugs are
+    applied, as in the full build.
+
+    The classification levels are built from every drug of the state, so the nodes and relationships
+    a changed drug leaves behind are removed only when no other drug uses them, and parents that
+    became another classification level through a changed drug are removed as in the full build.
+
+    :param state: Fingerprint state (see fingerprint_drugs), or None to treat every drug as added,
+                  in which case the whole file is parsed with workers processes.
+    :return: Dictionary with the 'added' and 'updated' drugs, the 'removed' drugs as [id, name],
+             'deleted_names' (nodes to delete before the changed drugs are written again), the
+             'added_classifications' and 'removed_classifications' nodes as (label, name), the local
+             graph types of the 'retyped' classification names as name: [old type, new type], the
+             classification 'relationships' to write and the 'removed_relationships', the 'unchanged'
+             count and the new 'state'.
+    """
+    known = state['drugs'] if state else {}
+    header, records = iter_drug_records(file_path)
+
+    fingerprints = {}
+    pending = {}
+    changed_records = []
+    for record in records:
+        fingerprint = record_fingerprint(record)
+        if fingerprint in known:
+            fingerprints[fingerprint] = known[fingerprint]
+        else:
+            entry = fingerprints[fingerprint] = [record_drug_id(record), None, None, None]
+            pending[entry[0]] = entry
+            changed_records.append(record)
+
+    if not known:
+        changed = list(iter_drug_info(file_path, workers=workers))
+    elif changed_records:
+        changed = parse_drug_records(header, changed_records)
+    else:
+        changed = []
+
+    fill_state_entries(pending, changed)
+    changed = graph_drugs(changed)
+    changed_ids = {drug['drugbank-id'] for drug in changed}
+
+    gone = {drug['drugbank-id']: drug['name'] for drug in
+            graph_drugs(state_drugs(entry for fingerprint, entry in known.items() if fingerprint not in fingerprints))}
+
+    added = [drug for drug in changed if drug['drugbank-id'] not in gone]
+    updated = [drug for drug in changed if drug['drugbank-id'] in gone]
+    removed = [[drug_id, name] for drug_id, name in gone.items() if drug_id not in changed_ids]
+
+    old_drugs = state_drugs(known.values())
+    new_drugs = state_drugs(fingerprints.values())
+    old_levels = classification_levels(old_drugs)
+    new_levels = classification_levels(new_drugs)
+
+    old_nodes = classification_nodes(old_levels)
+    new_nodes = classification_nodes(new_levels)
+    added_nodes = new_nodes - old_nodes
+
+    old_types = classification_node_types(old_levels)
+    new_types = classification_node_types(new_levels)
+    retyped = {name: [old_types.get(name), new_types.get(name)] for name in old_types.keys() | new_types.keys()
+               if old_types.get(name) != new_types.get(name)}
+
+    old_relationships = create_classification_relationships(graph_drugs(old_drugs))
+    new_relationships = create_classification_relationships(graph_drugs(new_drugs))
+    # Relationships of unchanged drugs are written again when one of their nodes is added
+    relationships = create_classification_relationships(changed) if changed else set()
+    relationships.update(relationship for relationship in new_relationships
+                         if (relationship[0], relationship[1]) in added_nodes
+                         or (relationship[2], relationship[3]) in added_nodes)
+    # Relationships to drugs go with the deleted drug nodes
+    removed_relationships = [relationship for relationship in old_relationships - new_relationships
+                             if relationship[2] != 'Drug']
+
+    return {
+        'added': added,
+        'updated': updated,
+        'removed': removed,
+        'deleted_names': [gone[drug['drugbank-id']] for drug in updated] + [name for _, name in removed],
+        'added_classifications': added_nodes,
+        'removed_classifications': sorted(old_nodes - new_nodes),
+        'retyped': retyped,
+        'relationships': relationships,
+        'removed_relationships': removed_relationships,
+        'unchanged': len(fingerprints) - len(changed_records),
+        'state': {'version': FINGERPRINTS_VERSION, 'extractor_version': EXTRACTOR_VERSION, 'drugs': fingerprints},
+    }
+
+
+def print_drug_delta(delta):
+    print(f"Drugs: {len(delta['added'])} added, {len(delta['updated'])} updated, "
+          f"{len(delta['removed'])} removed, {delta['unchanged']} unchanged")
+    if delta['added_classifications'] or delta['removed_classifications']:
+        print(f"Classification: {len(delta['added_classifications'])} nodes added, "
+              f"{len(delta['removed_classifications'])} removed")
+
+
+def delta_graph_data(delta, extracted_diseases="../data/extracted-diseases.col",
+                     diseases_file_path='../data/extracted-disease-drug.tsv'):
+    """
+    Return the graph data of a drug delta, in the order of the create_or_update_graph arguments:
+    the changed drugs, the added kingdoms, superclasses, classes, subclasses and parents, the
+    relationships to write, and the diseases and disease relations of the changed drugs.
+    """
+    drugs = delta['added'] + delta['updated']
+    kingdoms, superclasses, classes, subclasses, parents = (
+        {name for node_label, name in delta['added_classifications'] if node_label == label}
+        for label in CLASSIFICATION_LABELS)
+    relationships = delta['relationships']
+
+    if not drugs:
+        return drugs, kingdoms, superclasses, classes, subclasses, parents, relationships, [], []
+
+    diseases, disease_relations = create_disease_nodes_and_relations(drugs, extracted_diseases, diseases_file_path,
+                                                                     drug_subset=True)
+
+    return drugs, kingdoms, superclasses, classes, subclasses, parents, relationships, diseases, disease_relations
+
+
+def apply_drug_delta_to_graph(graph, delta, graph_data):
+    """
+    Apply a drug delta to a local graph: the nodes of updated and removed drugs are deleted with their
+    edges, with the classification edges and nodes no drug uses anymore, then the changed drugs are
+    added back with their classification and disease edges and the classification nodes get the type
+    of their last level. Disease nodes are kept.
+    """
+    classification_types = {label.lower() for label in CLASSIFICATION_LABELS}
+
+    for name in delta['deleted_names']:
+        if graph.has_node(name):
+            graph.remove_node(name)
+
+    for _, source, _, target in delta['removed_relationships']:
+        if graph.has_edge(source, target):
+            graph.remove_edge(source, target)
+
+    for name, (old_type, new_type) in delta['retyped'].items():
+        if new_type is None and graph.has_node(name) and graph.nodes[name].get('type') == old_type:
+            graph.remove_node(name)
+
+    add_drugs_to_graph(graph, *graph_data)
+
+    for name, (_, new_type) in delta['retyped'].items():
+        if new_type is not None and graph.has_node(name) and graph.nodes[name].get('type') in classification_types:
+            graph.add_node(name, type=new_type)
+
+
+def update_graph_save_locally(input_file, graph_file, output_file, workers=1, compact=False):
+    """
+    Update a saved graph with a new DrugBank release, applying only the drugs whose record changed
+    since the fingerprints saved with graph_file.
+
+    :param workers: Number of processes used when there are no fingerprints and the whole file is parsed.
+    """
+    state = load_fingerprints(fingerprints_path(graph_file))
+    if state is None:
+        print(f"No fingerprints found for {graph_file}, every drug is applied and removed drugs are kept")
+
+    delta = compute_drug_delta(input_file, state, workers)
+    print_drug_delta(delta)
+
+    graph = read_compact_graph(graph_file) if compact else read_graph(graph_file)
+    apply_drug_delta_to_graph(graph, delta, delta_graph_data(delta))
+
+    write_graph(graph, output_file)
+    save_fingerprints(delta['state'], fingerprints_path(output_file))
+    print(f"Graph updated and saved to {output_file}")
+
+    return delta
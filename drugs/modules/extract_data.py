@@ -1,13 +1,19 @@
+import io
 import sys
 import xml.etree.ElementTree as ET
 import pickle
 import json
-import csv
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 import networkx as nx
+from modules.columnar_store import save_drug_columns, save_disease_columns
+from common.graph_snapshot import write_graph
+from modules.compact_graph import CompactGraph
+from modules.disease_join import DiseaseDrugJoin, iter_disease_info
 
 
 def save_to_pickle(data, file_path):
@@ -32,91 +38,281 @@ def load_from_pickle(file_path):
     return data
 
 
-def extract_drug_info(file_path):
-    ns = {'drugbank': 'http://www.drugbank.ca'}
+DRUGBANK_NS = {'drugbank': 'http://www.drugbank.ca'}
+
+# Bump whenever extract_drug_element changes its output, so cached extractions are rebuilt.
+EXTRACTOR_VERSION = 1
+
+# Top-level DrugBank records always carry a 'type' attribute, the <drug> elements nested in
+# pathways never have attributes, so this marks the start of a top-level record.
+DRUG_RECORD_START = b'<drug '
+DRUGBANK_END = b'</drugbank>'
+DRUG_RECORD_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def new_classification_sets():
+    """
+    Create the empty classification sets filled while streaming drugs.
+    """
+    return {
+        'kingdoms': set(),
+        'superclasses': set(),
+        'classes': set(),
+        'subclasses': set(),
+        'parents': set(),
+    }
+
+
+def extract_drug_element(drug, classification_sets, ns=DRUGBANK_NS):
+    """
+    Extract the drug dictionary from a single <drug> element and add its classification to the sets.
+    """
+    kingdoms = classification_sets['kingdoms']
+    superclasses = classification_sets['superclasses']
+    classes = classification_sets['classes']
+    subclasses = classification_sets['subclasses']
+    parents = classification_sets['parents']
+
+    classification = drug.find('drugbank:classification', ns)
+
+    if classification is not None:
+        kingdom_element = classification.find('drugbank:kingdom', ns)
+        superclass_element = classification.find('drugbank:superclass', ns)
+        class_element = classification.find('drugbank:class', ns)
+        subclass_element = classification.find('drugbank:subclass', ns)
+        parent_element = classification.find('drugbank:direct-parent', ns)
+
+        kingdom = str(kingdom_element.text) if kingdom_element is not None else None
+        superclass = str(superclass_element.text) if superclass_element is not None else None
+        c = class_element.text if class_element is not None else 'None'
+        subclass = str(subclass_element.text) if subclass_element is not None else None
+        parent = str(parent_element.text) if parent_element is not None else None
+
+        if kingdom is not None:
+            kingdoms.add(kingdom.lower().title())
+
+        if superclass is not None:
+            superclasses.add(superclass.lower().capitalize())
+
+        if c is not None:
+            classes.add(c.lower().capitalize())
+
+        if subclass is not None:
+            subclasses.add(subclass.lower().capitalize())
+
+        if parent is not None:
+            parents.add(parent.lower().capitalize())
+
+    name = drug.find('drugbank:name', ns)
+    state = drug.find('drugbank:state', ns)
+
+    return {
+        'drugbank-id': drug.find('drugbank:drugbank-id', ns).text,
+        'type': drug.attrib.get('type'),
+        'name': name.text.lower().capitalize() if name is not None else None,
+        'state': state.text if state is not None else None,
+        'groups': [group.text for group in drug.findall('drugbank:groups/drugbank:group', ns)],
+        'salts': [salt.find('drugbank:name', ns).text for salt in drug.findall('drugbank:salts/drugbank:salt', ns)],
+        'classification': {
+            'kingdom': str(kingdom_element.text).lower().title(),
+            'superclass': str(superclass_element.text).lower().capitalize(),
+            'class': str(class_element.text).lower().capitalize(),
+            'subclass': str(subclass_element.text).lower().capitalize(),
+            'parent': str(parent_element.text).lower().capitalize(),
+        } if classification is not None else None,
+        'affected_organisms': [organism.text for organism in
+                               drug.findall('drugbank:affected-organisms/drugbank:affected-organism', ns)],
+        'food_interactions': [interaction.text for interaction in
+                              drug.findall('drugbank:food-interactions/drugbank:food-interaction', ns)],
+        'drug_interactions': [{'name': interaction.find('drugbank:name', ns).text,
+                               'description': interaction.find('drugbank:description', ns).text}
+                              for interaction in
+                              drug.findall('drugbank:drug-interactions/drugbank:drug-interaction', ns)],
+        'external_links': [link.findtext('drugbank:url', None, ns) for link in drug.findall('drugbank:external-links/drugbank:external-link', ns)],
+    }
+
+
+def iter_drug_info(file_path, classification_sets=None, workers=1):
+    """
+    Stream the drugs of a DrugBank XML file one dictionary at a time.
+
+    Only top-level <drug> elements are extracted (drugs nested in pathways are skipped) and every
+    processed element is cleared, so memory does not grow with the size of the file.
+
+    :param file_path: DrugBank XML file path or binary file object.
+    :param classification_sets: Sets from new_classification_sets(), filled as the stream goes.
+    :param workers: Number of worker processes, 1 parses serially and 0 uses every core (default: 1).
+    """
+    if classification_sets is None:
+        classification_sets = new_classification_sets()
+
+    if workers != 1:
+        yield from iter_drug_info_parallel(file_path, classification_sets, workers)
+        return
+
+    drug_tag = f"{{{DRUGBANK_NS['drugbank']}}}drug"
+    root = None
+    depth = 0
+
+    for event, element in ET.iterparse(file_path, events=('start', 'end')):
+        if event == 'start':
+            depth += 1
+            if root is None:
+                root = element
+            continue
+
+        depth -= 1
+        if depth == 1 and element.tag == drug_tag:
+            yield extract_drug_element(element, classification_sets)
+            element.clear()
+            root.clear()
+
+
+def _find_drug_record_start(file, offset, end_offset):
+    """
+    Return the offset of the first top-level drug record at or after offset, or end_offset if there is none.
+    """
+    overlap = len(DRUG_RECORD_START) - 1
+    position = offset
+
+    while position < end_offset:
+        file.seek(position)
+        block = file.read(1024 * 1024)
+        if not block:
+            break
+
+        index = block.find(DRUG_RECORD_START)
+        if index != -1:
+            return min(position + index, end_offset)
+
+        if len(block) <= overlap:
+            break
+        position += len(block) - overlap
+
+    return end_offset
+
+
+def find_drug_record_ranges(file_path, chunk_size=DRUG_RECORD_CHUNK_SIZE):
+    """
+    Split a DrugBank XML file into byte ranges holding whole top-level <drug> records.
+
+    :param file_path: DrugBank XML file path.
+    :param chunk_size: Approximate number of bytes per range.
+    :return: The document header (XML declaration and <drugbank> start tag) and a list of (start, end) ranges.
+    """
+    size = os.path.getsize(file_path)
+
+    with open(file_path, 'rb') as file:
+        file.seek(max(0, size - 4096))
+        tail = file.read()
+        end_index = tail.rfind(DRUGBANK_END)
+        end = size - len(tail) + end_index if end_index != -1 else size
+
+        first = _find_drug_record_start(file, 0, end)
+        file.seek(0)
+        header = file.read(first)
+
+        starts = []
+        start = first
+        while start < end:
+            starts.append(start)
+            start = _find_drug_record_start(file, start + chunk_size, end)
+
+    return header, list(zip(starts, starts[1:] + [end]))
+
 
-    tree = ET.parse(file_path)
-    root = tree.getroot()
+def _extract_drug_record_range(task):
+    """
+    Worker entry point: extract the drugs of one byte range of a DrugBank XML file.
+    """
+    file_path, header, start, end = task
 
-    kingdoms = set()
-    superclasses = set()
-    classes = set()
-    subclasses = set()
-    parents = set()
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        records = file.read(end - start)
 
-    biotech_info = []
-    small_molecules_info = []
+    classification_sets = new_classification_sets()
+    drugs = list(iter_drug_info(io.BytesIO(header + records + DRUGBANK_END), classification_sets))
 
-    for drug in root.findall('drugbank:drug', ns):
-        type = drug.attrib.get('type')
-        classification = drug.find('drugbank:classification', ns)
+    return drugs, classification_sets
 
-        if classification is not None:
-            kingdom = str(classification.find('drugbank:kingdom', ns).text) if classification.find('drugbank:kingdom', ns) is not None else None
-            superclass = str(classification.find('drugbank:superclass', ns).text) if classification.find('drugbank:superclass', ns) is not None else None
-            c = classification.find('drugbank:class', ns).text if classification.find('drugbank:class', ns) is not None else 'None'
-            subclass = str(classification.find('drugbank:subclass', ns).text) if classification.find('drugbank:subclass', ns) is not None else None
-            parent = str(classification.find('drugbank:direct-parent', ns).text) if classification.find('drugbank:direct-parent', ns) is not None else None
 
-            if kingdom is not None:
-                kingdoms.add(kingdom.lower().title())
+def iter_drug_info_parallel(file_path, classification_sets=None, workers=0, chunk_size=DRUG_RECORD_CHUNK_SIZE):
+    """
+    Stream the drugs of a DrugBank XML file, parsing byte ranges of records in a process pool.
 
-            if superclass is not None:
-                superclasses.add(superclass.lower().capitalize())
+    Ranges are merged back in file order, so the drugs and classification sets are the same as
+    the ones produced by the serial iter_drug_info.
 
-            if c is not None:
-                classes.add(c.lower().capitalize())
+    :param file_path: DrugBank XML file path.
+    :param classification_sets: Sets from new_classification_sets(), filled as the stream goes.
+    :param workers: Number of worker processes, 0 uses every core (default: 0).
+    :param chunk_size: Approximate number of bytes parsed per task.
+    """
+    if classification_sets is None:
+        classification_sets = new_classification_sets()
 
-            if subclass is not None:
-                subclasses.add(subclass.lower().capitalize())
+    workers = workers or os.cpu_count() or 1
+    header, ranges = find_drug_record_ranges(file_path, chunk_size)
+    tasks = iter((file_path, header, start, end) for start, end in ranges)
 
-            if parent is not None:
-                parents.add(parent.lower().capitalize())
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque(pool.submit(_extract_drug_record_range, task) for task in islice(tasks, 2 * workers))
+
+        while pending:
+            drugs, range_sets = pending.popleft().result()
+
+            if (task := next(tasks, None)) is not None:
+                pending.append(pool.submit(_extract_drug_record_range, task))
+
+            for key, values in range_sets.items():
+                classification_sets[key].update(values)
+
+            yield from drugs
 
-        drug_info = {
-            'drugbank-id': drug.find('drugbank:drugbank-id', ns).text,
-            'type': drug.attrib.get('type'),
-            'name': drug.find('drugbank:name', ns).text.lower().capitalize() if drug.find('drugbank:name',
-                                                                                          ns) is not None else None,
-            'state': drug.find('drugbank:state', ns).text if drug.find('drugbank:state', ns) is not None else None,
-            'groups': [group.text for group in drug.findall('drugbank:groups/drugbank:group', ns)],
-            'salts': [salt.find('drugbank:name', ns).text for salt in drug.findall('drugbank:salts/drugbank:salt', ns)],
-            'classification': {
-                'kingdom': str(classification.find('drugbank:kingdom', ns).text).lower().title() if classification is not None else None,
-                'superclass': str(classification.find('drugbank:superclass',
-                                                      ns).text).lower().capitalize() if classification is not None else None,
-                'class': str(classification.find('drugbank:class',
-                                                 ns).text).lower().capitalize() if classification is not None else None,
-                'subclass': str(classification.find('drugbank:subclass',
-                                                    ns).text).lower().capitalize() if classification is not None else None,
-                'parent': str(classification.find('drugbank:direct-parent',
-                                                  ns).text).lower().capitalize() if classification is not None else None,
-            } if classification is not None else None,
-            'affected_organisms': [organism.text for organism in
-                                   drug.findall('drugbank:affected-organisms/drugbank:affected-organism', ns)],
-            'food_interactions': [interaction.text for interaction in
-                                  drug.findall('drugbank:food-interactions/drugbank:food-interaction', ns)],
-            'drug_interactions': [{'name': interaction.find('drugbank:name', ns).text,
-                                   'description': interaction.find('drugbank:description', ns).text}
-                                  for interaction in
-                                  drug.findall('drugbank:drug-interactions/drugbank:drug-interaction', ns)],
-            'external_links': [link.findtext('drugbank:url', None, ns) for link in drug.findall('drugbank:external-links/drugbank:external-link', ns)],
-        }
+
+def split_drugs_by_type(drugs):
+    """
+    Split drugs into the biotech and small molecule lists, dropping any other type.
+    """
+    biotech_info = []
+    small_molecules_info = []
+
+    for drug_info in drugs:
+        type = drug_info['type']
 
         if type == 'biotech':
             biotech_info.append(drug_info)
         elif type == 'small molecule':
             small_molecules_info.append(drug_info)
 
-    return biotech_info, small_molecules_info, kingdoms, superclasses, classes, subclasses, parents.difference(kingdoms, superclasses, classes, subclasses)
+    return biotech_info, small_molecules_info
 
 
-def save_drug_data(biotech_drugs, small_molecule_drugs):
-    save_to_pickle(biotech_drugs, '../data/extracted-biotech-drugs.pkl')
-    save_to_json(biotech_drugs, '../data/extracted-biotech-drugs.json')
+def extract_drug_info(file_path, workers=1):
+    classification_sets = new_classification_sets()
+    biotech_info, small_molecules_info = split_drugs_by_type(iter_drug_info(file_path, classification_sets, workers))
+
+    return (biotech_info, small_molecules_info) + classification_sets_to_tuple(classification_sets)
 
-    save_to_pickle(small_molecule_drugs, '../data/small-molecule-drugs.pkl')
-    save_to_json(small_molecule_drugs, '../data/small-molecule-drugs.json')
+
+def classification_sets_to_tuple(classification_sets):
+    """
+    Return (kingdoms, superclasses, classes, subclasses, parents) with the parents that are already
+    another classification level removed.
+    """
+    kingdoms = classification_sets['kingdoms']
+    superclasses = classification_sets['superclasses']
+    classes = classification_sets['classes']
+    subclasses = classification_sets['subclasses']
+    parents = classification_sets['parents']
+
+    return kingdoms, superclasses, classes, subclasses, parents.difference(kingdoms, superclasses, classes, subclasses)
+
+
+def save_drug_data(biotech_drugs, small_molecule_drugs):
+    save_drug_columns(biotech_drugs, '../data/extracted-biotech-drugs.col')
+    save_drug_columns(small_molecule_drugs, '../data/small-molecule-drugs.col')
 
 
 def extract_classification_sets_with_number_of_items(drugs):
@@ -254,55 +450,31 @@ def create_interaction_relationships(drugs, type):
     return relationships
 
 
-def extract_disease_info(filepath):
-    diseases = []
-    with open(filepath, 'r') as file:
-        reader = csv.DictReader(file, delimiter='\t')
-        for row in reader:
-            mesh_id = row['MESH_ID'].replace('MESH:', '')
-            if "D" in mesh_id:
-                diseases.append({
-                    'name': row['Name'],
-                    'doid': mesh_id,
-                    'definition': row['Definitions'],
-                    'synonyms': row['Synonyms'].split("|"),
-                })
+def extract_disease_info(filepath, needed_ids=None):
+    """
+    Read the diseases (MESH "D" terms) of a CTD diseases vocabulary TSV (see iter_disease_info).
 
-    return diseases
+    :param needed_ids: Disease IDs to keep, such as the needed_disease_ids of the association file (default: all).
+    """
+    return list(iter_disease_info(filepath, needed_ids))
 
 
 def save_disease_data(diseases):
     sorted_diseases = sorted(diseases, key=lambda k: k['doid'])
 
-    save_to_json(sorted_diseases, "../data/extracted-diseases.json")
-    save_to_pickle(sorted_diseases, '../data/extracted-diseases.pkl')
+    save_disease_columns(sorted_diseases, '../data/extracted-diseases.col')
 
 
-def create_disease_nodes_and_relations(drugs, extracted_diseases = "../data/extracted-diseases.pkl", diseases_file_path = '../data/extracted-disease-drug.tsv'):
-    diseases = load_from_pickle(extracted_diseases)
-
-    drug_names = {d['drugbank-id']: d['name'] for d in drugs}
-    disease_names = {d['doid']: d['name'] for d in diseases}
-
-    diseases_set = set()
-    relationships_set = set()
+def create_disease_nodes_and_relations(drugs, extracted_diseases = "../data/extracted-diseases.col", diseases_file_path = '../data/extracted-disease-drug.tsv', drug_subset=False):
+    """
+    Join the disease-drug association file with the extracted diseases and the drugs (see DiseaseDrugJoin).
 
-    rows = []
-
-    with open(diseases_file_path, 'r') as file:
-        reader = csv.DictReader(file, delimiter='\t')
-        for row in reader:
-            rows.append(row)
-            diseases_set.add(row['Disease'])
-
-    for row in rows:
-        disease_name = disease_names[row['Disease']]
-        drug_name = drug_names[row['Drug']]
-        relationships_set.add(('Disease', disease_name, 'Drug', drug_name))
-
-    diseases_to_create = [d for d in diseases if d['doid'] in diseases_set]
-
-    return diseases_to_create, relationships_set
+    :param drug_subset: drugs is only part of the drugs of the association file, rows of the other drugs are skipped.
+    :return: The diseases linked to at least one drug, and a generator of the disease-drug relations
+             that reads the association file when consumed.
+    """
+    join = DiseaseDrugJoin(drugs, extracted_diseases, diseases_file_path, drug_subset=drug_subset)
+    return join.linked_diseases(), join.relations()
 
 
 def loadEnvVars():
@@ -316,16 +488,23 @@ def loadEnvVars():
     return uri, user, password
 
 
-def create_graph_save_locally(file_path, output_path = '../data/drugs_diseases_graph.graphml'):
-    biotech, small_molecule, kingdoms, superclasses, classes, subclasses, parents = extract_drug_info(file_path)
-    save_drug_data(biotech, small_molecule)
+def drug_node_attributes(drug):
+    return {
+        'id': drug['drugbank-id'],
+        'type': drug['type'],
+        'state': drug['state'] if drug['state'] else '',
+        'groups': ','.join(drug['groups']) if drug['groups'] else '',
+        'salts': ','.join(drug['salts']) if drug['salts'] else '',
+        'affected_organisms': ','.join(drug['affected_organisms']) if drug['affected_organisms'] else '',
+        'external_links': ','.join(drug['external_links']) if drug['external_links'] else '',
+    }
 
-    drugs = biotech + small_molecule
-
-    graph = nx.Graph()
-    root_node = 'Kingdoms'
-    graph.add_node(root_node, type='root')
 
+def add_drugs_to_graph(graph, drugs, kingdoms, superclasses, classes, subclasses, parents, drug_relations, diseases, disease_relations):
+    """
+    Add classification, drug and disease nodes and their relationships to a local graph. Existing
+    nodes get their attributes updated.
+    """
     graph.add_nodes_from(kingdoms, type='kingdom')
     graph.add_nodes_from(superclasses, type='superclass')
     graph.add_nodes_from(classes, type='class')
@@ -333,93 +512,44 @@ def create_graph_save_locally(file_path, output_path = '../data/drugs_diseases_g
     graph.add_nodes_from(parents, type='parent')
 
     for drug in drugs:
-        groups_str = ','.join(drug['groups']) if drug['groups'] else ''
-        salts_str = ','.join(drug['salts']) if drug['salts'] else ''
-        affected_orgs_str = ','.join(drug['affected_organisms']) if drug['affected_organisms'] else ''
-        links_str = ','.join(drug['external_links']) if drug['external_links'] else ''
-
-        graph.add_node(drug['name'], id=drug['drugbank-id'], type=drug['type'],
-                       state=drug['state'] if drug['state'] else '', groups=groups_str, salts=salts_str, affected_organisms=affected_orgs_str, external_links=links_str)
-
-
-    drug_relations = create_classification_relationships(drugs)
+        graph.add_node(drug['name'], **drug_node_attributes(drug))
 
     for relation in drug_relations:
         graph.add_edge(relation[1], relation[3], type=f'HAS_{str(relation[2]).upper()}')
 
-    diseases, disease_relations = create_disease_nodes_and_relations(drugs)
     for disease in diseases:
         synonyms_str = ','.join(disease['synonyms'])
-        graph.add_node(disease['name'], id=disease['doid'], definition=disease['definition'],synonyms=synonyms_str)
+        graph.add_node(disease['name'], id=disease['doid'], definition=disease['definition'], synonyms=synonyms_str)
 
     for relation in disease_relations:
         graph.add_edge(relation[1], relation[3], type='INDICATES')
 
 
-    nx.write_graphml(graph, output_path)
-    print(f"Graph saved to {output_path}")
+def create_graph_save_locally(file_path, output_path = '../data/drugs_diseases_graph.graphml', workers=1, compact=False):
+    """
+    Build the drugs and diseases graph and save it. With compact, the graph is held in a CompactGraph
+    instead of an nx.Graph.
 
-def update_graph_save_locally(input_file, graph_file, output_file):
-    graph = nx.read_graphml(graph_file)
-
-    biotech, small_molecule, kingdoms, superclasses, classes, subclasses, parents = extract_drug_info(input_file)
+    :return: The extracted drugs.
+    """
+    classification_sets = new_classification_sets()
+    biotech, small_molecule = split_drugs_by_type(iter_drug_info(file_path, classification_sets, workers))
+    kingdoms, superclasses, classes, subclasses, parents = classification_sets_to_tuple(classification_sets)
+    save_drug_data(biotech, small_molecule)
 
     drugs = biotech + small_molecule
 
-    def add_or_update_nodes(items, type):
-        for item in items:
-            if not graph.has_node(item):
-                graph.add_node(item, type=type)
-
-    add_or_update_nodes(kingdoms, 'kingdom')
-    add_or_update_nodes(superclasses, 'superclass')
-    add_or_update_nodes(classes, 'class')
-    add_or_update_nodes(subclasses, 'subclass')
-    add_or_update_nodes(parents, 'parent')
-
-    for drug in drugs:
-        if not graph.has_node(drug['name']):
-            groups_str = ','.join(drug['groups']) if drug['groups'] else ''
-            salts_str = ','.join(drug['salts']) if drug['salts'] else ''
-            affected_orgs_str = ','.join(drug['affected_organisms']) if drug['affected_organisms'] else ''
-            links_str = ','.join(drug['external_links']) if drug['external_links'] else ''
-
-            graph.add_node(drug['name'], id=drug['drugbank-id'], type=drug['type'],
-                           state=drug['state'] if drug['state'] else '', groups=groups_str, salts=salts_str,
-                           affected_organisms=affected_orgs_str, external_links=links_str)
-        # else:
-        #     node = graph.nodes[drug['name']]
-        #
-        #     graph.nodes[drug['name']]['drugbank-id'] = drug['drugbank-id'] if (drug['drugbank-id'] != node[
-        #         'drugbank-id']) and (drug['drugbank-id'] != 'None') else node['drugbank-id']
-        #     graph.nodes[drug['name']]['type'] = drug['type'] if drug['type'] != node['type'] else node['type']
-        #     graph.nodes[drug['name']]['state'] = drug['state'] if drug['state'] != node['state'] else node['state']
-        #     graph.nodes[drug['name']]['groups'] = ','.join(drug['groups']) if drug['groups'] else node['groups']
-        #     graph.nodes[drug['name']]['salts'] = ','.join(drug['salts']) if drug['salts'] else node['salts']
-        #     graph.nodes[drug['name']]['affected_organisms'] = ','.join(drug['affected_organisms']) if drug[
-        #         'affected_organisms'] else node['affected_organisms']
-        #     graph.nodes[drug['name']]['external_links'] = ','.join(drug['external_links']) if drug[
-        #         'external_links'] else node['external_links']
+    graph = CompactGraph() if compact else nx.Graph()
+    root_node = 'Kingdoms'
+    graph.add_node(root_node, type='root')
 
     drug_relations = create_classification_relationships(drugs)
-
-    for relation in drug_relations:
-        if not graph.has_edge(relation[1], relation[3]):
-            graph.add_edge(relation[1], relation[3], type=f'HAS_{str(relation[2]).upper()}')
-
     diseases, disease_relations = create_disease_nodes_and_relations(drugs)
-    for disease in diseases:
-        if not graph.has_node(disease['name']):
-            synonyms_str = ','.join(disease['synonyms'])
-            graph.add_node(disease['name'], id=disease['doid'], definition=disease['definition'], synonyms=synonyms_str)
-        # else:
-        #     node = graph.nodes[disease['name']]
-        #     graph.nodes[disease['name']]['definition'] = disease['definition'] if disease['definition'] else node['definition']
-        #     graph.nodes[disease['name']]['synonyms'] = ','.join(disease['synonyms']) if disease['synonyms'] else node['synonyms']
 
-    for relation in disease_relations:
-        if not graph.has_edge(relation[1], relation[3]):
-            graph.add_edge(relation[1], relation[3], type='INDICATES')
+    add_drugs_to_graph(graph, drugs, kingdoms, superclasses, classes, subclasses, parents, drug_relations,
+                       diseases, disease_relations)
+
+    write_graph(graph, output_path)
+    print(f"Graph saved to {output_path}")
 
-    nx.write_graphml(graph, output_file)
-    print(f"Graph updated and saved to {output_file}")
\ No newline at end of file
+    return drugs
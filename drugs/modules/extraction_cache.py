@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from modules.extract_data import EXTRACTOR_VERSION, extract_drug_info, save_to_pickle, load_from_pickle
+from modules.columnar_store import save_drug_columns, open_columnar
+
+
+CACHE_ARTIFACTS = ('extracted-biotech-drugs.col', 'small-molecule-drugs.col', 'classification-sets.pkl')
+FILE_HASHES = 'file-hashes.json'
+
+
+def file_hash(file_path, block_size=4 * 1024 * 1024):
+    """
+    Compute the SHA-256 hex digest of a file, reading it in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        while block := file.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_file_hashes(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, FILE_HASHES), 'r') as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_file_hashes(cache_dir, hashes):
+    path = os.path.join(cache_dir, FILE_HASHES)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as json_file:
+        json.dump(hashes, json_file)
+    os.replace(temp_path, path)
+
+
+def get_cache_key(file_path, cache_dir):
+    """
+    Return the cache key of a source file: its content hash plus the extractor version.
+
+    The hash of a file is remembered by (path, size, mtime), so an unchanged file is not re-read.
+    """
+    stat = os.stat(file_path)
+    path = os.path.abspath(file_path)
+    hashes = _load_file_hashes(cache_dir)
+
+    entry = hashes.get(path)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        digest = entry['sha256']
+    else:
+        digest = file_hash(file_path)
+        hashes[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+        _save_file_hashes(cache_dir, hashes)
+
+    return f"{digest}-v{EXTRACTOR_VERSION}"
+
+
+def load_cached_extraction(cache_dir, key):
+    """
+    Load the extraction stored under key, or return None on a cache miss.
+    """
+    generation_dir = os.path.join(cache_dir, key)
+    if not all(os.path.isfile(os.path.join(generation_dir, name)) for name in CACHE_ARTIFACTS):
+        return None
+
+    with open_columnar(os.path.join(generation_dir, 'extracted-biotech-drugs.col')) as store:
+        biotech = list(store.rows())
+    with open_columnar(os.path.join(generation_dir, 'small-molecule-drugs.col')) as store:
+        small_molecule = list(store.rows())
+    classification_sets = load_from_pickle(os.path.join(generation_dir, 'classification-sets.pkl'))
+
+    os.utime(generation_dir)
+    return (biotech, small_molecule) + tuple(classification_sets)
+
+
+def save_cached_extraction(cache_dir, key, extraction):
+    """
+    Store an extract_drug_info result under key. The generation directory is written aside and
+    renamed into place, so an interrupted run never leaves a partial generation behind.
+    """
+    biotech, small_molecule, *classification_sets = extraction
+    generation_dir = os.path.join(cache_dir, key)
+    temp_dir = tempfile.mkdtemp(prefix=f".{key}-", dir=cache_dir)
+
+    try:
+        save_drug_columns(biotech, os.path.join(temp_dir, 'extracted-biotech-drugs.col'))
+        save_drug_columns(small_molecule, os.path.join(temp_dir, 'small-molecule-drugs.col'))
+        save_to_pickle(classification_sets, os.path.join(temp_dir, 'classification-sets.pkl'))
+
+        shutil.rmtree(generation_dir, ignore_errors=True)
+        os.replace(temp_dir, generation_dir)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+
+def evict_old_generations(cache_dir, keep=2):
+    """
+    Remove all but the keep most recently used generations from the cache directory.
+    """
+    generations = [entry for entry in os.scandir(cache_dir) if entry.is_dir() and not entry.name.startswith('.')]
+    generations.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+
+    for entry in generations[keep:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+        print(f"Evicted extraction cache generation {entry.name}")
+
+
+def extract_drug_info_cached(file_path, cache_dir, workers=1, keep=2):
+    """
+    Return the extract_drug_info result for a DrugBank XML file, parsing it only on a cache miss.
+
+    :param file_path: DrugBank XML file path.
+    :param cache_dir: Directory holding the cache generations.
+    :param workers: Number of processes used on a cache miss (see iter_drug_info).
+    :param keep: Number of generations kept after a new one is stored (default: 2).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    key = get_cache_key(file_path, cache_dir)
+
+    extraction = load_cached_extraction(cache_dir, key)
+    if extraction is not None:
+        print(f"Extraction cache hit for {file_path}")
+        return extraction
+
+    print(f"Extraction cache miss for {file_path}, parsing")
+    extraction = extract_drug_info(file_path, workers)
+    save_cached_extraction(cache_dir, key, extraction)
+    evict_old_generations(cache_dir, keep)
+
+    return extraction
@@ -0,0 +1,65 @@
+from itertools import chain
+
+from modules.extract_data import (new_classification_sets, iter_drug_info, split_drugs_by_type,
+                                  classification_sets_to_tuple, create_classification_relationships,
+                                  create_disease_nodes_and_relations)
+from common.neo4j_admin_export import Neo4jAdminExport, array_field
+
+
+def relationship_ends(rel):
+    """
+    Return (type, start label, start ID, end label, end ID) of a relationship tuple, following the
+    directions used by Neo4jDrugsGraphClass.
+    """
+    if rel[0] == 'Disease':
+        return 'INDICATES', rel[2], rel[3], rel[0], rel[1]
+    return f'HAS_{str(rel[2]).upper()}', rel[0], rel[1], rel[2], rel[3]
+
+
+def export_drugs_neo4j_admin(drugs, kingdoms, superclasses, classes, subclasses, parents, relationships, diseases, disease_relations, output_dir):
+    """
+    Export the drugs and diseases graph (the create_or_update_graph arguments) for neo4j-admin import.
+    """
+    export = Neo4jAdminExport(output_dir)
+
+    export.add_nodes('Root', 'name', [], [('Kingdoms',)])
+    export.add_nodes('Unclassified', 'name', [], [('Unclassified',)])
+    export.add_nodes('Kingdom', 'name', [], ((name,) for name in kingdoms))
+    export.add_nodes('Superclass', 'name', [], ((name,) for name in superclasses))
+    export.add_nodes('Class', 'name', [], ((name,) for name in classes))
+    export.add_nodes('Subclass', 'name', [], ((name,) for name in subclasses))
+    export.add_nodes('Parent', 'name', [], ((name,) for name in parents))
+    export.add_nodes('Drug', 'name',
+                     ['drugbank_id', 'type', 'state', 'groups:string[]', 'salts:string[]',
+                      'affected_organisms:string[]', 'external_links:string[]'],
+                     ((drug['name'], drug['drugbank-id'], drug['type'], drug['state'], array_field(drug['groups']),
+                       array_field(drug['salts']), array_field(drug['affected_organisms']), array_field(drug['external_links']))
+                      for drug in drugs))
+    export.add_nodes('Disease', 'name', ['do_id', 'definition', 'synonyms:string[]'],
+                     ((d['name'], d['doid'], d['definition'], array_field(d['synonyms'])) for d in diseases))
+
+    groups = {}
+    for rel in chain(relationships, disease_relations):
+        rel_type, start_label, start, end_label, end = relationship_ends(rel)
+        groups.setdefault((rel_type, start_label, end_label), []).append((start, end))
+
+    for (rel_type, start_label, end_label), pairs in sorted(groups.items(), key=lambda item: tuple(map(str, item[0]))):
+        export.add_relationships(rel_type, start_label, end_label, pairs)
+
+    export.write_import_script()
+
+
+def export_drugbank_neo4j_admin(file_path, output_dir, workers=1):
+    """
+    Extract a DrugBank XML file and export it for neo4j-admin import.
+    """
+    classification_sets = new_classification_sets()
+    biotech, small_molecule = split_drugs_by_type(iter_drug_info(file_path, classification_sets, workers))
+    kingdoms, superclasses, classes, subclasses, parents = classification_sets_to_tuple(classification_sets)
+
+    drugs = biotech + small_molecule
+    relationships = create_classification_relationships(drugs)
+    diseases, disease_relations = create_disease_nodes_and_relations(drugs)
+
+    export_drugs_neo4j_admin(drugs, kingdoms, superclasses, classes, subclasses, parents, relationships,
+                             diseases, disease_relations, output_dir)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The tests import the modules of the drugs pipeline and the common directory, as the scripts do
+DRUGS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(DRUGS_DIR)
+sys.path.append(os.path.dirname(DRUGS_DIR))
@@ -0,0 +1,94 @@
+import asyncio
+
+import neo4j.exceptions
+import pytest
+
+from common.async_batch_writer import write_stage
+
+
+class FakeResult:
+    async def consume(self):
+        pass
+
+
+class FakeTransaction:
+    def __init__(self, queries):
+        self.queries = queries
+
+    async def run(self, query, **parameters):
+        self.queries.append(parameters['batch'])
+        return FakeResult()
+
+
+class FakeSession:
+    """
+    Async session that commits the queries of a transaction unless it fails with the next error of
+    errors, then records the attempt.
+    """
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.committed = []
+        self.attempts = 0
+
+    async def execute_write(self, work, *args):
+        self.attempts += 1
+        queries = []
+        await work(FakeTransaction(queries), *args)
+        await asyncio.sleep(0)
+        if self.errors:
+            raise self.errors.pop(0)
+        self.committed.extend(queries)
+
+
+def add_items(tx, batch):
+    tx.run("UNWIND $batch AS item CREATE (:Item {id: item})", batch=batch)
+
+
+def test_transient_errors_are_retried():
+    session = FakeSession([neo4j.exceptions.TransientError(), neo4j.exceptions.TransientError()])
+
+    asyncio.run(write_stage(session, range(5), add_items, 'items', 2, retry_delay=0))
+
+    assert session.committed == [[0, 1], [2, 3], [4]]
+    assert session.attempts == 5
+
+
+def test_transient_errors_give_up_after_max_retries():
+    session = FakeSession([neo4j.exceptions.TransientError()] * 3)
+
+    with pytest.raises(neo4j.exceptions.TransientError):
+        asyncio.run(write_stage(session, range(5), add_items, 'items', 2, max_retries=2, retry_delay=0))
+    assert session.attempts == 3
+
+
+class BlockedSession:
+    """
+    Async session whose transactions never commit, until they are cancelled.
+    """
+
+    def __init__(self):
+        self.cancelled = 0
+
+    async def execute_write(self, work, *args):
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def test_failed_preparation_cancels_the_pending_commit():
+    session = BlockedSession()
+
+    def failing_items():
+        yield from range(2)
+        raise ValueError("broken item")
+
+    async def run():
+        with pytest.raises(ValueError):
+            await write_stage(session, failing_items(), add_items, 'items', 2)
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert asyncio.run(run()) == []
+    assert session.cancelled == 1
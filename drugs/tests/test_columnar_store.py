@@ -0,0 +1,36 @@
+import pickle
+
+from modules.columnar_store import DRUG_COLUMNS, DISEASE_COLUMNS, ensure_columnar, open_columnar
+from modules.extract_data import create_disease_nodes_and_relations
+
+
+DISEASES = [{'name': 'Disease a', 'doid': 'D1', 'definition': 'def a', 'synonyms': ['a', 'b']},
+            {'name': 'Disease b', 'doid': 'D2', 'definition': '', 'synonyms': ['']}]
+
+
+def test_disease_pickle_of_older_extraction(tmp_path):
+    with open(tmp_path / 'extracted-diseases.pkl', 'wb') as pickle_file:
+        pickle.dump(DISEASES, pickle_file)
+    (tmp_path / 'extracted-disease-drug.tsv').write_text('Disease\tDrug\nD1\tDB1\nD2\tDB2\n', encoding='utf-8')
+
+    drugs = [{'drugbank-id': 'DB1', 'name': 'Drug a'}]
+    diseases, relations = create_disease_nodes_and_relations(drugs, str(tmp_path / 'extracted-diseases.pkl'),
+                                                             str(tmp_path / 'extracted-disease-drug.tsv'))
+
+    assert diseases == [DISEASES[0]]
+    assert list(relations) == [('Disease', 'Disease a', 'Drug', 'Drug a')]
+    # The pickle is converted once, a missing .col path is read from the converted file
+    assert (tmp_path / 'extracted-diseases.col').exists()
+    assert ensure_columnar(str(tmp_path / 'extracted-diseases.col'), DISEASE_COLUMNS) == str(tmp_path / 'extracted-diseases.col')
+
+
+def test_drug_pickle_round_trip(tmp_path):
+    drug = {'drugbank-id': 'DB1', 'type': 'biotech', 'name': 'Drug a', 'state': None, 'groups': ['approved'],
+            'salts': [], 'classification': {'kingdom': 'Organic compounds', 'superclass': 'Benzenoids',
+                                            'class': 'Phenols', 'subclass': 'None', 'parent': 'Phenols'},
+            'affected_organisms': [], 'food_interactions': [], 'drug_interactions': [], 'external_links': []}
+    with open(tmp_path / 'drugs.pkl', 'wb') as pickle_file:
+        pickle.dump([drug], pickle_file)
+
+    with open_columnar(ensure_columnar(str(tmp_path / 'drugs.pkl'), DRUG_COLUMNS)) as converted:
+        assert list(converted.rows()) == [drug]
@@ -0,0 +1,18 @@
+import pytest
+
+from modules.compact_graph import CompactGraph
+
+
+def test_node_attributes_are_written_through():
+    graph = CompactGraph()
+    graph.add_node('Aspirin', type='drug', state='solid')
+
+    graph.nodes['Aspirin']['type'] = 'small molecule'
+    graph.nodes['Aspirin']['groups'] = 'approved'
+    del graph.nodes['Aspirin']['state']
+
+    assert dict(graph.nodes['Aspirin']) == {'type': 'small molecule', 'groups': 'approved'}
+    assert dict(graph.nodes(data=True)) == {'Aspirin': {'type': 'small molecule', 'groups': 'approved'}}
+    assert graph.to_networkx().nodes['Aspirin'] == {'type': 'small molecule', 'groups': 'approved'}
+    with pytest.raises(KeyError):
+        del graph.nodes['Aspirin']['state']
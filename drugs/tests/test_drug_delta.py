@@ -0,0 +1,105 @@
+import networkx as nx
+import pytest
+
+from common.graph_snapshot import read_graph
+from modules.columnar_store import save_disease_columns
+from modules.drug_delta import update_graph_save_locally, fingerprint_drugs, save_fingerprints, fingerprints_path
+from modules.extract_data import create_graph_save_locally
+
+
+def drug_record(drug_id, name, drug_type, drug_class, parent, subclass='Phenols'):
+    return (f'<drug type="{drug_type}" created="2005-06-13">'
+            f'<drugbank-id primary="true">{drug_id}</drugbank-id><name>{name}</name><groups/><salts/>'
+            f'<classification><direct-parent>{parent}</direct-parent><kingdom>Organic compounds</kingdom>'
+            f'<superclass>Benzenoids</superclass><class>{drug_class}</class><subclass>{subclass}</subclass>'
+            f'</classification></drug>')
+
+
+def write_drugbank(path, records):
+    path.write_text('<?xml version="1.0" encoding="UTF-8"?>\n<drugbank xmlns="http://www.drugbank.ca" version="5.1">\n'
+                    + '\n'.join(records) + '\n</drugbank>\n', encoding='utf-8')
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """
+    Working directory with the ../data files the graph functions read and write.
+    """
+    data = tmp_path / 'data'
+    data.mkdir()
+    save_disease_columns([{'name': 'Disease a', 'doid': 'D1', 'definition': '', 'synonyms': []}],
+                         str(data / 'extracted-diseases.col'))
+    (data / 'extracted-disease-drug.tsv').write_text('Disease\tDrug\nD1\tDB1\n', encoding='utf-8')
+
+    run = tmp_path / 'run'
+    run.mkdir()
+    monkeypatch.chdir(run)
+    return run
+
+
+def update_and_create(workdir, old_records, new_records, compact):
+    """
+    Update the graph of old_records with new_records, and create the graph of new_records from scratch.
+    """
+    write_drugbank(workdir / 'old.xml', old_records)
+    write_drugbank(workdir / 'new.xml', new_records)
+
+    drugs = create_graph_save_locally('old.xml', 'old.gsnap', compact=compact)
+    save_fingerprints(fingerprint_drugs('old.xml', drugs), fingerprints_path('old.gsnap'))
+    delta = update_graph_save_locally('new.xml', 'old.gsnap', 'updated.gsnap', compact=compact)
+    create_graph_save_locally('new.xml', 'new.gsnap', compact=compact)
+
+    return delta, read_graph('updated.gsnap'), read_graph('new.gsnap')
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_parent_orphaned_through_unchanged_drug(workdir, compact):
+    # Drug a does not change, but its parent becomes a class through drug b and is no parent node anymore
+    old_records = [drug_record('DB1', 'Drug a', 'small molecule', 'Phenols', 'Fatty acids', 'Terpenoids'),
+                   drug_record('DB2', 'Drug b', 'biotech', 'Prenol lipids', 'Monoterpenoids')]
+    new_records = [old_records[0],
+                   drug_record('DB2', 'Drug b', 'biotech', 'Fatty acids', 'Monoterpenoids')]
+
+    delta, updated, created = update_and_create(workdir, old_records, new_records, compact)
+
+    assert delta['unchanged'] == 1
+    assert ('Parent', 'Fatty acids') in delta['removed_classifications']
+    assert ('Class', 'Prenol lipids') in delta['removed_classifications']
+    assert updated.nodes['Fatty acids']['type'] == 'class'
+    assert 'Prenol lipids' not in updated
+    assert nx.utils.graphs_equal(updated, created)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_drug_changed_to_another_type(workdir, compact):
+    # Drug b is dropped from the graph, the classification of its record is still part of it
+    old_records = [drug_record('DB1', 'Drug a', 'small molecule', 'Prenol lipids', 'Monoterpenoids'),
+                   drug_record('DB2', 'Drug b', 'biotech', 'Fatty acyls', 'Long-chain fatty acids')]
+    new_records = [old_records[0],
+                   drug_record('DB2', 'Drug b', 'unknown', 'Fatty acyls', 'Long-chain fatty acids')]
+
+    delta, updated, created = update_and_create(workdir, old_records, new_records, compact)
+
+    assert delta['removed'] == [['DB2', 'Drug b']]
+    assert not delta['added'] and not delta['updated']
+    assert 'Drug b' not in updated
+    assert updated.nodes['Fatty acyls']['type'] == 'class'
+    assert nx.utils.graphs_equal(updated, created)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_class_kept_by_unchanged_drug_of_another_type(workdir, compact):
+    # Drug b leaves its class, which is still used by a drug that is not written to the graph
+    old_records = [drug_record('DB1', 'Drug a', 'small molecule', 'Prenol lipids', 'Monoterpenoids'),
+                   drug_record('DB2', 'Drug b', 'biotech', 'Fatty acyls', 'Long-chain fatty acids'),
+                   drug_record('DB3', 'Drug c', 'unknown', 'Fatty acyls', 'Alpha amino acids')]
+    new_records = [old_records[0],
+                   drug_record('DB2', 'Drug b', 'biotech', 'Prenol lipids', 'Long-chain fatty acids'),
+                   old_records[2]]
+
+    delta, updated, created = update_and_create(workdir, old_records, new_records, compact)
+
+    assert delta['updated'][0]['name'] == 'Drug b'
+    assert not updated.has_edge('Benzenoids', 'Fatty acyls')
+    assert updated.nodes['Fatty acyls']['type'] == 'class'
+    assert nx.utils.graphs_equal(updated, created)
@@ -1,111 +1,103 @@
 import os
+import sys
+from functools import lru_cache
 from dotenv import load_dotenv
-import pandas as pd
-import networkx as nx
-from pyvis.network import Network
 from pathlib import Path
-from neo4j import GraphDatabase
-
-# Load the data
-indications = pd.read_csv('data/indications.tsv', sep='\t')
-diseases = pd.read_csv('data/diseases.tsv', sep='\t')
-drugs = pd.read_csv('data/drugs.tsv', sep='\t')
-# ===============================================================================
-# Create a graph
-# G = nx.Graph()
-#
-# # Add disease nodes
-# for _, row in diseases.iterrows():
-#     G.add_node(row['doid_id'], label=row['disease'], type='disease', title=f"Disease: {row['disease']}")
-#
-# # Add drug nodes
-# for _, row in drugs.iterrows():
-#     G.add_node(row['drugbank_id'], label=row['drug'], type='drug', title=f"Drug: {row['drug']}")
-#
-# # Add edges based on indications
-# for _, row in indications.iterrows():
-#     G.add_edge(row['doid_id'], row['drugbank_id'], label=row['category'], title=f"Category: {row['category']}")
-#
-# # ================== Create a pyvis network ==================
-# net = Network(notebook=True, width="1920", height="1080")
-# net.from_nx(G)
-#
-# # Customize the appearance
-# for node in net.nodes:
-#     if node['type'] == 'disease':
-#         node['color'] = 'red'
-#     elif node['type'] == 'drug':
-#         node['color'] = 'blue'
-#
-# # Show the network
-# net.show("pyvis-output/knowledge_graph_drugs_and_diseases.html")
-# ===============================================================================
-
-# Print nodes
-# print("Nodes:")
-# for node, data in G.nodes(data=True):
-#     print(f"{node}: {data}")
-#
-# # Print edges
-# print("\nEdges:")
-# for u, v, data in G.edges(data=True):
-#     print(f"{u} - {v}: {data}")
-# Connect to Neo4j
+# The modules shared by the pipelines are in the common directory of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The modules of this pipeline, also when it is imported from outside of its directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from modules.custom_help_formater import save_neo4j_args
+
+# pandas, neo4j and the loader are imported on first use, so importing this module stays cheap
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def load_env_vars():
+    env_path = Path('..', 'proba.env')
+    load_dotenv(dotenv_path=env_path)
+
+    uri = os.getenv("URI_DRUGS")
+    user = os.getenv("USER_DRUGS")
+    password = os.getenv("PASSWORD_DRUGS")
+
+    return uri, user, password
+
+
+@lru_cache(maxsize=None)
+def read_table(data_dir, name):
+    """
+    Read one TSV file of the data directory into a DataFrame, once per process. The DataFrame is
+    shared by every caller and must not be modified in place.
+    """
+    import pandas as pd
+
+    return pd.read_csv(os.path.join(data_dir, f'{name}.tsv'), sep='\t')
+
+
+def get_diseases(data_dir=DATA_DIR):
+    return read_table(data_dir, 'diseases')
+
+
+def get_drugs(data_dir=DATA_DIR):
+    return read_table(data_dir, 'drugs')
+
+
+def get_indications(data_dir=DATA_DIR):
+    return read_table(data_dir, 'indications')
 
-# ===============================================================================
-env_path = Path('..', 'proba.env')
-load_dotenv(dotenv_path=env_path)
 
-uri = os.getenv("URI_DRUGS")
-user = os.getenv("USER_DRUGS")
-password = os.getenv("PASSWORD_DRUGS")
-print(uri, user, password, sep="\n")
+def build(data_dir=DATA_DIR, batch_size=1000, concurrency=1, uri=None, user=None, password=None):
+    """
+    Save the drugs and diseases indications graph to Neo4j.
 
-driver = GraphDatabase.driver(uri, auth=(user, password))
+    :param data_dir: Directory with the diseases.tsv, drugs.tsv and indications.tsv files.
+    :param batch_size: Number of rows sent per UNWIND statement and transaction (default: 1000).
+    :param concurrency: Number of batches written to Neo4j in parallel (default: 1).
+    :param uri: Neo4j URI, user and password, read from the URI_DRUGS, USER_DRUGS and PASSWORD_DRUGS
+                environment variables (and ../proba.env) when not given.
+    :return: List of (stage name, items written, seconds) tuples.
+    """
+    from neo4j import GraphDatabase
+    from modules.indications_loader import load_drugs_and_diseases
 
+    if uri is None or user is None or password is None:
+        env_uri, env_user, env_password = load_env_vars()
+        uri, user, password = uri or env_uri, user or env_user, password or env_password
 
-def create_constraints(tx):
-    tx.run("CREATE CONSTRAINT FOR (d:Disease) REQUIRE d.doid_id IS UNIQUE")
-    tx.run("CREATE CONSTRAINT FOR (d:Drug) REQUIRE d.drugbank_id IS UNIQUE")
+    if not isinstance(uri, str) or not uri:
+        raise ValueError("The 'URI_DRUGS' environment variable is missing or is not a non-empty string.")
 
+    if not isinstance(user, str) or not user:
+        raise ValueError("The 'USER_DRUGS' environment variable is missing or is not a non-empty string.")
 
-def add_disease_nodes(tx, diseases):
-    for _, row in diseases.iterrows():
-        query = (
-            "MERGE (d:Disease {doid_id: $doid_id, name: $name, DM: $DM, SYM: $SYM, NOT: $NOT, total: $total})"
-        )
-        tx.run(query, doid_id=row['doid_id'], name=row['disease'], DM=row['DM'], SYM=row['SYM'], NOT=row['NOT'],
-               total=row['total'])
+    if not isinstance(password, str) or not password:
+        raise ValueError("The 'PASSWORD_DRUGS' environment variable is missing or is not a non-empty string.")
 
+    driver = GraphDatabase.driver(uri, auth=(user, password))
+    try:
+        return load_drugs_and_diseases(driver, get_diseases(data_dir), get_drugs(data_dir), get_indications(data_dir),
+                                       batch_size, concurrency)
+    finally:
+        driver.close()
 
-def add_drug_nodes(tx, drugs):
-    for _, row in drugs.iterrows():
-        query = (
-            "MERGE (d:Drug {drugbank_id: $drugbank_id, name: $name, DM: $DM, SYM: $SYM, NOT: $NOT, total: $total})"
-        )
-        tx.run(query, drugbank_id=row['drugbank_id'], name=row['drug'], DM=row['DM'], SYM=row['SYM'], NOT=row['NOT'],
-               total=row['total'])
 
+def main():
+    args = save_neo4j_args(DATA_DIR)
 
-def add_indication_relationships(tx, indications):
-    for _, row in indications.iterrows():
-        query = (
-            "MATCH (d:Disease {doid_id: $doid_id}), (r:Drug {drugbank_id: $drugbank_id}) "
-            "MERGE (d)-[rel:INDICATES {category: $category, n_curators: $n_curators, n_resources: $n_resources}]->(r)"
-        )
-        tx.run(query, doid_id=row['doid_id'], drugbank_id=row['drugbank_id'], category=row['category'],
-               n_curators=row['n_curators'], n_resources=row['n_resources'])
+    try:
+        build(args.data_dir, args.batch_size, args.concurrency)
+    except ValueError as e:
+        print(e.args[0])
+        sys.exit(1)
 
+    print("Graph has been saved to Neo4j!")
 
-with driver.session() as session:
-    session.write_transaction(create_constraints)
-    session.write_transaction(add_disease_nodes, diseases)
-    session.write_transaction(add_drug_nodes, drugs)
-    session.write_transaction(add_indication_relationships, indications)
 
-print("Graph has been saved to Neo4j!")
+if __name__ == '__main__':
+    main()
 
-driver.close()
 # =======================================================================
 #   ADD/DELETE/UPDATE THE GRAPH
 # def update_or_add_disease_nodes(tx, diseases):
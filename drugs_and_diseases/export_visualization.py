@@ -0,0 +1,34 @@
+import os
+import sys
+# The modules shared by the pipelines are in the common directory of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The modules of this pipeline, also when it is imported from outside of its directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from drugsGraph import DATA_DIR, get_diseases, get_drugs, get_indications
+from modules.custom_help_formater import export_visualization_args
+from common.graph_snapshot import read_graph
+from modules.graph_visualization import indications_graph, export_visualization
+
+
+def main():
+    args = export_visualization_args(DATA_DIR)
+
+    if args.input_file is not None and not os.path.isfile(args.input_file):
+        print(f"The file {args.input_file} does not exist.")
+        sys.exit(1)
+
+    if args.input_file is not None:
+        graph = read_graph(args.input_file)
+    else:
+        graph = indications_graph(get_diseases(args.data_dir), get_drugs(args.data_dir), get_indications(args.data_dir))
+
+    try:
+        export_visualization(graph, args.output_file, args.layout_cache_dir, args.center, args.hops,
+                             args.cluster_size, args.iterations)
+    except ValueError as e:
+        print(e.args[0])
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import argparse
+
+
+class CustomHelpFormatter(argparse.HelpFormatter):
+    def _format_action_invocation(self, action):
+        if action.option_strings:
+            return ', '.join(action.option_strings)
+        return action.dest
+
+
+def save_neo4j_args(data_dir):
+    parser = argparse.ArgumentParser(description="Save the drugs and diseases indications graph to Neo4j.",
+                                     formatter_class=CustomHelpFormatter)
+
+    parser.add_argument("-dd", "--data_dir",
+                        help="Directory with the diseases.tsv, drugs.tsv and indications.tsv files (default: the data directory next to the scripts).",
+                        default=data_dir)
+    parser.add_argument("-b", "--batch_size",
+                        help="Number of rows sent per UNWIND statement and transaction.",
+                        default=1000,
+                        type=int)
+    parser.add_argument("-c", "--concurrency",
+                        help="Number of batches written to Neo4j in parallel.",
+                        default=1,
+                        type=int)
+    return parser.parse_args()
+
+
+def export_visualization_args(data_dir):
+    parser = argparse.ArgumentParser(description="Export an interactive HTML view of the drugs and diseases graph.",
+                                     formatter_class=CustomHelpFormatter)
+
+    parser.add_argument("-if", "--input_file",
+                        help="Graph file of the drugs pipeline (.gsnap snapshot or GraphML). The indications graph of the data directory is used when missing.",
+                        default=None)
+    parser.add_argument("-dd", "--data_dir",
+                        help="Directory with the diseases.tsv, drugs.tsv and indications.tsv files (default: the data directory next to the scripts).",
+                        default=data_dir)
+    parser.add_argument("-of", "--output_file",
+                        help="Output HTML file path.",
+                        default="./pyvis-output/knowledge_graph_drugs_and_diseases.html")
+    parser.add_argument("-lc", "--layout_cache_dir",
+                        help="Directory of the cached layouts, one per graph.",
+                        default="./pyvis-output/layout-cache")
+    parser.add_argument("-ce", "--center",
+                        help="Drug or disease (key, name or ID) at the centre of the view, the whole graph is shown when missing.",
+                        default=None)
+    parser.add_argument("-k", "--hops",
+                        help="Radius of the view around the centre.",
+                        default=2,
+                        type=int)
+    parser.add_argument("-cs", "--cluster_size",
+                        help="Classification groups with at least this many drugs are shown as one cluster node (0 disables clustering).",
+                        default=50,
+                        type=int)
+    parser.add_argument("-it", "--iterations",
+                        help="Iterations of the force layout, computed once per graph.",
+                        default=50,
+                        type=int)
+    return parser.parse_args()
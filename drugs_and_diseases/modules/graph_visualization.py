@@ -0,0 +1,358 @@
+import hashlib
+import json
+import math
+import os
+from collections import deque
+
+import networkx as nx
+import numpy as np
+
+
+# Edge type linking a classification group (kingdom, class, parent, ...) to its drugs in the DrugBank graph
+MEMBER_EDGE_TYPE = 'HAS_DRUG'
+DRUG_TYPES = ('biotech', 'small molecule')
+NODE_COLORS = {'disease': 'red', 'drug': 'blue', 'cluster': 'orange', 'root': 'black'}
+CLASSIFICATION_COLOR = 'gray'
+
+LAYOUT_VERSION = 1
+GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))
+# Pairs of nodes held in memory at once by the repulsion step of force_layout
+LAYOUT_CHUNK_PAIRS = 2000000
+# The force layout, quadratic in the number of nodes, only places this many of the best connected nodes
+LAYOUT_FORCE_NODES = 2000
+MAX_RESPONSIVE_NODES = 5000
+
+
+def indications_graph(diseases, drugs, indications):
+    """
+    Build the indications graph of the diseases, drugs and indications DataFrames: diseases and drugs
+    keyed by their DOID and DrugBank IDs, with an edge per indication.
+    """
+    graph = nx.Graph()
+
+    graph.add_nodes_from(
+        (doid_id, {'label': name, 'type': 'disease', 'title': f"Disease: {name}"})
+        for doid_id, name in zip(diseases['doid_id'].tolist(), diseases['disease'].tolist()))
+    graph.add_nodes_from(
+        (drugbank_id, {'label': name, 'type': 'drug', 'title': f"Drug: {name}"})
+        for drugbank_id, name in zip(drugs['drugbank_id'].tolist(), drugs['drug'].tolist()))
+    graph.add_edges_from(
+        (doid_id, drugbank_id, {'label': category, 'title': f"Category: {category}"})
+        for doid_id, drugbank_id, category in zip(indications['doid_id'].tolist(), indications['drugbank_id'].tolist(),
+                                                  indications['category'].tolist()))
+
+    return graph
+
+
+def node_kind(attrs):
+    """
+    Return the kind of a node: 'disease', 'drug', 'cluster' or the type of a classification node.
+    Works for the indications graph and for the DrugBank graph of the drugs pipeline, whose drugs
+    have their DrugBank type and whose diseases have no type.
+    """
+    node_type = attrs.get('type')
+    if node_type in DRUG_TYPES:
+        return 'drug'
+    if node_type is None and 'definition' in attrs:
+        return 'disease'
+    return node_type or 'classification'
+
+
+def drug_groups(graph):
+    """
+    Return the drugs of every classification group, as group: list of drugs.
+    """
+    groups = {}
+    for u, v, attrs in graph.edges(data=True):
+        if attrs.get('type') == MEMBER_EDGE_TYPE:
+            group, drug = (u, v) if node_kind(graph.nodes[v]) == 'drug' else (v, u)
+            groups.setdefault(group, []).append(drug)
+    return groups
+
+
+def force_layout(graph, iterations=50, seed=42):
+    """
+    Fruchterman-Reingold layout computed with numpy, the repulsion between all pairs of nodes being
+    evaluated in chunks so memory stays linear in the number of nodes.
+
+    :return: Dictionary of node: (x, y), scaled to [-1, 1].
+    """
+    nodes = list(graph)
+    count = len(nodes)
+    if count == 0:
+        return {}
+    if count == 1:
+        return {nodes[0]: (0.0, 0.0)}
+
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(index[u], index[v]) for u, v in graph.edges() if u != v], dtype=np.int64).reshape(-1, 2)
+
+    positions = np.random.default_rng(seed).random((count, 2), dtype=np.float32)
+    k = 1 / math.sqrt(count)
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    chunk_size = max(1, LAYOUT_CHUNK_PAIRS // count)
+
+    for _ in range(iterations):
+        displacement = np.zeros((count, 2), dtype=np.float32)
+        xs, ys = positions[:, 0], positions[:, 1]
+
+        for start in range(0, count, chunk_size):
+            end = start + chunk_size
+            dx = xs[start:end, None] - xs[None, :]
+            dy = ys[start:end, None] - ys[None, :]
+            repulsion = dx * dx
+            repulsion += dy * dy
+            np.maximum(repulsion, 1e-6, out=repulsion)
+            np.divide(k * k, repulsion, out=repulsion)
+            displacement[start:end, 0] += (dx * repulsion).sum(axis=1)
+            displacement[start:end, 1] += (dy * repulsion).sum(axis=1)
+
+        if len(edges):
+            delta = positions[edges[:, 0]] - positions[edges[:, 1]]
+            distance = np.sqrt((delta ** 2).sum(axis=1))
+            force = delta * (distance / k)[:, None]
+            np.add.at(displacement, edges[:, 0], -force)
+            np.add.at(displacement, edges[:, 1], force)
+
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-9)
+        positions += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    positions -= positions.mean(axis=0)
+    positions /= max(np.abs(positions).max(), 1e-9)
+    return {node: (float(x), float(y)) for node, (x, y) in zip(nodes, positions)}
+
+
+def spiral_offset(i, spacing):
+    radius = spacing * math.sqrt(i + 1)
+    angle = i * GOLDEN_ANGLE
+    return radius * math.cos(angle), radius * math.sin(angle)
+
+
+def place_around_neighbours(graph, positions, spacing):
+    """
+    Place the nodes missing from positions in breadth-first order from the placed ones, each at the
+    centre of its placed neighbours on a spiral around the first of them. Nodes of components without
+    any placed node go on a spiral around the layout.
+    """
+    satellites = {}
+    queue = deque(node for node in positions)
+    while queue:
+        for neighbour in graph[queue.popleft()]:
+            if neighbour in positions:
+                continue
+            placed = [positions[node] for node in graph[neighbour] if node in positions]
+            anchor = next(node for node in graph[neighbour] if node in positions)
+            i = satellites[anchor] = satellites.get(anchor, -1) + 1
+            dx, dy = spiral_offset(i, spacing)
+            positions[neighbour] = (sum(x for x, _ in placed) / len(placed) + dx,
+                                    sum(y for _, y in placed) / len(placed) + dy)
+            queue.append(neighbour)
+
+    outside = 0
+    for node in graph:
+        if node not in positions:
+            dx, dy = spiral_offset(outside, spacing)
+            positions[node] = (1.2 * math.copysign(1, dx) + dx, 1.2 * math.copysign(1, dy) + dy)
+            outside += 1
+
+
+def compute_layout(graph, iterations=50, seed=42):
+    """
+    Lay out a graph with its classification groups folded: the force layout only places the groups and
+    the other nodes (the LAYOUT_FORCE_NODES best connected ones on large graphs, the rest being placed
+    around their neighbours), then the drugs of each group are spread on a spiral around it.
+    """
+    groups = drug_groups(graph)
+    member_of = {drug: group for group, drugs in groups.items() for drug in drugs}
+
+    folded = nx.Graph()
+    folded.add_nodes_from(node for node in graph if node not in member_of)
+    folded.add_edges_from((member_of.get(u, u), member_of.get(v, v)) for u, v in graph.edges())
+    folded.remove_edges_from(list(nx.selfloop_edges(folded)))
+
+    spacing = 0.25 / math.sqrt(max(len(folded), 1))
+    if len(folded) > LAYOUT_FORCE_NODES:
+        backbone = sorted(folded, key=lambda node: (-folded.degree(node), str(node)))[:LAYOUT_FORCE_NODES]
+        positions = force_layout(folded.subgraph(backbone), iterations, seed)
+        place_around_neighbours(folded, positions, spacing)
+    else:
+        positions = force_layout(folded, iterations, seed)
+
+    for group, drugs in groups.items():
+        x, y = positions[group]
+        for i, drug in enumerate(sorted(drugs, key=str)):
+            dx, dy = spiral_offset(i, spacing)
+            positions[drug] = (x + dx, y + dy)
+
+    return positions
+
+
+def layout_key(graph, iterations, seed):
+    """
+    Hash of the nodes, edges and layout parameters, naming the cached layout of a graph.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([LAYOUT_VERSION, iterations, seed]).encode('utf-8'))
+    for node in sorted(map(str, graph)):
+        digest.update(node.encode('utf-8') + b'\0')
+    for edge in sorted(tuple(sorted((str(u), str(v)))) for u, v in graph.edges()):
+        digest.update('\t'.join(edge).encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+
+def cached_layout(graph, cache_dir, iterations=50, seed=42):
+    """
+    Return the layout of a graph (see compute_layout), computing it only the first time a graph with
+    these nodes and edges is laid out. Layouts are saved in cache_dir as layout-<key>.json.
+    """
+    cache_path = os.path.join(cache_dir, f"layout-{layout_key(graph, iterations, seed)}.json")
+
+    if os.path.isfile(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as json_file:
+            by_name = {str(node): (x, y) for node, x, y in json.load(json_file)}
+        print(f"Layout loaded from {cache_path}")
+        return {node: by_name[str(node)] for node in graph}
+
+    positions = compute_layout(graph, iterations, seed)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f"{cache_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as json_file:
+        json.dump([[str(node), x, y] for node, (x, y) in positions.items()], json_file)
+    os.replace(temp_path, cache_path)
+    print(f"Layout of {len(positions)} nodes saved to {cache_path}")
+
+    return positions
+
+
+def find_node(graph, query):
+    """
+    Find a node by its key, or by its label, name or ID attribute (case insensitive).
+    Raises ValueError if no node matches.
+    """
+    if query in graph:
+        return query
+
+    lowered = query.lower()
+    for node, attrs in graph.nodes(data=True):
+        if str(node).lower() == lowered or any(str(attrs.get(key, '')).lower() == lowered for key in ('label', 'name', 'id')):
+            return node
+
+    raise ValueError(f"No drug or disease named {query} in the graph.")
+
+
+def aggregate_clusters(graph, positions, min_size=50, keep=()):
+    """
+    Replace the drugs of every classification group with at least min_size drugs by one cluster node,
+    placed at the centre of its drugs. Edges of the clustered drugs are merged into cluster edges
+    whose weight is the number of merged edges.
+
+    :param keep: Nodes never put in a cluster, such as the centre of an ego network.
+    :return: The aggregated graph and its positions.
+    """
+    clustered = {}
+    clusters = {}
+    for group, drugs in drug_groups(graph).items():
+        drugs = [drug for drug in drugs if drug not in keep]
+        if len(drugs) >= min_size:
+            cluster = f"cluster:{group}"
+            clusters[cluster] = (group, drugs)
+            for drug in drugs:
+                clustered[drug] = cluster
+
+    if not clusters:
+        return graph, positions
+
+    aggregated = nx.Graph()
+    aggregated.add_nodes_from((node, attrs) for node, attrs in graph.nodes(data=True) if node not in clustered)
+
+    cluster_positions = {node: positions[node] for node in aggregated}
+    for cluster, (group, drugs) in clusters.items():
+        names = sorted(str(graph.nodes[drug].get('label', drug)) for drug in drugs)
+        more = f"\n... and {len(names) - 20} more" if len(names) > 20 else ""
+        aggregated.add_node(cluster, type='cluster', label=f"{group} ({len(drugs)} drugs)", size=len(drugs),
+                            title=f"{group}: {len(drugs)} drugs\n" + "\n".join(names[:20]) + more)
+        cluster_positions[cluster] = (sum(positions[drug][0] for drug in drugs) / len(drugs),
+                                      sum(positions[drug][1] for drug in drugs) / len(drugs))
+
+    for u, v, attrs in graph.edges(data=True):
+        u, v = clustered.get(u, u), clustered.get(v, v)
+        if u == v:
+            continue
+        if aggregated.has_edge(u, v):
+            aggregated[u][v]['weight'] += 1
+        else:
+            aggregated.add_edge(u, v, **attrs, weight=1)
+
+    for u, v, attrs in aggregated.edges(data=True):
+        if attrs['weight'] > 1:
+            attrs['title'] = f"{attrs['weight']} relationships"
+
+    return aggregated, cluster_positions
+
+
+def write_html(graph, positions, output_path, width=1920, height=1080):
+    """
+    Write a graph as a standalone pyvis HTML page. Nodes are drawn at the given positions with physics
+    disabled, so the browser does not simulate the layout.
+    """
+    from pyvis.network import Network
+
+    xs = [positions[node][0] for node in graph]
+    ys = [positions[node][1] for node in graph]
+    center_x, center_y = (min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2
+    extent = max(max(xs) - min(xs), max(ys) - min(ys), 1e-9)
+    scale = (200 + 40 * math.sqrt(len(graph))) / extent
+
+    net = Network(width=f"{width}px", height=f"{height}px", cdn_resources='in_line')
+    for node, attrs in graph.nodes(data=True):
+        kind = node_kind(attrs)
+        x, y = positions[node]
+        net.add_node(str(node), label=str(attrs.get('label', node)), title=attrs.get('title', f"{kind}: {node}"),
+                     color=NODE_COLORS.get(kind, CLASSIFICATION_COLOR),
+                     size=10 + 2 * math.sqrt(attrs['size']) if kind == 'cluster' else 10,
+                     x=(x - center_x) * scale, y=(y - center_y) * scale, physics=False)
+
+    for u, v, attrs in graph.edges(data=True):
+        net.add_edge(str(u), str(v), title=attrs.get('title', attrs.get('type', attrs.get('label', ''))),
+                     value=attrs.get('weight', 1))
+
+    net.toggle_physics(False)
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    net.write_html(output_path)
+
+
+def export_visualization(graph, output_path, layout_cache_dir, center=None, hops=2, cluster_size=50, iterations=50):
+    """
+    Export an interactive HTML view of a graph. The layout of the whole graph is computed once and
+    cached, then the view is cut down to the ego network of center and classification groups are
+    aggregated into cluster nodes.
+
+    :param center: Drug or disease at the centre of the view (default: the whole graph).
+    :param hops: Radius of the ego network around center.
+    :param cluster_size: Minimum number of drugs of an aggregated group, 0 to disable clustering.
+    :return: Number of nodes and edges exported.
+    """
+    positions = cached_layout(graph, layout_cache_dir, iterations)
+
+    keep = ()
+    if center is not None:
+        center = find_node(graph, center)
+        graph = nx.ego_graph(graph, center, radius=hops)
+        keep = (center,)
+
+    if cluster_size:
+        graph, positions = aggregate_clusters(graph, positions, cluster_size, keep)
+
+    if len(graph) > MAX_RESPONSIVE_NODES:
+        print(f"The view has {len(graph)} nodes, use a smaller cluster size or a center and hops to keep it responsive")
+
+    write_html(graph, positions, output_path)
+    print(f"Visualization of {len(graph)} nodes and {graph.number_of_edges()} edges saved to {output_path}")
+
+    return len(graph), graph.number_of_edges()
@@ -0,0 +1,115 @@
+from common.batch_writer import BatchWriter
+
+
+# DataFrame column -> query parameter name
+DISEASE_PARAMETERS = {'doid_id': 'doid_id', 'disease': 'name', 'DM': 'DM', 'SYM': 'SYM', 'NOT': 'NOT', 'total': 'total'}
+DRUG_PARAMETERS = {'drugbank_id': 'drugbank_id', 'drug': 'name', 'DM': 'DM', 'SYM': 'SYM', 'NOT': 'NOT', 'total': 'total'}
+INDICATION_PARAMETERS = {'doid_id': 'doid_id', 'drugbank_id': 'drugbank_id', 'category': 'category',
+                         'n_curators': 'n_curators', 'n_resources': 'n_resources'}
+
+COUNT_COLUMNS = ('DM', 'SYM', 'NOT', 'total')
+INDICATION_COUNT_COLUMNS = ('n_curators', 'n_resources')
+
+
+def dataframe_parameters(df, columns, int_columns=(), keys=()):
+    """
+    Convert a DataFrame into a list of query parameter dictionaries, column by column instead of row by row.
+    Values are cast to Python types the driver accepts: ints for int_columns and None for missing values.
+
+    :param columns: Dictionary of the DataFrame columns to keep and their parameter names.
+    :param int_columns: Parameter names of integer columns, also when a missing value made them float.
+    :param keys: Parameter names the queries MERGE on, rows missing one of them are dropped.
+    """
+    values = []
+    for column, name in columns.items():
+        series = df[column]
+        if name in int_columns:
+            series = series.astype('Int64')
+        if series.hasnans:
+            series = series.astype(object).where(series.notna(), None)
+        values.append(series.tolist())
+
+    names = list(columns.values())
+    rows = [dict(zip(names, row)) for row in zip(*values)]
+    if keys:
+        rows = [row for row in rows if all(row[key] is not None for key in keys)]
+    return rows
+
+
+def disease_parameters(diseases):
+    return dataframe_parameters(diseases, DISEASE_PARAMETERS, COUNT_COLUMNS, ('doid_id',))
+
+
+def drug_parameters(drugs):
+    return dataframe_parameters(drugs, DRUG_PARAMETERS, COUNT_COLUMNS, ('drugbank_id',))
+
+
+def indication_parameters(indications):
+    return dataframe_parameters(indications, INDICATION_PARAMETERS, INDICATION_COUNT_COLUMNS,
+                                ('doid_id', 'drugbank_id'))
+
+
+def create_constraints(tx):
+    tx.run("CREATE CONSTRAINT IF NOT EXISTS FOR (d:Disease) REQUIRE d.doid_id IS UNIQUE")
+    tx.run("CREATE CONSTRAINT IF NOT EXISTS FOR (d:Drug) REQUIRE d.drugbank_id IS UNIQUE")
+
+
+def add_disease_nodes(tx, rows):
+    """
+    Add or update disease nodes by doid_id, sending the whole batch as one list parameter.
+    """
+    query = (
+        "UNWIND $rows AS row "
+        "MERGE (d:Disease {doid_id: row.doid_id}) "
+        "SET d.name = row.name, d.DM = row.DM, d.SYM = row.SYM, d.NOT = row.NOT, d.total = row.total"
+    )
+    tx.run(query, rows=rows)
+
+
+def add_drug_nodes(tx, rows):
+    """
+    Add or update drug nodes by drugbank_id, sending the whole batch as one list parameter.
+    """
+    query = (
+        "UNWIND $rows AS row "
+        "MERGE (d:Drug {drugbank_id: row.drugbank_id}) "
+        "SET d.name = row.name, d.DM = row.DM, d.SYM = row.SYM, d.NOT = row.NOT, d.total = row.total"
+    )
+    tx.run(query, rows=rows)
+
+
+def add_indication_relationships(tx, rows):
+    """
+    Add or update the INDICATES relationship between existing disease and drug nodes, sending the whole
+    batch as one list parameter.
+    """
+    query = (
+        "UNWIND $rows AS row "
+        "MATCH (d:Disease {doid_id: row.doid_id}), (r:Drug {drugbank_id: row.drugbank_id}) "
+        "MERGE (d)-[rel:INDICATES]->(r) "
+        "SET rel.category = row.category, rel.n_curators = row.n_curators, rel.n_resources = row.n_resources"
+    )
+    tx.run(query, rows=rows)
+
+
+def load_drugs_and_diseases(driver, diseases, drugs, indications, batch_size=1000, concurrency=1):
+    """
+    Write the diseases, drugs and indications DataFrames to Neo4j with batched UNWIND statements.
+
+    :param driver: Neo4j driver.
+    :param diseases: DataFrame of diseases.tsv.
+    :param drugs: DataFrame of drugs.tsv.
+    :param indications: DataFrame of indications.tsv.
+    :param batch_size: Number of rows sent per UNWIND statement and transaction (default: 1000).
+    :param concurrency: Number of batches committed in parallel (default: 1).
+    :return: List of (stage name, items written, seconds) tuples.
+    """
+    with driver.session() as session:
+        session.execute_write(create_constraints)
+
+    writer = BatchWriter(driver, batch_size, concurrency)
+    writer.write_stage(disease_parameters(diseases), add_disease_nodes, "diseases")
+    writer.write_stage(drug_parameters(drugs), add_drug_nodes, "drugs")
+    writer.write_stage(indication_parameters(indications), add_indication_relationships, "indications")
+
+    return writer.stats
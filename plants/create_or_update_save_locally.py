@@ -1,9 +1,13 @@
 import os
 import sys
-from modules.dataset_functions import getDataFromRows, getRowsPreprocessedDataset
+# The modules shared by the pipelines are in the common directory of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.dataset_functions import getDataFromRowChunks, iterPreprocessedRowChunks
 from modules.graph_local import create_graph_save_locally
 from modules.custom_help_formater import create_or_update_save_locally_args
-from modules.graph_local import update_graph_save_locally
+from modules.neo4j_admin_export import export_dataset_neo4j_admin
+from modules.plant_delta import (update_graph_save_locally, record_symbols, fingerprint_dataset, save_fingerprints,
+                                 fingerprints_path)
 
 
 def main():
@@ -17,19 +21,23 @@ def main():
         print(f"Error: Choose from actions [ create / update ].")
         sys.exit(1)
 
-    if args.action == "create":
-        data_rows = getRowsPreprocessedDataset(args.input_file)
-        plants, families, relationships = getDataFromRows(data_rows)
+    if args.format == "neo4j-admin":
+        if args.action != "create":
+            print(f"Error: The neo4j-admin export only supports the create action.")
+            sys.exit(1)
+        export_dataset_neo4j_admin(args.input_file, args.output_dir, args.taxonomy_file)
+    elif args.action == "create":
+        entries = {}
+        data_chunks = record_symbols(iterPreprocessedRowChunks(args.input_file, taxonomy_file=args.taxonomy_file), entries)
+        plants, families, relationships = getDataFromRowChunks(data_chunks)
         create_graph_save_locally(plants, families, relationships, args.output_file)
+        save_fingerprints(fingerprint_dataset(args.input_file, entries), fingerprints_path(args.output_file))
     elif args.action == "update":
-        rows = getRowsPreprocessedDataset(args.input_file)
-
-        plants, families, relationships = getDataFromRows(rows)
-        update_graph_save_locally(plants, families, relationships)
+        update_graph_save_locally(args.input_file, args.output_file, args.remove_missing, args.taxonomy_file)
 
 def debug(input_file, output_file):
-    data_rows = getRowsPreprocessedDataset(input_file)
-    plants, families, relationships = getDataFromRows(data_rows)
+    data_chunks = iterPreprocessedRowChunks(input_file)
+    plants, families, relationships = getDataFromRowChunks(data_chunks)
     create_graph_save_locally(plants, families, relationships, output_file)
 
 if __name__ == '__main__':
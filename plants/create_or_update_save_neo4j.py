@@ -2,7 +2,9 @@ import os
 import logging
 import sys
 from pathlib import Path
-from modules.dataset_functions import getDataFromRows, getRowsPreprocessedDataset
+# The modules shared by the pipelines are in the common directory of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.dataset_functions import getDataFromRowChunks, iterPreprocessedRowChunks
 from modules.custom_help_formater import create_or_update_save_neo4j_args
 from dotenv import load_dotenv
 from modules.Neo4jPlantsGraphClass import Neo4jGraphClass, print_plant_node_details
@@ -48,18 +50,19 @@ def main():
     if args.action in ["create", "update"]:
         try:
             with Neo4jGraphClass(uri, user, password) as neo4j:
-                data_rows = getRowsPreprocessedDataset(args.input_file)
-                plants, families, relationships = getDataFromRows(data_rows)
+                data_chunks = iterPreprocessedRowChunks(args.input_file, taxonomy_file=args.taxonomy_file)
+                plants, families, relationships = getDataFromRowChunks(data_chunks)
 
-                neo4j.create_or_update_graph(plants, families, relationships, batch_size=200)
+                neo4j.create_or_update_graph(plants, families, relationships, batch_size=1000,
+                                             concurrency=args.concurrency)
         except ValueError as e:
             print(e.args[0])
     elif args.action == "delete":
         del_family = True if args.option == "with" else False
         try:
             with Neo4jGraphClass(uri, user, password) as neo4j:
-                data_rows = getRowsPreprocessedDataset(args.input_file)
-                plants, families = getDataFromRows(data_rows)
+                data_chunks = iterPreprocessedRowChunks(args.input_file, taxonomy_file=args.taxonomy_file)
+                plants, families = getDataFromRowChunks(data_chunks)
 
                 neo4j.delete_data_from_graph(plants, families, del_family)
         except ValueError as e:
@@ -69,8 +72,8 @@ def main():
 def debug():
     uri, user, password = load_env_vars()
 
-    data_rows = getRowsPreprocessedDataset("data/plants.csv")
-    plants, families, relationships = getDataFromRows(data_rows)
+    data_chunks = iterPreprocessedRowChunks("data/plants.csv")
+    plants, families, relationships = getDataFromRowChunks(data_chunks)
 
     print(f"Plants {len(plants)}")
     print(f"Families {len(families)}")
@@ -78,7 +81,7 @@ def debug():
 
     try:
         with Neo4jGraphClass(uri, user, password) as neo4j:
-            neo4j.create_or_update_graph(plants, families, relationships, batch_size=200)
+            neo4j.create_or_update_graph(plants, families, relationships, batch_size=1000)
             plant = neo4j.get_plant_node("Abroma augustum")
             print_plant_node_details(plant)
     except ValueError as e:
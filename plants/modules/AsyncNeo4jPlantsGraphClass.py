@@ -0,0 +1,122 @@
+import neo4j.exceptions
+from neo4j import AsyncGraphDatabase
+from common.async_batch_writer import prepare_statements, run_statements, write_stage
+from modules.Neo4jPlantsGraphClass import (create_constraints, add_root_node, add_family_nodes,
+                                           add_or_update_plant_nodes, add_root_relationships,
+                                           add_or_update_relationships, delete_plant_node, delete_family_node,
+                                           delete_family_and_nodes_belonging)
+
+
+class AsyncNeo4jGraphClass:
+    def __init__(self, uri, user, password):
+        """
+        Initialize the AsyncNeo4jGraphClass with the provided URI, user, and password.
+        """
+        self.uri = uri
+        self.user = user
+        self.password = password
+        self.driver = None
+
+    async def __aenter__(self):
+        """
+        Establish a connection to the Neo4j database.
+        """
+        try:
+            self.driver = AsyncGraphDatabase.driver(self.uri, auth=(self.user, self.password))
+            await self.driver.verify_connectivity()
+        except neo4j.exceptions.ConfigurationError:
+            print("URI format is not supported! Check your uri environment variable.")
+        except neo4j.exceptions.AuthError:
+            print("Authentication failure! Check your auth environment variables.")
+        except neo4j.exceptions.ServiceUnavailable:
+            print("Could not establish a connection with Neo4j database!")
+        except ValueError:
+            print("Unknown exception")
+
+        await self.write(create_constraints)
+
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """
+        Close the connection to the Neo4j database.
+        """
+        if self.driver:
+            await self.driver.close()
+
+    async def write(self, work, *args):
+        """
+        Run a transaction function of Neo4jPlantsGraphClass in its own write transaction.
+        """
+        async with self.driver.session() as session:
+            await session.execute_write(run_statements, prepare_statements(work, *args))
+
+    async def create_or_update_graph(self, plants, families, relationships, batch_size=1000):
+        """
+        Save the graph data into the Neo4j database.
+
+        Steps:
+        1. Add a root node labeled 'Root' with the name 'Families'.
+        2. Add family nodes and relationships to the root node.
+        3. Add plant nodes and relationships to family nodes in batches.
+
+        :param plants: Iterable of plant dictionaries with attributes.
+        :param families: Iterable of family names.
+        :param relationships: Iterable of plant-family relationship dictionaries.
+        :param batch_size: Number of items sent per UNWIND statement and transaction (default: 1000).
+        """
+        families = list(families)
+
+        async with self.driver.session() as session:
+            try:
+                await session.execute_write(run_statements, prepare_statements(add_root_node))
+                print('Root node added')
+            except neo4j.exceptions.ConstraintError:
+                pass
+
+            await write_stage(session, families, add_family_nodes, 'family nodes', batch_size)
+            await write_stage(session, families, add_root_relationships, 'root-family relationships', batch_size)
+            await write_stage(session, plants, add_or_update_plant_nodes, 'plant nodes', batch_size)
+            await write_stage(session, relationships, add_or_update_relationships, 'family-plant relationships', batch_size)
+
+    async def delete_data_from_graph(self, plants, families, delete_family):
+        if delete_family:
+            await self.write(delete_family_and_nodes_belonging, families)
+        else:
+            for plant in plants:
+                await self.write(delete_plant_node, plant)
+
+    async def get_plants_nodes_belonging_to_family(self, family_name):
+        """
+        Get plant nodes belonging to a specific family.
+        :param family_name: Name of the family to search for.
+        :return: List of nodes belonging to the family.
+        """
+        query = """
+                MATCH (f:Family {name: $name})<-[:HAS_PLANT]-(n:Plant)
+                RETURN elementId(n) AS node_id, n
+                """
+        async with self.driver.session() as session:
+            result = await session.run(query, name=family_name)
+            nodes = [(record["node_id"], record["n"]) async for record in result]
+        return nodes
+
+    async def get_plant_node(self, plant_name):
+        query = """
+            MATCH (p:Plant {scientific_name: $scientific_name})
+            RETURN elementId(p) AS node_id, p
+        """
+        async with self.driver.session() as session:
+            result = await session.run(query, scientific_name=plant_name)
+            record = await result.single()
+            node = (record["node_id"], record["p"])
+        return node
+
+    async def delete_family_node(self, family_name):
+        await self.write(delete_family_node, family_name)
+
+    async def delete_plant_node(self, plant_name):
+        await self.write(delete_plant_node, plant_name)
+
+    async def delete_family_with_plants(self, family_name):
+        await self.write(delete_family_and_nodes_belonging, family_name)
@@ -1,5 +1,6 @@
 import neo4j.exceptions
 from neo4j import GraphDatabase
+from common.batch_writer import BatchWriter, read_in_batches
 
 
 
@@ -18,54 +19,55 @@ def add_root_node(tx):
 
 def add_family_nodes(tx, families):
     """
-    Add family nodes for each family in the list.
+    Add family nodes for each family in the list, in a single UNWIND statement.
     """
-    for family in families:
-        query = "MERGE (f:Family {name: $name})"
-        try:
-            tx.run(query, name=family)
-        except neo4j.exceptions.TransactionError:
-            continue
+    query = "UNWIND $names AS name MERGE (f:Family {name: name})"
+    tx.run(query, names=list(families))
 
 
 def add_or_update_plant_nodes(tx, plants):
     """
-    Add plant nodes with given attributes.
+    Add plant nodes with given attributes, sending the whole batch as one list parameter.
     """
-    for plant in plants:
-        query = (
-            "MERGE (p:Plant {scientific_name: $scientific_name}) "
-            "SET p.common_name = $common_name, p.other_names = $other_names, p.authors = $authors, p.symbol = $symbol "
-        )
-        try:
-            tx.run(query, scientific_name=plant['scientific_name'], common_name=plant['common_name'],
-                   other_names=plant['other_names'], authors=plant['authors'], symbol=plant['symbol'])
-        except neo4j.exceptions.TransactionError:
-            continue
+    query = (
+        "UNWIND $rows AS row "
+        "MERGE (p:Plant {scientific_name: row.scientific_name}) "
+        "SET p.common_name = row.common_name, p.other_names = row.other_names, p.authors = row.authors, p.symbol = row.symbol "
+    )
+    rows = [
+        {'scientific_name': plant['scientific_name'], 'common_name': plant['common_name'],
+         'other_names': plant['other_names'], 'authors': plant['authors'], 'symbol': plant['symbol']}
+        for plant in plants
+    ]
+    tx.run(query, rows=rows)
 
 
 def add_root_relationships(tx, families):
     """
-    Create relationships between the root node and family nodes.
+    Create relationships between the root node and family nodes, matching the root once per batch.
     """
-    for family in families:
-        query = (
-            "MATCH (r:Root {name: 'Families'}), (f:Family {name: $family_name}) "
-            "MERGE (r)-[:CONTAINS]->(f)"
-        )
-        tx.run(query, family_name=family)
+    query = (
+        "MATCH (r:Root {name: 'Families'}) "
+        "UNWIND $names AS family_name "
+        "MATCH (f:Family {name: family_name}) "
+        "MERGE (r)-[:CONTAINS]->(f)"
+    )
+    tx.run(query, names=list(families))
 
 
 def add_or_update_relationships(tx, relationships):
     """
-    Create relationships between plants and families.
+    Create relationships between plants and families in a single UNWIND statement.
+    Both ends are looked up through the unique family name and plant scientific name constraints.
     """
-    for rel in relationships:
-        query = (
-            "MATCH (f:Family {name: $family_name}), (p:Plant {scientific_name: $scientific_name})"
-            "MERGE (p)-[:HAS_PLANT]->(f)"
-        )
-        tx.run(query, scientific_name=rel['scientific_name'], family_name=rel['family_name'])
+    query = (
+        "UNWIND $rows AS row "
+        "MATCH (f:Family {name: row.family_name}) "
+        "MATCH (p:Plant {scientific_name: row.scientific_name}) "
+        "MERGE (p)-[:HAS_PLANT]->(f)"
+    )
+    rows = [{'scientific_name': rel['scientific_name'], 'family_name': rel['family_name']} for rel in relationships]
+    tx.run(query, rows=rows)
 
 
 def delete_plant_node(tx, scientific_name):
@@ -168,7 +170,7 @@ class Neo4jGraphClass:
         if self.driver:
             self.driver.close()
 
-    def create_or_update_graph(self, plants, families, relationships, batch_size=300):
+    def create_or_update_graph(self, plants, families, relationships, batch_size=1000, concurrency=1):
         """
         Save the graph data into the Neo4j database.
 
@@ -177,35 +179,31 @@ class Neo4jGraphClass:
         2. Add family nodes and relationships to the root node.
         3. Add plant nodes and relationships to family nodes in batches.
 
-        :param plants: List of plant dictionaries with attributes.
-        :param families: List of family names.
-        :param relationships: List of plant-family relationship dictionaries.
-        :param batch_size: Number of items to process per batch (default: 300).
+        Every step is finished before the next one starts. Inside a step, up to concurrency batches
+        are committed at the same time, each through its own session.
+
+        :param plants: Iterable of plant dictionaries with attributes.
+        :param families: Iterable of family names.
+        :param relationships: Iterable of plant-family relationship dictionaries.
+        :param batch_size: Number of items sent per UNWIND statement and transaction (default: 1000).
+        :param concurrency: Maximum number of batches committed in parallel (default: 1).
+        :return: List of (stage name, items written, seconds) tuples.
         """
-        with self.driver.session() as session:
+        families = list(families)
+        writer = BatchWriter(self.driver, batch_size, concurrency)
+
+        try:
+            writer.write(add_root_node)
+            print('Root node added')
+        finally:
+            writer.close_sessions()
 
-            def process_batches(items, batch_func, items_name):
-                items_list = list(items)
-                total_items = len(items_list)
-                for i in range(0, total_items, batch_size):
-                    end_index = min(i + batch_size, total_items)
-                    batch = items_list[i:end_index]
-                    try:
-                        session.execute_write(batch_func, batch)
-                    except neo4j.exceptions.ConstraintError:
-                        pass
-                    print(f"Processed {items_name} from {i} to {i + len(batch)}")
-
-            try:
-                session.execute_write(add_root_node)
-                print('Root node added')
-            except neo4j.exceptions.ConstraintError:
-                pass
-
-            process_batches(families, add_family_nodes, 'family nodes')
-            process_batches(families, add_root_relationships, 'root-family relationships')
-            process_batches(plants, add_or_update_plant_nodes, 'plant nodes')
-            process_batches(relationships, add_or_update_relationships, 'family-plant relationships')
+        writer.write_stage(families, add_family_nodes, 'family nodes')
+        writer.write_stage(families, add_root_relationships, 'root-family relationships')
+        writer.write_stage(plants, add_or_update_plant_nodes, 'plant nodes')
+        writer.write_stage(relationships, add_or_update_relationships, 'family-plant relationships')
+
+        return writer.stats
 
     def delete_data_from_graph(self, plants, families, delete_family):
         with self.driver.session() as session:
@@ -222,7 +220,7 @@ class Neo4jGraphClass:
         :return: List of nodes belonging to the family.
         """
         query = """
-                MATCH (n)-[:BELONGS_TO]->(m {name: $name})
+                MATCH (f:Family {name: $name})<-[:HAS_PLANT]-(n:Plant)
                 RETURN elementId(n) AS node_id, n
                 """
         with self.driver.session() as session:
@@ -241,6 +239,57 @@ class Neo4jGraphClass:
             node = (record["node_id"], record["p"])
         return node
 
+    def get_plant_nodes(self, scientific_names, batch_size=1000):
+        """
+        Look up plant nodes by scientific name, sending the names in batches as one list parameter.
+        Names without a node are skipped.
+
+        :param scientific_names: Iterable of plant scientific names, consumed lazily.
+        :param batch_size: Number of names per query (default: 1000).
+        :return: Generator of (node_id, node) tuples, streamed as they are read.
+        """
+        query = (
+            "UNWIND $keys AS key "
+            "MATCH (p:Plant {scientific_name: key}) "
+            "RETURN elementId(p) AS node_id, p"
+        )
+        return ((record["node_id"], record["p"])
+                for record in read_in_batches(self.driver, query, scientific_names, batch_size))
+
+    def get_family_nodes(self, family_names, batch_size=1000):
+        """
+        Look up family nodes by name, as (node_id, node) tuples.
+        """
+        query = (
+            "UNWIND $keys AS key "
+            "MATCH (f:Family {name: key}) "
+            "RETURN elementId(f) AS node_id, f"
+        )
+        return ((record["node_id"], record["f"])
+                for record in read_in_batches(self.driver, query, family_names, batch_size))
+
+    def get_family_plants(self, family_names, limit=None, batch_size=1000):
+        """
+        Fetch the plants of several families, starting from the family nodes.
+
+        :param family_names: Iterable of family names, consumed lazily.
+        :param limit: Maximum number of plants returned per family (default: all).
+        :param batch_size: Number of family names per query (default: 1000).
+        :return: Generator of (family name, node_id, node) tuples, streamed as they are read.
+        """
+        query = (
+            "UNWIND $keys AS key "
+            "MATCH (f:Family {name: key})<-[:HAS_PLANT]-(p:Plant) "
+        )
+        if limit is None:
+            query += "RETURN key, elementId(p) AS node_id, p"
+        else:
+            query += ("WITH key, collect(p)[..$limit] AS plants "
+                      "UNWIND plants AS p "
+                      "RETURN key, elementId(p) AS node_id, p")
+        return ((record["key"], record["node_id"], record["p"])
+                for record in read_in_batches(self.driver, query, family_names, batch_size, limit=limit))
+
     def delete_family_node(self, family_name):
         with self.driver.session() as session:
             session.execute_write(delete_family_node, family_name)
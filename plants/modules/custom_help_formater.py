@@ -21,8 +21,22 @@ def create_or_update_save_locally_args():
                         help="Action to perform on the graph [create/update].",
                         required=True, type=str)
     parser.add_argument("-of", "--output_file",
-                        help="Output file path.",
+                        help="Output graph file path, saved as a binary snapshot for a .gsnap extension and as GraphML otherwise.",
                         default="./output/plants_graph.graphml")
+    parser.add_argument("-fmt", "--format",
+                        choices=["graph", "neo4j-admin"],
+                        help="Save a graph file, or export CSV files for neo4j-admin database import (create only).",
+                        default="graph")
+    parser.add_argument("-od", "--output_dir",
+                        help="Output directory of the neo4j-admin export.",
+                        default="./output/neo4j-admin")
+    parser.add_argument("-tx", "--taxonomy_file",
+                        help="Genus,Family CSV file seeding the local family index.",
+                        default="./data/genus-families.csv")
+    parser.add_argument("-rm", "--remove_missing",
+                        help="On update, also remove the plants missing from the input file. Without it an update "
+                             "only adds and changes plants, so a partial dataset can be applied.",
+                        action="store_true")
     return parser.parse_args()
 
 
@@ -42,4 +56,11 @@ def create_or_update_save_neo4j_args():
                         choices=["with", "without"],
                         help="Option do delete plant nodes with or without the family.",
                         default="without")
+    parser.add_argument("-c", "--concurrency",
+                        help="Number of batches written to Neo4j in parallel.",
+                        default=1,
+                        type=int)
+    parser.add_argument("-tx", "--taxonomy_file",
+                        help="Genus,Family CSV file seeding the local family index.",
+                        default="./data/genus-families.csv")
     return parser.parse_args()
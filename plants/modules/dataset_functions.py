@@ -2,90 +2,220 @@ import csv
 import os
 import re
 import sys
+from collections import Counter
+from functools import lru_cache
+from itertools import chain, islice
 
-import requests
-from bs4 import BeautifulSoup
+from modules.family_resolver import FamilyResolver
+from modules.taxonomy_index import TaxonomyIndex, extractGenus
+
+
+DEFAULT_TAXONOMY_FILE = "./data/genus-families.csv"
+
+
+# The name ends before the first whitespace followed by a capital letter, or space followed by a parenthesis
+NAME_END_PATTERN = re.compile(r'\s[A-Z]| \(')
+# Skips to the second capital letter or the first parenthesis, whichever comes first
+AUTHORS_START_PATTERN = re.compile(r'[^A-Z(]*(?:[A-Z][^A-Z(]*)?')
+PARSER_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=PARSER_CACHE_SIZE)
+def parseBotanicalName(name_with_author):
+    """
+    Split a scientific name with author into (name, authors).
+
+    The name is the stripped text before the end of name pattern, or the whole string if there is
+    none on its first line. The authors start at the second capital letter or the first parenthesis,
+    and are "" when shorter than 3 characters. Results are memoized, as synonyms repeat the same
+    strings across rows.
+    """
+    match = NAME_END_PATTERN.search(name_with_author)
+    name = name_with_author
+    if match and '\n' not in name_with_author[:match.start()]:
+        name = name_with_author[:match.start()].strip()
+
+    authors = name_with_author[AUTHORS_START_PATTERN.match(name_with_author).end():]
+
+    return name, authors if len(authors) > 2 else ""
 
 
 def extractPlantName(plant_name):
-    match = re.match(r'^.*?(?=\s[A-Z]| \()', plant_name)
-    if match:
-        return match.group(0).strip()
-    return plant_name
+    return parseBotanicalName(plant_name)[0]
 
 
 def extractPlantAuthors(s):
-    capitals = [match.start() for match in re.finditer(r'[A-Z]', s)]
-    parenthesis_index = s.find('(')
+    return parseBotanicalName(s)[1]
+
 
-    if len(capitals) >= 2:
-        second_capital_index = capitals[1]
-    else:
-        second_capital_index = len(s)  # Set to end if less than 2 capitals
+class FamilyBackfill:
+    """
+    Fill the missing 'Family' of rows with the family of their symbol.
 
-    start_index = min(second_capital_index, parenthesis_index if parenthesis_index != -1 else len(s))
+    The family of a symbol is resolved by the first tier that knows it:
+    1. a row of the symbol (the accepted name or one of its synonyms) that has a family,
+    2. the local genus index built from the dataset, optionally seeded from a taxonomy file,
+    3. the remote resolver, looked up once per genus still unresolved.
 
-    return s[start_index:] if len(s[start_index:]) > 2 else ""
+    Rows are first passed to observe(), then resolve() runs the lookups and fill() completes the
+    rows. Only per-symbol and per-genus data is kept, so the rows themselves can be streamed.
+    """
 
+    def __init__(self):
+        self.symbol_to_family = {}
+        self.symbol_to_genus = {}
+        self.symbol_tier = {}
+        self.index = TaxonomyIndex()
+        self.stats = Counter()
+
+    def observe(self, row):
+        symbol = row['Symbol']
+        family = row['Family']
+        genus = extractGenus(parseBotanicalName(row['Scientific Name with Author'])[0])
+
+        if symbol not in self.symbol_to_genus:
+            self.symbol_to_genus[symbol] = genus
+        if family:
+            self.index.add(genus, family)
+            if not self.symbol_to_family.get(symbol):
+                self.symbol_to_family[symbol] = family
+                self.symbol_tier[symbol] = 'symbol'
+
+    def index_row(self, row):
+        """
+        Add the family of a row whose symbol is not backfilled to the genus index only.
+        """
+        if row['Family']:
+            self.index.add(extractGenus(parseBotanicalName(row['Scientific Name with Author'])[0]), row['Family'])
+
+    def missing_families(self):
+        return any(symbol not in self.symbol_to_family for symbol in self.symbol_to_genus)
+
+    def resolve(self, resolver=None, taxonomy_file=None):
+        if taxonomy_file and os.path.isfile(taxonomy_file):
+            print(f"Loaded {self.index.load_seed(taxonomy_file)} genera from {taxonomy_file}")
+
+        unresolved_genera = set()
+        for symbol, genus in self.symbol_to_genus.items():
+            if symbol in self.symbol_to_family:
+                continue
+            family = self.index.family(genus)
+            if family:
+                self.symbol_to_family[symbol] = family
+                self.symbol_tier[symbol] = 'genus'
+            elif genus:
+                unresolved_genera.add(genus)
+
+        if unresolved_genera:
+            resolver = resolver if resolver is not None else FamilyResolver()
+            resolver.resolve_many(unresolved_genera)
+            for symbol, genus in self.symbol_to_genus.items():
+                if symbol not in self.symbol_to_family and (family := resolver.cached(genus)):
+                    self.symbol_to_family[symbol] = family
+                    self.symbol_tier[symbol] = 'remote'
+
+    def fill(self, row):
+        if row['Family']:
+            self.stats['dataset'] += 1
+        elif family := self.symbol_to_family.get(row['Symbol']):
+            row['Family'] = family
+            self.stats[self.symbol_tier[row['Symbol']]] += 1
+        else:
+            self.stats['unresolved'] += 1
+        return row
 
-def getPlantFamily(plant_name):
-    url = f"https://en.wikipedia.org/wiki/{plant_name}"
+    def report(self):
+        stats = self.stats
+        print(f"Families: {stats['dataset']} rows from the dataset, {stats['symbol']} from their symbol, "
+              f"{stats['genus']} from the genus index, {stats['remote']} from remote lookups, "
+              f"{stats['unresolved']} unresolved")
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
 
-    response = requests.get(url, headers=headers)
-    soup = BeautifulSoup(response.text, 'html.parser')
+def normalizeRow(row):
+    row['Scientific Name with Author'] = row['Scientific Name with Author'].replace('×', '')
+    return row
 
-    tds = soup.find_all("td")
-    for td in tds:
-        if "Family:" in td.text:
-            next_td = td.find_next_sibling("td")
 
-            if next_td:
-                link = next_td.find("a")
-                if link:
-                    return link.text
-    else:
-        return ""
+def readDatasetRows(file):
+    """
+    Stream the normalized rows of a dataset file, without their families backfilled.
+    """
+    with open(file, newline='', encoding='utf-8') as csvfile:
+        for row in csv.DictReader(csvfile, delimiter=','):
+            yield normalizeRow(row)
 
 
-def getRowsPreprocessedDataset(file):
+def checkDatasetFile(file):
+    """
+    Check that file is a csv/txt dataset with a 'Family' column. Exits on other file types.
+    """
     file_extension = os.path.splitext(file)[1]
 
-    if file_extension in ['.txt', '.csv']:
-        with open(file, newline='', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
+    if file_extension not in ['.txt', '.csv']:
+        print(f"File is not of type csv/txt.")
+        sys.exit(1)
 
-            fieldnames = next(reader)
-            reader = csv.DictReader(csvfile, fieldnames=fieldnames, delimiter=',')
-            rows = list(reader)
+    with open(file, newline='', encoding='utf-8') as csvfile:
+        fieldnames = next(csv.reader(csvfile), [])
 
-            if 'Family' not in fieldnames:
-                print("Error: 'Family' column not found in the CSV.")
-                return
+    if 'Family' not in fieldnames:
+        print("Error: 'Family' column not found in the CSV.")
+        return False
+    return True
 
-            symbol_to_family = {}
 
-            for row in rows:
-                row['Scientific Name with Author'] = row['Scientific Name with Author'].replace('×', '')
-                symbol = row['Symbol']
-                if symbol not in symbol_to_family:
-                    symbol_to_family[symbol] = row['Family']
+def iterPreprocessedRows(file, resolver=None, taxonomy_file=DEFAULT_TAXONOMY_FILE, symbols=None):
+    """
+    Stream the preprocessed rows of a dataset file in two passes over the file: the first one
+    collects the family of every symbol and genus, the second one yields the normalized rows with
+    their families backfilled. Memory grows with the number of symbols, not rows.
 
-                if not symbol_to_family[symbol]:
-                    plantName = extractPlantName(row['Scientific Name with Author'])
-                    family = getPlantFamily(plantName)
-                    symbol_to_family[symbol] = family
+    :param symbols: Only preprocess and yield the rows of these symbols (default: all). The other
+                    rows are read only to fill the genus index, when one of the symbols has no family.
+    """
+    if not checkDatasetFile(file):
+        return
 
-                if not row['Family']:
-                    row['Family'] = symbol_to_family.get(row['Symbol'], '')
+    backfill = FamilyBackfill()
+    for row in readDatasetRows(file):
+        if symbols is None or row['Symbol'] in symbols:
+            backfill.observe(row)
+
+    if symbols is not None and backfill.missing_families():
+        for row in readDatasetRows(file):
+            if row['Symbol'] not in symbols:
+                backfill.index_row(row)
+
+    backfill.resolve(resolver, taxonomy_file)
+
+    for row in readDatasetRows(file):
+        if symbols is None or row['Symbol'] in symbols:
+            yield backfill.fill(row)
+    backfill.report()
 
-        return rows
-    else:
-        print(f"File is not of type csv/txt.")
-        sys.exit(1)
+
+def iterPreprocessedRowChunks(file, chunk_size=10000, resolver=None, taxonomy_file=DEFAULT_TAXONOMY_FILE, symbols=None):
+    """
+    Stream the preprocessed rows of a dataset file in lists of at most chunk_size rows.
+    """
+    rows = iterPreprocessedRows(file, resolver, taxonomy_file, symbols)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def getRowsPreprocessedDataset(file, resolver=None, taxonomy_file=DEFAULT_TAXONOMY_FILE):
+    if not checkDatasetFile(file):
+        return
+
+    return list(iterPreprocessedRows(file, resolver, taxonomy_file))
+
+
+def getDataFromRowChunks(chunks):
+    """
+    Build plants, families and relationships from chunks of preprocessed rows, consuming them one
+    chunk at a time.
+    """
+    return getDataFromRows(chain.from_iterable(chunks))
 
 
 def getDataFromRows(rows):
@@ -102,8 +232,7 @@ def getDataFromRows(rows):
         family = row['Family']
         name_with_author = row['Scientific Name with Author']
         common_name = row['Common Name']
-        scientific_name = extractPlantName(name_with_author)
-        authors = extractPlantAuthors(name_with_author)
+        scientific_name, authors = parseBotanicalName(name_with_author)
 
         families.add(family)
         if symbol not in symbol_to_data:
@@ -172,7 +301,6 @@ def getDataFromRows(rows):
     return plants, families, relationships
 
 
-
 # Example usage
 # rows = getRowsPreprocessedDataset('your_file.csv')
 # plants, families, relationships = getDataFromRows(rows)
@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+
+def parseFamilyFromHtml(html):
+    """
+    Return the family from the taxonomy box of a Wikipedia page, or "" if it has none.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    for td in soup.find_all("td"):
+        if "Family:" in td.text:
+            next_td = td.find_next_sibling("td")
+
+            if next_td:
+                link = next_td.find("a")
+                if link:
+                    return link.text
+    return ""
+
+
+class WikipediaFamilyBackend:
+    """
+    Look plant families up on Wikipedia through one pooled HTTP session.
+
+    base_url can point to a local stub server, so the lookups can be exercised without the network.
+    """
+
+    def __init__(self, base_url="https://en.wikipedia.org/wiki/", timeout=10, pool_size=8):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch_family(self, plant_name):
+        """
+        Return the family of a plant, "" if the page has none, or None if the lookup failed and
+        should be retried on a later run.
+        """
+        try:
+            response = self.session.get(self.base_url + quote(plant_name), timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"Family lookup for {plant_name} failed: {e}")
+            return None
+
+        if response.status_code == 404:
+            return ""
+        if response.status_code != 200:
+            print(f"Family lookup for {plant_name} failed with status {response.status_code}")
+            return None
+
+        return parseFamilyFromHtml(response.text)
+
+
+class FamilyCache:
+    """
+    JSON file mapping plant names to families. Families found are kept until removed, names without
+    a family ("" results) expire after negative_ttl seconds so they are looked up again.
+    """
+
+    def __init__(self, path, negative_ttl=7 * 24 * 3600):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+
+        if path and os.path.isfile(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as json_file:
+                    self.entries = json.load(json_file)
+            except ValueError:
+                print(f"Ignoring unreadable family cache {path}")
+
+    def get(self, plant_name):
+        """
+        Return the cached family ("" for a cached negative result), or None if not cached or expired.
+        """
+        entry = self.entries.get(plant_name)
+        if entry is None:
+            return None
+        if not entry['family'] and time.time() - entry['fetched_at'] > self.negative_ttl:
+            return None
+        return entry['family']
+
+    def set(self, plant_name, family):
+        with self.lock:
+            self.entries[plant_name] = {'family': family, 'fetched_at': time.time()}
+            self.dirty = True
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_path = f"{self.path}.tmp"
+        with self.lock:
+            with open(temp_path, 'w', encoding='utf-8') as json_file:
+                json.dump(self.entries, json_file, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+            self.dirty = False
+
+
+class FamilyResolver:
+    """
+    Resolve plant families through a persistent cache, fetching the missing ones concurrently from a backend.
+
+    Any object with a fetch_family(plant_name) method can be used as backend.
+    """
+
+    def __init__(self, backend=None, cache_path="./data/plant-families-cache.json", max_workers=8,
+                 negative_ttl=7 * 24 * 3600):
+        self.backend = backend if backend is not None else WikipediaFamilyBackend(pool_size=max_workers)
+        self.cache = FamilyCache(cache_path, negative_ttl)
+        self.max_workers = max_workers
+        self.failed = set()
+        self.network_calls = 0
+
+    def cached(self, plant_name):
+        """
+        Return the known family of a plant ("" if it has none), or None if it still has to be fetched.
+        Lookups that failed during this run count as "" so they are not retried until the next run.
+        """
+        if plant_name in self.failed:
+            return ""
+        return self.cache.get(plant_name)
+
+    def _fetch(self, plant_name):
+        family = self.backend.fetch_family(plant_name)
+        if family is None:
+            self.failed.add(plant_name)
+        else:
+            self.cache.set(plant_name, family)
+
+    def resolve_many(self, plant_names):
+        """
+        Fetch the families of all plant names not cached yet, at most max_workers at a time, and
+        persist the cache.
+        """
+        missing = [name for name in set(plant_names) if self.cached(name) is None]
+
+        if missing:
+            self.network_calls += len(missing)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                list(pool.map(self._fetch, missing))
+            self.cache.save()
+            print(f"Looked up {len(missing)} plant families")
+
+    def resolve(self, plant_name):
+        self.resolve_many([plant_name])
+        return self.cached(plant_name)
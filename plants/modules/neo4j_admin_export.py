@@ -0,0 +1,33 @@
+from modules.dataset_functions import getDataFromRowChunks, iterPreprocessedRowChunks
+from common.neo4j_admin_export import Neo4jAdminExport, array_field
+
+
+def export_plants_neo4j_admin(plants, families, relationships, output_dir):
+    """
+    Export the plants graph (the create_or_update_graph arguments) for neo4j-admin import.
+    """
+    families = list(families)
+    export = Neo4jAdminExport(output_dir)
+
+    export.add_nodes('Root', 'name', [], [('Families',)])
+    export.add_nodes('Family', 'name', [], ((family,) for family in families))
+    export.add_nodes('Plant', 'scientific_name',
+                     ['common_name', 'other_names:string[]', 'authors:string[]', 'symbol'],
+                     ((plant['scientific_name'], plant['common_name'], array_field(plant['other_names']),
+                       array_field(plant['authors']), plant['symbol'])
+                      for plant in plants))
+
+    export.add_relationships('CONTAINS', 'Root', 'Family', (('Families', family) for family in families))
+    export.add_relationships('HAS_PLANT', 'Plant', 'Family',
+                             ((rel['scientific_name'], rel['family_name']) for rel in relationships))
+
+    export.write_import_script()
+
+
+def export_dataset_neo4j_admin(file_path, output_dir, taxonomy_file=None):
+    """
+    Read a plants dataset file and export it for neo4j-admin import.
+    """
+    data_chunks = iterPreprocessedRowChunks(file_path, taxonomy_file=taxonomy_file)
+    plants, families, relationships = getDataFromRowChunks(data_chunks)
+    export_plants_neo4j_admin(plants, families, relationships, output_dir)
@@ -0,0 +1,259 @@
+import csv
+import hashlib
+import json
+import os
+from collections import Counter
+
+from modules.dataset_functions import (DEFAULT_TAXONOMY_FILE, checkDatasetFile, normalizeRow, parseBotanicalName,
+                                       iterPreprocessedRowChunks, getDataFromRowChunks)
+from modules.graph_local import ROOT_NODE, plant_node_attributes
+from common.graph_snapshot import read_graph, write_graph
+
+
+FINGERPRINTS_SUFFIX = '.fingerprints.json'
+FINGERPRINTS_VERSION = 1
+
+
+def fingerprints_path(graph_path):
+    return f"{graph_path}{FINGERPRINTS_SUFFIX}"
+
+
+def symbol_fingerprints(file):
+    """
+    Hash the raw rows of every symbol of a dataset file, in file order, without preprocessing them.
+
+    :return: Dictionary of symbol: [fingerprint, scientific name of its first row].
+    """
+    hashes = {}
+    first_names = {}
+    with open(file, newline='', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile, delimiter=',')
+        header = next(reader, [])
+        symbol_column = header.index('Symbol')
+        name_column = header.index('Scientific Name with Author')
+
+        for row in reader:
+            if not row:
+                continue
+            symbol = row[symbol_column]
+            row_hash = hashes.get(symbol)
+            if row_hash is None:
+                row_hash = hashes[symbol] = hashlib.blake2b(digest_size=16)
+                first_names[symbol] = row[name_column]
+            row_hash.update('\x1f'.join(row).encode('utf-8'))
+            row_hash.update(b'\x1e')
+
+    return {symbol: [row_hash.hexdigest(), scientific_name(first_names[symbol])] for symbol, row_hash in hashes.items()}
+
+
+def scientific_name(name_with_author):
+    return parseBotanicalName(normalizeRow({'Scientific Name with Author': name_with_author})['Scientific Name with Author'])[0]
+
+
+def record_symbols(chunks, entries):
+    """
+    Pass chunks of preprocessed rows through, recording in entries the scientific name and family of
+    the first row of every symbol and the families of all its rows, as symbol: [name, family, families].
+    """
+    for chunk in chunks:
+        for row in chunk:
+            entry = entries.get(row['Symbol'])
+            if entry is None:
+                entry = entries[row['Symbol']] = [parseBotanicalName(row['Scientific Name with Author'])[0],
+                                                  row['Family'], set()]
+            entry[2].add(row['Family'])
+        yield chunk
+
+
+def dataset_state(fingerprints, entries):
+    """
+    Build the fingerprint state of a dataset: symbol: [fingerprint, name, family, families] for the
+    symbols of entries (see record_symbols).
+    """
+    return {symbol: [fingerprints[symbol][0], name, family, sorted(families)]
+            for symbol, (name, family, families) in entries.items()}
+
+
+def fingerprint_dataset(file, entries):
+    return {'version': FINGERPRINTS_VERSION, 'plants': dataset_state(symbol_fingerprints(file), entries)}
+
+
+def load_fingerprints(path):
+    """
+    Load a fingerprint state, or return None if it is missing or was written by another version.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as json_file:
+            state = json.load(json_file)
+    except (OSError, ValueError):
+        return None
+
+    if state.get('version') != FINGERPRINTS_VERSION:
+        return None
+    return state
+
+
+def save_fingerprints(state, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as json_file:
+        json.dump(state, json_file)
+    os.replace(temp_path, path)
+    print(f"Fingerprints of {len(state['plants'])} plants saved to {path}")
+
+
+def compute_plants_delta(file, state, remove_missing=False, resolver=None, taxonomy_file=DEFAULT_TAXONOMY_FILE):
+    """
+    Compare a dataset file against the fingerprint state of the last build. Only the rows of the
+    symbols whose fingerprint changed are preprocessed, together with the rows of the symbols
+    sharing a scientific name with them, as getDataFromRows merges those.
+
+    Families backfilled from other rows (genus index, remote lookups) are resolved again only when
+    the rows of the symbol change.
+
+    :param state: Fingerprint state (see fingerprint_dataset), or None to treat every plant as added.
+    :param remove_missing: Also remove the plants of the state that are missing from the file. By
+                           default they are kept, so a partial dataset can be applied.
+    :return: Dictionary with the 'added', 'updated', 'removed' and 'missing' symbols, the 'unchanged'
+             count, the 'plants', 'families' and 'relationships' to write, the 'old_entries' of the
+             rebuilt and removed symbols, the 'kept_edges' and 'orphaned_families' and the new 'state'.
+    """
+    known = state['plants'] if state else {}
+    fingerprints = symbol_fingerprints(file)
+
+    changed = {symbol for symbol, (fingerprint, _) in fingerprints.items()
+               if symbol not in known or known[symbol][0] != fingerprint}
+    missing = [symbol for symbol in known if symbol not in fingerprints]
+    removed = missing if remove_missing else []
+
+    affected_names = {fingerprints[symbol][1] for symbol in changed}
+    affected_names.update(known[symbol][1] for symbol in changed if symbol in known)
+    affected_names.update(known[symbol][1] for symbol in removed)
+
+    rebuilt = set(changed)
+    kept_edges = set()
+    if affected_names:
+        for symbol, (_, name, family, _) in known.items():
+            if name not in affected_names or symbol in changed:
+                continue
+            if symbol in fingerprints:
+                rebuilt.add(symbol)
+            elif not remove_missing:
+                # Missing from a partial dataset, its plant node and family edge are left in place
+                kept_edges.add((family, name))
+
+    entries = {}
+    if rebuilt:
+        chunks = iterPreprocessedRowChunks(file, resolver=resolver, taxonomy_file=taxonomy_file, symbols=rebuilt)
+        plants, families, relationships = getDataFromRowChunks(record_symbols(chunks, entries))
+    else:
+        plants, families, relationships = [], set(), []
+
+    old_entries = {symbol: known[symbol] for symbol in list(rebuilt) + removed if symbol in known}
+
+    family_counts = Counter()
+    if old_entries:
+        for entry in known.values():
+            family_counts.update(entry[3])
+        for entry in old_entries.values():
+            family_counts.subtract(entry[3])
+        for _, _, entry_families in entries.values():
+            family_counts.update(entry_families)
+    orphaned_families = sorted({family for entry in old_entries.values() for family in entry[3]
+                                if family_counts[family] <= 0})
+
+    plants_state = dict(known)
+    for symbol in removed:
+        del plants_state[symbol]
+    plants_state.update(dataset_state(fingerprints, entries))
+
+    return {
+        'added': sorted(symbol for symbol in changed if symbol not in known),
+        'updated': sorted(symbol for symbol in changed if symbol in known),
+        'removed': removed,
+        'missing': [] if remove_missing else missing,
+        'unchanged': len(fingerprints) - len(changed),
+        'plants': plants,
+        'families': families,
+        'relationships': relationships,
+        'old_entries': old_entries,
+        'kept_edges': kept_edges,
+        'orphaned_families': orphaned_families,
+        'state': {'version': FINGERPRINTS_VERSION, 'plants': plants_state},
+    }
+
+
+def print_plants_delta(delta):
+    print(f"Plants: {len(delta['added'])} added, {len(delta['updated'])} updated, "
+          f"{len(delta['removed'])} removed, {delta['unchanged']} unchanged")
+    if delta['orphaned_families']:
+        print(f"Families: {len(delta['orphaned_families'])} without plants removed")
+    if delta['missing']:
+        print(f"{len(delta['missing'])} plants missing from the input were kept, use --remove_missing to remove them")
+
+
+def apply_plants_delta_to_graph(graph, delta):
+    """
+    Apply a plants delta to a local graph: the plant nodes and family edges of the rebuilt and
+    removed symbols are deleted, with the families left without plants, then the rebuilt plants
+    are added back as create_graph_save_locally adds them.
+    """
+    for symbol, (_, name, family, _) in delta['old_entries'].items():
+        if graph.has_node(symbol) and graph.nodes[symbol].get('type') == 'plant':
+            graph.remove_node(symbol)
+        if (family, name) not in delta['kept_edges'] and graph.has_edge(family, name):
+            graph.remove_edge(family, name)
+        # Scientific name nodes only exist through their family edges
+        if graph.has_node(name) and not graph.nodes[name] and graph.degree(name) == 0:
+            graph.remove_node(name)
+
+    for family in delta['orphaned_families']:
+        if graph.has_node(family) and graph.nodes[family].get('type') == 'family':
+            graph.remove_node(family)
+
+    for plant in delta['plants']:
+        graph.add_node(plant['symbol'], **plant_node_attributes(plant))
+
+    for family in delta['families']:
+        graph.add_node(family, type='family')
+
+    for relationship in delta['relationships']:
+        graph.add_edge(relationship['family_name'], relationship['scientific_name'])
+
+    for family in delta['families']:
+        graph.add_edge(ROOT_NODE, family)
+
+
+def update_graph_save_locally(input_file, output_path, remove_missing=False, taxonomy_file=DEFAULT_TAXONOMY_FILE,
+                              resolver=None):
+    """
+    Update a saved graph with a new dataset file, applying only the plants whose rows changed since
+    the fingerprints saved with the graph. The file is left untouched when nothing changed.
+
+    :param remove_missing: Also remove the plants missing from the input file (default: keep them).
+    :return: The applied delta (see compute_plants_delta).
+    """
+    if not checkDatasetFile(input_file):
+        return None
+
+    state = load_fingerprints(fingerprints_path(output_path))
+    if state is None:
+        print(f"No fingerprints found for {output_path}, every plant is applied and no plant is removed")
+
+    delta = compute_plants_delta(input_file, state, remove_missing, resolver, taxonomy_file)
+    print_plants_delta(delta)
+
+    if delta['added'] or delta['updated'] or delta['removed'] or state is None:
+        graph = read_graph(output_path)
+        apply_plants_delta_to_graph(graph, delta)
+        write_graph(graph, output_path)
+        print(f"Graph updated and saved to {output_path}")
+    else:
+        print(f"Graph {output_path} is up to date")
+
+    save_fingerprints(delta['state'], fingerprints_path(output_path))
+
+    return delta
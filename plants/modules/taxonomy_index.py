@@ -0,0 +1,46 @@
+import csv
+from collections import Counter, defaultdict
+
+
+def extractGenus(plant_name):
+    """
+    Return the genus of a plant name (its first word), or "" for an empty name.
+    """
+    parts = plant_name.split(maxsplit=1)
+    return parts[0] if parts else ""
+
+
+class TaxonomyIndex:
+    """
+    Local genus to family index. Families seen in the dataset take precedence over the seed file;
+    a genus seen with several families resolves to the most frequent one.
+    """
+
+    def __init__(self):
+        self.dataset_families = defaultdict(Counter)
+        self.seed_families = {}
+
+    def add(self, genus, family):
+        if genus and family:
+            self.dataset_families[genus][family] += 1
+
+    def load_seed(self, file_path):
+        """
+        Load a 'Genus','Family' CSV file. Returns the number of genera read.
+        """
+        with open(file_path, newline='', encoding='utf-8') as csvfile:
+            for row in csv.DictReader(csvfile):
+                genus = row['Genus'].strip()
+                family = row['Family'].strip()
+                if genus and family:
+                    self.seed_families[genus] = family
+        return len(self.seed_families)
+
+    def family(self, genus):
+        """
+        Return the family of a genus, or None if the index does not know it.
+        """
+        families = self.dataset_families.get(genus)
+        if families:
+            return min(families.items(), key=lambda item: (-item[1], item[0]))[0]
+        return self.seed_families.get(genus)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The tests import the modules of the plants pipeline and the common directory, as the scripts do
+PLANTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PLANTS_DIR)
+sys.path.append(os.path.dirname(PLANTS_DIR))
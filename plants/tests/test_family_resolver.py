@@ -0,0 +1,84 @@
+import threading
+from collections import Counter
+
+import pytest
+
+from modules import family_resolver
+from modules.family_resolver import FamilyResolver
+
+
+class FakeBackend:
+    """
+    Backend returning the families of a dictionary, None (a failed lookup) for the names missing from it.
+    """
+
+    def __init__(self, families):
+        self.families = families
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def fetch_family(self, plant_name):
+        with self.lock:
+            self.calls[plant_name] += 1
+        return self.families.get(plant_name)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(family_resolver.time, 'time', lambda: now[0])
+    return now
+
+
+def test_one_lookup_per_name(tmp_path, clock):
+    backend = FakeBackend({'Rosa': 'Rosaceae', 'Quercus': 'Fagaceae'})
+    resolver = FamilyResolver(backend, str(tmp_path / 'cache.json'), max_workers=4)
+
+    resolver.resolve_many(['Rosa', 'Quercus', 'Rosa', 'Quercus'])
+    resolver.resolve_many(['Rosa', 'Quercus'])
+
+    assert backend.calls == {'Rosa': 1, 'Quercus': 1}
+    assert resolver.network_calls == 2
+    assert resolver.resolve('Rosa') == 'Rosaceae'
+    assert backend.calls['Rosa'] == 1
+
+
+def test_cache_is_persisted(tmp_path, clock):
+    FamilyResolver(FakeBackend({'Rosa': 'Rosaceae'}), str(tmp_path / 'cache.json')).resolve_many(['Rosa'])
+
+    backend = FakeBackend({})
+    resolver = FamilyResolver(backend, str(tmp_path / 'cache.json'))
+
+    assert resolver.resolve('Rosa') == 'Rosaceae'
+    assert not backend.calls
+
+
+def test_negative_results_expire(tmp_path, clock):
+    backend = FakeBackend({'Nothing': '', 'Rosa': 'Rosaceae'})
+    resolver = FamilyResolver(backend, str(tmp_path / 'cache.json'), negative_ttl=60)
+    resolver.resolve_many(['Nothing', 'Rosa'])
+
+    clock[0] += 60
+    resolver.resolve_many(['Nothing', 'Rosa'])
+    assert backend.calls == {'Nothing': 1, 'Rosa': 1}
+
+    # Only the name without a family is looked up again once its entry is older than the TTL
+    clock[0] += 1
+    assert resolver.cached('Nothing') is None
+    resolver.resolve_many(['Nothing', 'Rosa'])
+    assert backend.calls == {'Nothing': 2, 'Rosa': 1}
+    assert resolver.cached('Nothing') == ''
+
+
+def test_failed_lookups_are_retried_on_the_next_run(tmp_path, clock):
+    backend = FakeBackend({})
+    resolver = FamilyResolver(backend, str(tmp_path / 'cache.json'))
+    resolver.resolve_many(['Rosa'])
+    resolver.resolve_many(['Rosa'])
+
+    assert resolver.cached('Rosa') == ''
+    assert backend.calls['Rosa'] == 1
+
+    backend.families['Rosa'] = 'Rosaceae'
+    assert FamilyResolver(backend, str(tmp_path / 'cache.json')).resolve('Rosa') == 'Rosaceae'
+    assert backend.calls['Rosa'] == 2
@@ -0,0 +1,89 @@
+import csv
+
+import networkx as nx
+import pytest
+
+from common.graph_snapshot import read_graph
+from modules.dataset_functions import getDataFromRowChunks, iterPreprocessedRowChunks
+from modules.graph_local import create_graph_save_locally
+from modules.plant_delta import (fingerprint_dataset, fingerprints_path, record_symbols, save_fingerprints,
+                                 update_graph_save_locally)
+
+
+HEADER = ['Symbol', 'Synonym Symbol', 'Scientific Name with Author', 'Common Name', 'Family']
+# The family of synonym rows is backfilled from the row of their symbol
+OLD_ROWS = [
+    ['ABAB', '', 'Abutilon abutiloides (Jacq.) Garcke ex Hochr.', 'shrubby Indian mallow', 'Malvaceae'],
+    ['ABAB', 'ABAM5', 'Abutilon americanum (L.) Sweet', '', ''],
+    ['ACRU', '', 'Acer rubrum L.', 'red maple', 'Sapindaceae'],
+    ['ACSA', '', 'Acer saccharum Marshall', 'sugar maple', 'Sapindaceae'],
+    ['LOLI', '', 'Lonelia lonely L.', 'lonely plant', 'Lonelyaceae'],
+    ['QUAL', '', 'Quercus alba L.', 'white oak', 'Fagaceae'],
+    ['QURU', '', 'Quercus rubra L.', 'northern red oak', 'Fagaceae'],
+]
+NEW_ROWS = [
+    # Changed common name and an added synonym
+    ['ABAB', '', 'Abutilon abutiloides (Jacq.) Garcke ex Hochr.', 'Indian mallow', 'Malvaceae'],
+    ['ABAB', 'ABAM5', 'Abutilon americanum (L.) Sweet', '', ''],
+    ['ABAB', 'ABAB2', 'Abutilon bastardioides Baker f. ex Rose', '', ''],
+    ['ACRU', '', 'Acer rubrum L.', 'red maple', 'Sapindaceae'],
+    # Moved to another family, Lonelyaceae is left without plants
+    ['LOLI', '', 'Lonelia lonely L.', 'lonely plant', 'Fagaceae'],
+    ['QUAL', '', 'Quercus alba L.', 'white oak', 'Fagaceae'],
+    ['QURU', '', 'Quercus rubra L.', 'northern red oak', 'Fagaceae'],
+    # Added symbol sharing the scientific name of an unchanged one
+    ['QURU2', '', 'Quercus rubra Du Roi', 'red oak', 'Fagaceae'],
+    ['ZIZI', '', 'Zizia aurea (L.) W.D.J. Koch', 'golden zizia', 'Apiaceae'],
+]
+# ACSA is missing from the new rows
+
+
+def write_dataset(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+        csv.writer(csv_file).writerows([HEADER] + rows)
+
+
+def create(dataset, graph_path, taxonomy_file):
+    """
+    Build a graph and its fingerprints as the create action of create_or_update_save_locally.py does.
+    """
+    entries = {}
+    chunks = record_symbols(iterPreprocessedRowChunks(dataset, taxonomy_file=taxonomy_file), entries)
+    create_graph_save_locally(*getDataFromRowChunks(chunks), graph_path)
+    save_fingerprints(fingerprint_dataset(dataset, entries), fingerprints_path(graph_path))
+
+
+@pytest.mark.parametrize('remove_missing', [True, False])
+def test_update_equals_fresh_build(tmp_path, remove_missing):
+    taxonomy_file = str(tmp_path / 'no-taxonomy.csv')
+    write_dataset(tmp_path / 'old.csv', OLD_ROWS)
+    write_dataset(tmp_path / 'new.csv', NEW_ROWS)
+    # Without remove_missing, the plants missing from the new file are kept as they were
+    expected_rows = NEW_ROWS if remove_missing else NEW_ROWS + [row for row in OLD_ROWS if row[0] == 'ACSA']
+    write_dataset(tmp_path / 'expected.csv', expected_rows)
+
+    create(str(tmp_path / 'old.csv'), str(tmp_path / 'graph.gsnap'), taxonomy_file)
+    delta = update_graph_save_locally(str(tmp_path / 'new.csv'), str(tmp_path / 'graph.gsnap'), remove_missing,
+                                      taxonomy_file)
+    create(str(tmp_path / 'expected.csv'), str(tmp_path / 'expected.gsnap'), taxonomy_file)
+
+    assert delta['added'] == ['QURU2', 'ZIZI']
+    assert delta['updated'] == ['ABAB', 'LOLI']
+    assert delta['removed'] == (['ACSA'] if remove_missing else [])
+    assert delta['orphaned_families'] == ['Lonelyaceae']
+
+    updated = read_graph(str(tmp_path / 'graph.gsnap'))
+    assert nx.utils.graphs_equal(updated, read_graph(str(tmp_path / 'expected.gsnap')))
+    assert ('ACSA' in updated) != remove_missing
+
+
+def test_unchanged_dataset_leaves_graph_untouched(tmp_path):
+    taxonomy_file = str(tmp_path / 'no-taxonomy.csv')
+    write_dataset(tmp_path / 'old.csv', OLD_ROWS)
+    create(str(tmp_path / 'old.csv'), str(tmp_path / 'graph.gsnap'), taxonomy_file)
+    before = (tmp_path / 'graph.gsnap').read_bytes()
+
+    delta = update_graph_save_locally(str(tmp_path / 'old.csv'), str(tmp_path / 'graph.gsnap'), True, taxonomy_file)
+
+    assert not delta['added'] and not delta['updated'] and not delta['removed']
+    assert (tmp_path / 'graph.gsnap').read_bytes() == before